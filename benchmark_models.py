@@ -0,0 +1,137 @@
+"""
+@description: 高数量记录模型的内存基准测试，对比普通数据类与槽位模型每条记录占用的字节数
+
+用法:
+    python benchmark_models.py [--count 1000000] [--models transactions,checkins,verifications,accesses]
+
+"之前"使用与模型字段相同的普通 @dataclass，并为每条记录保留独立的字符串与日期对象，
+对应改造前 from_dict 的行为；"之后"使用当前的模型类及其 from_dict。
+"""
+import gc
+import argparse
+import tracemalloc
+from dataclasses import make_dataclass, fields
+from datetime import date, datetime, timedelta
+
+from coser_bot.database.models import (
+    PointsTransaction, CheckinRecord, EmailVerification, UserGroupAccess,
+    PointsTransactionType, TransactionStatus, EmailVerifyStatus
+)
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+DESCRIPTIONS = ["每日签到", "连续签到7天奖励", "赠送积分给用户", "管理员调整"]
+TYPES = list(PointsTransactionType)
+
+
+def transaction_dict(i: int) -> dict:
+    return {
+        "transaction_id": i,
+        "user_id": 100000 + i % 5000,
+        "amount": i % 50 + 1,
+        "transaction_type": TYPES[i % len(TYPES)].value,
+        "description": DESCRIPTIONS[i % len(DESCRIPTIONS)] + "",
+        "created_at": (START + timedelta(seconds=i)).isoformat(),
+        "related_user_id": None,
+        "status": TransactionStatus.COMPLETED.value,
+        "expires_at": None,
+    }
+
+
+def checkin_dict(i: int) -> dict:
+    created_at = START + timedelta(minutes=i)
+    return {
+        "record_id": i,
+        "user_id": 100000 + i % 5000,
+        "checkin_date": created_at.date().isoformat(),
+        "points_earned": 10,
+        "streak_bonus": 0,
+        "created_at": created_at.isoformat(),
+        "is_makeup": False,
+    }
+
+
+def verification_dict(i: int) -> dict:
+    created_at = START + timedelta(seconds=i)
+    return {
+        "verification_id": i,
+        "user_id": 100000 + i % 5000,
+        "email": f"user{i % 5000}@example.com",
+        "verification_code": f"{i % 1000000:06d}",
+        "created_at": created_at.isoformat(),
+        "expires_at": (created_at + timedelta(minutes=30)).isoformat(),
+        "status": EmailVerifyStatus.VERIFIED.value,
+    }
+
+
+def access_dict(i: int) -> dict:
+    return {
+        "access_id": i,
+        "user_id": 100000 + i,
+        "group_id": i % 2 + 1,
+        "start_date": (START + timedelta(seconds=i)).isoformat(),
+        "end_date": None,
+    }
+
+
+MODELS = {
+    "transactions": (PointsTransaction, transaction_dict),
+    "checkins": (CheckinRecord, checkin_dict),
+    "verifications": (EmailVerification, verification_dict),
+    "accesses": (UserGroupAccess, access_dict),
+}
+
+
+def _fresh(value):
+    """复制值，模拟每条记录各自解析出的字符串与日期对象"""
+    if isinstance(value, str):
+        return value.encode("utf-8").decode("utf-8")
+    if type(value) is date:
+        return date(value.year, value.month, value.day)
+    return value
+
+
+def _plain_class(model):
+    """生成与模型字段相同、带 __dict__ 的普通数据类"""
+    return make_dataclass(f"Plain{model.__name__}", [(f.name, f.type) for f in fields(model)])
+
+
+def measure(build, count: int) -> int:
+    """
+    @description: 构建count条记录并返回其占用的内存
+    @param build: 由序号构建记录的函数
+    @param {int} count: 记录数
+    @return {int}: 字节数
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    gc.collect()
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="记录模型内存基准测试")
+    parser.add_argument("--count", type=int, default=1_000_000, help="每种模型构建的记录数")
+    parser.add_argument("--models", default=",".join(MODELS), help="要测试的模型，逗号分隔")
+    args = parser.parse_args()
+
+    print(f"{'模型':<16}{'之前(B/条)':>14}{'之后(B/条)':>14}{'节省':>10}")
+    for name in args.models.split(","):
+        model, make_dict = MODELS[name]
+        plain = _plain_class(model)
+        names = [f.name for f in fields(model)]
+
+        def build_before(i):
+            record = model.from_dict(make_dict(i))
+            return plain(**{n: _fresh(getattr(record, n)) for n in names})
+
+        before = measure(build_before, args.count)
+        after = measure(lambda i: model.from_dict(make_dict(i)), args.count)
+        print(f"{name:<16}{before / args.count:>14.1f}{after / args.count:>14.1f}{1 - after / before:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+@description: 快照格式基准测试，对比JSON与二进制快照（不压缩/gzip/zstd）的保存耗时、加载耗时与文件大小
+
+用法:
+    python benchmark_snapshots.py [--users 100000] [--transactions 1000000]
+
+数据为合成的用户与积分交易记录；加载耗时只包含流式解析（iter_snapshot），不含构建模型对象。
+"""
+import os
+import time
+import argparse
+import tempfile
+from datetime import timedelta
+
+from benchmark_models import START, transaction_dict
+from coser_bot.database.snapshot import write_snapshot, iter_snapshot, zstandard
+
+# (名称, 格式, 压缩方式)
+VARIANTS = [
+    ("json", "json", "none"),
+    ("binary", "binary", "none"),
+    ("binary+gzip", "binary", "gzip"),
+    ("binary+zstd", "binary", "zstd"),
+]
+
+
+def user_dict(i: int) -> dict:
+    join_date = START + timedelta(seconds=i * 37)
+    return {
+        "user_id": 100000 + i,
+        "username": f"coser_{i}",
+        "first_name": f"用户{i}",
+        "join_date": join_date.isoformat(),
+        "points": i % 5000,
+        "frozen_points": 0,
+        "email": f"user{i}@example.com" if i % 3 else None,
+        "email_verified": bool(i % 3),
+        "last_checkin_date": (join_date + timedelta(days=30)).date().isoformat(),
+        "streak_days": i % 30,
+        "max_streak_days": i % 90,
+        "total_checkins": i % 365,
+        "monthly_checkins": i % 31,
+        "makeup_chances": 1,
+        "total_points_earned": i % 9000,
+        "total_points_spent": i % 4000,
+    }
+
+
+def run(name: str, records: list, directory: str) -> None:
+    for label, fmt, compression in VARIANTS:
+        if compression == "zstd" and zstandard is None:
+            print(f"{name:<14}{label:<14}{'未安装zstandard，跳过':>20}")
+            continue
+        path = os.path.join(directory, f"{name}.{label}")
+        started = time.perf_counter()
+        size = write_snapshot(path, records, fmt, compression)
+        saved = time.perf_counter() - started
+
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_snapshot(path))
+        loaded = time.perf_counter() - started
+        assert count == len(records)
+        print(f"{name:<14}{label:<14}{size / 1024 / 1024:>12.1f}{saved:>12.2f}{loaded:>12.2f}")
+        os.remove(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="快照格式基准测试")
+    parser.add_argument("--users", type=int, default=100_000, help="合成用户数")
+    parser.add_argument("--transactions", type=int, default=1_000_000, help="合成交易数")
+    args = parser.parse_args()
+
+    print(f"{'数据集':<14}{'格式':<14}{'大小(MB)':>12}{'保存(s)':>12}{'加载(s)':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        run("users", [user_dict(i) for i in range(args.users)], directory)
+        run("transactions", [transaction_dict(i) for i in range(args.transactions)], directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+@description: 在JSON与二进制格式之间转换数据目录中的集合快照
+
+用法:
+    python convert_snapshots.py --to binary [--compression gzip] [--data-dir DIR]
+    python convert_snapshots.py --to json [--data-dir DIR]
+
+存储读取快照时按文件头自动识别格式，转换只是提前完成下一次写入时的格式切换；
+转换后请同步修改 STORAGE_SNAPSHOT_FORMAT，否则之后的写入会换回原格式。转换前请停止机器人。
+"""
+import os
+import sys
+import logging
+import argparse
+
+from coser_bot.config import config
+from coser_bot.database.storage import COLLECTIONS, user_shard_paths
+from coser_bot.database.snapshot import (
+    convert_snapshot, is_binary_snapshot, resolve_compression, SnapshotError,
+    FORMAT_JSON, FORMAT_BINARY, COMPRESSION_CODES
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="转换集合快照格式")
+    parser.add_argument("--data-dir", default=config.DATA_DIR, help="JSON数据目录")
+    parser.add_argument("--to", choices=[FORMAT_JSON, FORMAT_BINARY], required=True, help="目标格式")
+    parser.add_argument("--compression", choices=list(COMPRESSION_CODES), default="none", help="二进制快照的压缩方式")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    compression = resolve_compression(args.compression)
+    if compression != args.compression:
+        logging.warning("未安装zstandard，改用gzip压缩")
+
+    paths = [os.path.join(args.data_dir, file_name) for file_name, _ in COLLECTIONS.values()]
+    paths += user_shard_paths(args.data_dir)
+    failed = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        before = os.path.getsize(path)
+        source = FORMAT_BINARY if is_binary_snapshot(path) else FORMAT_JSON
+        try:
+            after = convert_snapshot(path, fmt=args.to, compression=compression)
+        except SnapshotError as e:
+            logging.error(f"转换失败，文件保持不变: {e}")
+            failed += 1
+            continue
+        print(f"{os.path.relpath(path, args.data_dir):<40}{source:>8} -> {args.to:<8}{before:>14,} -> {after:>14,} 字节")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ import logging
 from telegram.ext import Application
 
 from .config import config
-from .database import Storage
+from .database import init_storage, close_storage
 from .handlers import register_all_handlers
 from .utils.group_sync import GroupSyncManager
 
@@ -21,13 +21,17 @@ async def on_startup(application: Application):
         successful_groups = await sync_manager.sync_all_groups()
         logger.info(f"已同步 {len(successful_groups)} 个群组的成员信息")
 
+async def on_shutdown(application: Application):
+    """机器人关闭时刷新并释放存储"""
+    close_storage()
+
 def create_application() -> Application:
     """创建并配置机器人应用"""
     # 创建应用实例
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    application = Application.builder().token(config.BOT_TOKEN).post_shutdown(on_shutdown).build()
     
-    # 初始化存储
-    storage = Storage()
+    # 初始化共享存储
+    storage = init_storage()
     application.bot_data['storage'] = storage
     
     # 注册处理器
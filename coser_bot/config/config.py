@@ -34,5 +34,39 @@ class Config:
     WEEKLY_STREAK_POINTS = 50
     MONTHLY_STREAK_POINTS = 200
 
+    # 存储设置
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()  # 存储后端：json 或 sqlite
+    STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", os.path.join(DATA_DIR, "storage.sqlite3"))  # SQLite后端的数据库文件
+    STORAGE_LAZY_LOAD_ENABLED = os.getenv("STORAGE_LAZY_LOAD_ENABLED", "True").lower() in ("true", "1", "t")  # 是否按需加载集合（启动时只加载用户与群组）
+    STORAGE_USER_SHARDS = int(os.getenv("STORAGE_USER_SHARDS", "1"))  # 用户数据分片数，保存用户时只重写所在分片；1表示使用单个 users.json
+    STORAGE_SNAPSHOT_FORMAT = os.getenv("STORAGE_SNAPSHOT_FORMAT", "json").lower()  # 快照格式：json 或 binary（长度前缀的紧凑记录）
+    STORAGE_SNAPSHOT_COMPRESSION = os.getenv("STORAGE_SNAPSHOT_COMPRESSION", "none").lower()  # 二进制快照的压缩方式：none、gzip 或 zstd（需安装zstandard）
+    STORAGE_JOURNAL_ENABLED = os.getenv("STORAGE_JOURNAL_ENABLED", "False").lower() in ("true", "1", "t")  # 是否启用追加日志模式
+    STORAGE_JOURNAL_COMPACT_BYTES = int(os.getenv("STORAGE_JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))  # 日志超过该大小后触发后台压缩（字节）
+    STORAGE_WRITE_BEHIND_ENABLED = os.getenv("STORAGE_WRITE_BEHIND_ENABLED", "False").lower() in ("true", "1", "t")  # 是否启用延迟写入（后台合并刷新）
+    STORAGE_FLUSH_INTERVAL_MS = int(os.getenv("STORAGE_FLUSH_INTERVAL_MS", "500"))  # 延迟写入模式下两次刷新的最长间隔（毫秒）
+    STORAGE_FLUSH_MAX_MUTATIONS = int(os.getenv("STORAGE_FLUSH_MAX_MUTATIONS", "100"))  # 累计变更达到该数量时立即刷新
+    STORAGE_SYNC_POINT_TRANSFERS = os.getenv("STORAGE_SYNC_POINT_TRANSFERS", "True").lower() in ("true", "1", "t")  # 积分赠送是否同步落盘
+    STORAGE_VERIFICATION_RETENTION_HOURS = int(os.getenv("STORAGE_VERIFICATION_RETENTION_HOURS", "24"))  # 未完成的邮箱验证记录过期后保留的时长（小时）
+    STORAGE_ARCHIVE_HORIZON_DAYS = int(os.getenv("STORAGE_ARCHIVE_HORIZON_DAYS", "0"))  # 签到与交易记录超过该天数后归档到按月压缩的分区文件，0表示不归档
+
+    # 群组同步设置
+    MEMBERSHIP_CACHE_TTL_SECONDS = int(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "600"))  # 群组成员状态缓存的有效期（秒），期间不再重复调用 get_chat_member
+    MEMBERSHIP_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("MEMBERSHIP_CACHE_NEGATIVE_TTL_SECONDS", "120"))  # 非成员或查询失败结果的缓存有效期（秒）
+    MEMBERSHIP_CACHE_MAX_ENTRIES = int(os.getenv("MEMBERSHIP_CACHE_MAX_ENTRIES", "50000"))  # 成员状态缓存的最大条目数，超出时淘汰最久未使用的条目
+    GROUP_SYNC_DEBOUNCE_SECONDS = int(os.getenv("GROUP_SYNC_DEBOUNCE_SECONDS", "60"))  # 同一用户在同一群组的消息在该时间窗口内只做一次群组同步检查（秒），0表示不节流
+    GROUP_SYNC_DEBOUNCE_MAX_ENTRIES = int(os.getenv("GROUP_SYNC_DEBOUNCE_MAX_ENTRIES", "50000"))  # 节流表最多记录的 (群组, 用户) 条目数
+    GROUP_SYNC_PROBE_CONCURRENCY = int(os.getenv("GROUP_SYNC_PROBE_CONCURRENCY", "4"))  # 群组同步时同时进行的成员查询数上限（所有消息共享）
+    GROUP_SYNC_STALE_HOURS = int(os.getenv("GROUP_SYNC_STALE_HOURS", "72"))  # 访问记录超过该时长未被成员事件或查询确认时，定时对账会重新查询（小时）
+    GROUP_SYNC_RECONCILE_BATCH = int(os.getenv("GROUP_SYNC_RECONCILE_BATCH", "200"))  # 每次定时对账最多重新查询的访问记录数
+
+    # Bot API 限流设置
+    BOT_API_RATE_LIMIT_ENABLED = os.getenv("BOT_API_RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "t")  # 是否通过令牌桶调度所有 Bot API 请求
+    BOT_API_GLOBAL_RATE = float(os.getenv("BOT_API_GLOBAL_RATE", "25"))  # 全局每秒请求数上限
+    BOT_API_PRIVATE_CHAT_RATE = float(os.getenv("BOT_API_PRIVATE_CHAT_RATE", "1"))  # 单个私聊每秒发送消息数上限
+    BOT_API_PRIVATE_CHAT_BURST = float(os.getenv("BOT_API_PRIVATE_CHAT_BURST", "3"))  # 单个私聊允许的突发消息数
+    BOT_API_GROUP_CHAT_PER_MINUTE = float(os.getenv("BOT_API_GROUP_CHAT_PER_MINUTE", "20"))  # 单个群组每分钟发送消息数上限，一分钟的配额可以集中发送
+    BOT_API_MAX_RETRIES = int(os.getenv("BOT_API_MAX_RETRIES", "3"))  # 收到 RetryAfter 后的最多重试次数
+
 # 创建配置实例
 config = Config() 
\ No newline at end of file
@@ -1,6 +1,7 @@
 """
 @description: 数据库模块初始化文件
 """
-from .storage import Storage
+from .storage import Storage, init_storage, get_storage, close_storage
+from .sqlite_storage import SQLiteStorage
 
-__all__ = ['Storage'] 
\ No newline at end of file
+__all__ = ['Storage', 'SQLiteStorage', 'init_storage', 'get_storage', 'close_storage'] 
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+@description: 冷数据归档模块，将超过保留期限的签到与交易记录按月写入gzip压缩的分区文件，并保存按用户汇总的统计
+"""
+import os
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from .snapshot import write_snapshot, read_snapshot, fsync_dir
+
+logger = logging.getLogger(__name__)
+
+# 可归档的集合 -> 决定记录冷热的日期字段
+ARCHIVE_DATE_FIELDS = {
+    "checkin_records": "checkin_date",
+    "transactions": "created_at",
+}
+
+# 归档清单文件名，记录每个集合的归档截止日期、已分配的最大ID与按用户汇总的统计
+MANIFEST_FILE = "manifest.json"
+
+
+def record_date(name: str, data: Dict[str, Any]) -> Optional[date]:
+    """
+    @description: 获取记录字典中决定冷热的日期
+    @param {str} name: 集合名称
+    @param {Dict[str, Any]} data: 记录字典
+    @return {Optional[date]}: 日期，缺失时返回None
+    """
+    value = data.get(ARCHIVE_DATE_FIELDS[name])
+    return datetime.fromisoformat(value).date() if value else None
+
+
+def month_key(day: date) -> str:
+    """
+    @description: 获取日期所在的分区名
+    @param {date} day: 日期
+    @return {str}: 分区名，格式 YYYY-MM
+    """
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+class ArchiveStore:
+    """归档目录：<archive_dir>/<集合>/<YYYY-MM>.json.gz 以及 manifest.json"""
+
+    def __init__(self, archive_dir: str):
+        """
+        @description: 初始化归档目录并读取归档清单
+        @param {str} archive_dir: 归档目录
+        """
+        self.archive_dir = archive_dir
+        self.manifest_path = os.path.join(archive_dir, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest = {"cutoff": {}, "max_ids": {}, "rollups": {}}
+        if os.path.exists(self.manifest_path):
+            manifest.update(read_snapshot(self.manifest_path))
+        return self._normalize(manifest)
+
+    @staticmethod
+    def _normalize(manifest: Dict[str, Any]) -> Dict[str, Any]:
+        # JSON对象的键只能是字符串，读入内存后恢复为整数用户ID
+        manifest["rollups"] = {
+            name: {int(user_id): totals for user_id, totals in rollups.items()}
+            for name, rollups in manifest["rollups"].items()
+        }
+        return manifest
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        @description: 原子写入归档清单文件，不替换内存中的清单
+        @param {Dict[str, Any]} manifest: 新的归档清单
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        write_snapshot(self.manifest_path, manifest)
+
+    def apply_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        @description: 替换内存中的清单，应在清单文件写入成功后调用
+        @param {Dict[str, Any]} manifest: 已写入的归档清单
+        """
+        self.manifest = self._normalize(manifest)
+
+    def save_manifest(self, manifest: Dict[str, Any]) -> None:
+        """
+        @description: 原子写入归档清单，写入成功后才替换内存中的清单
+        @param {Dict[str, Any]} manifest: 新的归档清单
+        """
+        self.write_manifest(manifest)
+        self.apply_manifest(manifest)
+
+    def cutoff(self, name: str) -> Optional[date]:
+        """
+        @description: 获取集合的归档截止日期，早于该日期的已完成记录都在归档中
+        @param {str} name: 集合名称
+        @return {Optional[date]}: 截止日期，从未归档时返回None
+        """
+        value = self.manifest["cutoff"].get(name)
+        return date.fromisoformat(value) if value else None
+
+    def max_id(self, name: str) -> int:
+        """
+        @description: 获取归档中出现过的最大整数ID，分配新ID时需要跳过
+        @param {str} name: 集合名称
+        @return {int}: 最大ID，没有时为0
+        """
+        return self.manifest["max_ids"].get(name, 0)
+
+    def rollup(self, name: str, user_id: int) -> Dict[str, int]:
+        """
+        @description: 获取用户已归档记录的汇总
+        @param {str} name: 集合名称
+        @param {int} user_id: 用户ID
+        @return {Dict[str, int]}: 汇总值，没有归档记录时为空字典
+        """
+        return self.manifest["rollups"].get(name, {}).get(user_id, {})
+
+    def rollups(self, name: str) -> Dict[int, Dict[str, int]]:
+        """
+        @description: 获取集合所有用户的归档汇总
+        @param {str} name: 集合名称
+        @return {Dict[int, Dict[str, int]]}: 用户ID -> 汇总值
+        """
+        return self.manifest["rollups"].get(name, {})
+
+    def _partition_path(self, name: str, month: str) -> str:
+        return os.path.join(self.archive_dir, name, f"{month}.json.gz")
+
+    def months(self, name: str) -> List[str]:
+        """
+        @description: 列出集合已有的分区
+        @param {str} name: 集合名称
+        @return {List[str]}: 按时间排序的分区名
+        """
+        directory = os.path.join(self.archive_dir, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(f[:-len(".json.gz")] for f in os.listdir(directory) if f.endswith(".json.gz"))
+
+    def partition_paths(self, name: str) -> List[str]:
+        """
+        @description: 列出集合已有分区的文件路径
+        @param {str} name: 集合名称
+        @return {List[str]}: 按时间排序的分区文件路径
+        """
+        return [self._partition_path(name, month) for month in self.months(name)]
+
+    def read_partition(self, name: str, month: str) -> List[Dict[str, Any]]:
+        """
+        @description: 读取一个分区（gzip自带CRC校验）
+        @param {str} name: 集合名称
+        @param {str} month: 分区名
+        @return {List[Dict[str, Any]]}: 记录字典列表，分区不存在时为空列表
+        """
+        path = self._partition_path(name, month)
+        if not os.path.exists(path):
+            return []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_partition(self, name: str, month: str, records: List[Dict[str, Any]]) -> None:
+        """
+        @description: 原子写入一个分区
+        @param {str} name: 集合名称
+        @param {str} month: 分区名
+        @param {List[Dict[str, Any]]} records: 记录字典列表
+        """
+        path = self._partition_path(name, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write(json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        fsync_dir(os.path.dirname(path))
+
+    def append(self, name: str, key_field: str, records: List[Dict[str, Any]]) -> None:
+        """
+        @description: 将记录按月合并进分区；主键相同的记录只保留最新的一份，因此中断后重复归档不会产生重复记录
+        @param {str} name: 集合名称
+        @param {str} key_field: 主键字段
+        @param {List[Dict[str, Any]]} records: 记录字典列表
+        """
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for data in records:
+            by_month.setdefault(month_key(record_date(name, data)), []).append(data)
+
+        for month, new_records in sorted(by_month.items()):
+            merged: Dict[Any, Dict[str, Any]] = {}
+            for i, data in enumerate(self.read_partition(name, month) + new_records):
+                key = data.get(key_field)
+                merged[("", i) if key is None else key] = data
+            partition = sorted(merged.values(), key=lambda d: d.get(ARCHIVE_DATE_FIELDS[name]) or "")
+            self.write_partition(name, month, partition)
+            logger.info(f"归档分区 {name}/{month}: 新增 {len(new_records)} 条，共 {len(partition)} 条")
+
+    def iter_records(self, name: str, start: date = None, end: date = None) -> Iterator[Dict[str, Any]]:
+        """
+        @description: 按需读取日期区间内的归档记录；只返回早于归档截止日期的记录，避免与内存中的记录重复
+        @param {str} name: 集合名称
+        @param {date} start: 开始日期（含），默认不限
+        @param {date} end: 结束日期（不含），默认不限
+        @return {Iterator[Dict[str, Any]]}: 记录字典
+        """
+        cutoff = self.cutoff(name)
+        if cutoff is None:
+            return
+        end = min(end, cutoff) if end else cutoff
+        first_month = month_key(start) if start else None
+        for month in self.months(name):
+            if (first_month and month < first_month) or month > month_key(end):
+                continue
+            for data in self.read_partition(name, month):
+                day = record_date(name, data)
+                if day is None or day >= end or (start and day < start):
+                    continue
+                yield data
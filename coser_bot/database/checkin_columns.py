@@ -0,0 +1,181 @@
+"""
+@description: 签到记录的列式内存存储，按列保存用户ID、日期序号与积分，统计时使用NumPy向量化计算（未安装NumPy时退化为逐行计算）
+"""
+from array import array
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy为可选依赖
+    np = None
+
+from .models import CheckinRecord
+
+# 初始容量，之后按倍数扩容
+_INITIAL_CAPACITY = 1024
+
+# 列名 -> (NumPy类型, array模块类型码)
+_COLUMNS = {
+    "user_id": ("int64", "q"),
+    "day": ("int32", "i"),
+    "points_earned": ("int32", "i"),
+    "streak_bonus": ("int32", "i"),
+}
+
+
+class CheckinColumns:
+    """签到记录的列式副本，只用于聚合统计，记录对象本身仍保存在 Storage.checkin_records 中"""
+
+    def __init__(self, records: Iterable[CheckinRecord] = ()):
+        """
+        @description: 由签到记录构建列数据
+        @param {Iterable[CheckinRecord]} records: 签到记录
+        """
+        self._size = 0
+        if np is not None:
+            self._columns = {name: np.empty(_INITIAL_CAPACITY, dtype=dtype) for name, (dtype, _) in _COLUMNS.items()}
+        else:
+            self._columns = {name: array(code) for name, (_, code) in _COLUMNS.items()}
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, record: CheckinRecord) -> None:
+        """
+        @description: 追加一条签到记录
+        @param {CheckinRecord} record: 签到记录对象
+        """
+        values = (record.user_id, record.checkin_date.toordinal(), record.points_earned or 0, record.streak_bonus or 0)
+        if np is None:
+            for column, value in zip(self._columns.values(), values):
+                column.append(value)
+            self._size += 1
+            return
+
+        if self._size == len(self._columns["user_id"]):
+            for name, column in self._columns.items():
+                grown = np.empty(len(column) * 2, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        for column, value in zip(self._columns.values(), values):
+            column[self._size] = value
+        self._size += 1
+
+    def _column(self, name: str):
+        column = self._columns[name]
+        return column[:self._size] if np is not None else column
+
+    def count_on(self, day: date) -> int:
+        """
+        @description: 统计某天的签到次数
+        @param {date} day: 日期
+        @return {int}: 签到次数
+        """
+        ordinal = day.toordinal()
+        if np is not None:
+            return int(np.count_nonzero(self._column("day") == ordinal))
+        return self._columns["day"].count(ordinal)
+
+    def counts_by_user(self, start: date, end: date) -> Dict[int, int]:
+        """
+        @description: 统计日期区间内每个用户的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[int, int]}: 用户ID -> 签到次数，没有签到的用户不出现
+        """
+        first, last = start.toordinal(), end.toordinal()
+        if np is not None:
+            days = self._column("day")
+            user_ids = self._column("user_id")[(days >= first) & (days < last)]
+            unique, counts = np.unique(user_ids, return_counts=True)
+            return dict(zip(unique.tolist(), counts.tolist()))
+        return dict(Counter(
+            user_id for user_id, day in zip(self._columns["user_id"], self._columns["day"]) if first <= day < last
+        ))
+
+    def daily_counts(self, start: date, end: date) -> Dict[date, int]:
+        """
+        @description: 统计日期区间内每天的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[date, int]}: 日期 -> 签到次数，区间内每天都有一项
+        """
+        first, last = start.toordinal(), end.toordinal()
+        if last <= first:
+            return {}
+        if np is not None:
+            days = self._column("day")
+            counts = np.bincount(days[(days >= first) & (days < last)] - first, minlength=last - first).tolist()
+        else:
+            counts = [0] * (last - first)
+            for day in self._columns["day"]:
+                if first <= day < last:
+                    counts[day - first] += 1
+        return {start + timedelta(days=i): count for i, count in enumerate(counts)}
+
+    def points_by_user(self) -> Dict[int, int]:
+        """
+        @description: 统计每个用户通过签到获得的积分（基础积分与连续签到奖励之和）
+        @return {Dict[int, int]}: 用户ID -> 积分
+        """
+        if np is not None:
+            points = self._column("points_earned").astype("int64") + self._column("streak_bonus")
+            unique, inverse = np.unique(self._column("user_id"), return_inverse=True)
+            totals = np.bincount(inverse, weights=points, minlength=len(unique)).astype("int64")
+            return dict(zip(unique.tolist(), totals.tolist()))
+        totals: Dict[int, int] = {}
+        for user_id, earned, bonus in zip(
+            self._columns["user_id"], self._columns["points_earned"], self._columns["streak_bonus"]
+        ):
+            totals[user_id] = totals.get(user_id, 0) + earned + bonus
+        return totals
+
+    def count_distribution(self, start: date, end: date) -> Dict[str, Optional[float]]:
+        """
+        @description: 统计日期区间内有签到的用户的签到次数分布
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[str, Optional[float]]}: users/mean/median/p90/max，没有签到时除users外均为None
+        """
+        counts = list(self.counts_by_user(start, end).values())
+        return distribution(counts)
+
+
+def distribution(counts) -> Dict[str, Optional[float]]:
+    """
+    @description: 计算计数列表的分布统计
+    @param counts: 计数列表
+    @return {Dict[str, Optional[float]]}: users/mean/median/p90/max
+    """
+    if not len(counts):
+        return {"users": 0, "mean": None, "median": None, "p90": None, "max": None}
+    if np is not None:
+        values = np.asarray(counts, dtype="float64")
+        return {
+            "users": len(values),
+            "mean": float(values.mean()),
+            "median": float(np.median(values)),
+            "p90": float(np.percentile(values, 90)),
+            "max": float(values.max()),
+        }
+    values = sorted(counts)
+    n = len(values)
+
+    def percentile(q: float) -> float:
+        # 与 numpy.percentile 默认的线性插值一致
+        position = (n - 1) * q
+        lower = int(position)
+        upper = min(lower + 1, n - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    return {
+        "users": n,
+        "mean": sum(values) / n,
+        "median": percentile(0.5),
+        "p90": percentile(0.9),
+        "max": float(values[-1]),
+    }
@@ -0,0 +1,101 @@
+"""
+@description: 整数ID分配模块，按集合分配单调递增的ID，并以预留区间的方式持久化高水位
+"""
+import os
+import threading
+import logging
+from typing import Dict
+
+from .snapshot import write_snapshot, read_snapshot, SnapshotError
+
+logger = logging.getLogger(__name__)
+
+# 每次持久化时额外预留的ID数量；进程异常退出后，未用完的预留区间会被跳过而不会被重复分配
+ID_RESERVE_BLOCK = 1000
+
+
+class IdAllocator:
+    """按集合分配单调递增的整数ID，线程安全"""
+
+    def __init__(self, path: str, block: int = ID_RESERVE_BLOCK):
+        """
+        @description: 读取已持久化的高水位
+        @param {str} path: 高水位文件路径
+        @param {int} block: 每次持久化额外预留的ID数量
+        """
+        self.path = path
+        self.block = block
+        self._lock = threading.Lock()
+        # 集合名称 -> 下一个可分配的ID
+        self._next: Dict[str, int] = {}
+        # 集合名称 -> 已持久化的高水位（不含），分配到该值时需要先持久化新的高水位
+        self._limit: Dict[str, int] = {}
+        if os.path.exists(path):
+            try:
+                self._limit = {name: int(value) for name, value in read_snapshot(path).items()}
+            except (SnapshotError, ValueError, AttributeError) as e:
+                # 文件损坏时退回到由已有数据推算，observe 保证不会与已有记录冲突
+                logger.error(f"读取ID高水位失败，将根据已有记录重新推算: {e}")
+        self._next = dict(self._limit)
+
+    def observe(self, name: str, value) -> None:
+        """
+        @description: 记录一个已存在的ID，保证之后分配的ID都大于它
+        @param {str} name: 集合名称
+        @param value: 已存在的ID，非整数时忽略
+        """
+        if not isinstance(value, int) or isinstance(value, bool):
+            return
+        with self._lock:
+            if value >= self._next.get(name, 1):
+                self._next[name] = value + 1
+
+    def reserve(self, name: str, count: int = 1) -> range:
+        """
+        @description: 预留一段连续的ID，用于批量导入
+        @param {str} name: 集合名称
+        @param {int} count: 预留数量
+        @return {range}: 预留的ID区间
+        """
+        if count < 1:
+            raise ValueError("count 必须大于0")
+        with self._lock:
+            start = self._next.get(name, 1)
+            end = start + count
+            if end > self._limit.get(name, 0):
+                # 先持久化新的高水位再返回ID，重启后不会再次分配这段区间
+                limits = dict(self._limit)
+                limits[name] = end + self.block
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                write_snapshot(self.path, limits)
+                self._limit = limits
+            self._next[name] = end
+            return range(start, end)
+
+    def checkpoint(self) -> None:
+        """
+        @description: 将下一个ID持久化为高水位，正常关闭后重启时不会跳过尚未用完的预留区间
+        """
+        with self._lock:
+            if self._next == self._limit:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            write_snapshot(self.path, dict(self._next))
+            self._limit = dict(self._next)
+
+    def allocate(self, name: str) -> int:
+        """
+        @description: 分配一个ID
+        @param {str} name: 集合名称
+        @return {int}: 新ID
+        """
+        return self.reserve(name).start
+
+    def peek(self, name: str) -> int:
+        """
+        @description: 查看下一个将分配的ID（不分配）
+        @param {str} name: 集合名称
+        @return {int}: 下一个ID
+        """
+        with self._lock:
+            return self._next.get(name, 1)
@@ -0,0 +1,107 @@
+"""
+@description: 存储变更日志模块，以追加方式记录集合变更，支持回放与压缩
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# 日志操作类型
+OP_PUT = "put"
+OP_DELETE = "del"
+
+
+class CollectionJournal:
+    """单个集合的追加式变更日志
+
+    每次变更写入一行紧凑的JSON记录，格式为 {"op": ..., "key": ..., "data": ...}。
+    压缩时先将当前日志轮转为 .compacting 文件，快照写入成功后再删除，
+    因此任何时刻崩溃都可以通过"快照 + 轮转日志 + 当前日志"完整恢复。
+    """
+
+    def __init__(self, path: str):
+        """
+        @description: 初始化集合日志
+        @param {str} path: 日志文件路径
+        """
+        self.path = path
+        self.rotated_path = f"{path}.compacting"
+        self._file = None
+        self.size = os.path.getsize(path) if os.path.exists(path) else 0
+
+    def append(self, op: str, key: Any, data: Optional[Dict[str, Any]] = None, sync: bool = False) -> None:
+        """
+        @description: 追加一条变更记录
+        @param {str} op: 操作类型（put/del）
+        @param {Any} key: 记录主键
+        @param {Optional[Dict[str, Any]]} data: 记录内容，删除操作为None
+        @param {bool} sync: 是否立即fsync到磁盘
+        """
+        line = json.dumps({"op": op, "key": key, "data": data}, ensure_ascii=False, separators=(",", ":"))
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(line + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self.size += len(line.encode("utf-8")) + 1
+
+    def has_entries(self) -> bool:
+        """
+        @description: 是否存在尚未压缩进快照的记录
+        @return {bool}: 是否存在未压缩记录
+        """
+        return self.size > 0 or os.path.exists(self.rotated_path)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        @description: 按写入顺序回放日志记录（先轮转日志，后当前日志）
+        @return {Iterator[Dict[str, Any]]}: 变更记录迭代器
+        """
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # 进程崩溃时最后一行可能只写了一半，跳过即可
+                        logger.warning(f"跳过损坏的日志记录: {path}:{line_no}")
+
+    def rotate(self) -> None:
+        """
+        @description: 将当前日志轮转为待压缩日志，之后的变更写入新的日志文件
+        """
+        self.close()
+        if self.size == 0 or not os.path.exists(self.path):
+            return
+        if os.path.exists(self.rotated_path):
+            # 上一次压缩未完成，把当前日志合并到待压缩日志末尾
+            with open(self.rotated_path, "a", encoding="utf-8") as dst, \
+                    open(self.path, "r", encoding="utf-8") as src:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        self.size = 0
+
+    def discard_rotated(self) -> None:
+        """
+        @description: 快照写入成功后删除待压缩日志
+        """
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self) -> None:
+        """
+        @description: 关闭日志文件句柄
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,373 @@
+"""
+@description: JSON数据目录到SQLite的在线迁移工具，支持流式读取、分批写入、断点续传与迁移后校验
+"""
+import os
+import time
+import sqlite3
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config import config
+from .snapshot import iter_snapshot
+from .archive import ArchiveStore, ARCHIVE_DATE_FIELDS, month_key, record_date
+from .storage import COLLECTIONS, COLLECTION_MODELS, COLLECTION_LABELS, user_shard_paths
+from .sqlite_storage import SCHEMA, TABLE_COLUMNS, build_upsert_sql, row_values
+
+logger = logging.getLogger(__name__)
+
+# 默认每批写入的记录数
+DEFAULT_BATCH_SIZE = 5000
+
+# 迁移进度表：每批记录与进度在同一事务中提交，中断后从上次提交的位置继续
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS migration_progress (
+    collection TEXT PRIMARY KEY,
+    source_size INTEGER NOT NULL,
+    source_mtime REAL NOT NULL,
+    records_done INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# 缺少交易ID的历史记录先以负数占位，迁移结束后统一分配正式ID
+_PLACEHOLDER_ID_SQL = "SELECT seq FROM transactions WHERE transaction_id < 0 ORDER BY seq"
+
+
+class MigrationError(Exception):
+    """迁移无法进行（例如存在尚未压缩的日志）"""
+
+
+@dataclass
+class CollectionStats:
+    """单个集合的迁移统计"""
+    name: str
+    records: int = 0
+    skipped: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    resumed: bool = False
+
+    @property
+    def rate(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass
+class VerificationResult:
+    """迁移后校验结果"""
+    row_counts: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    point_mismatches: List[Tuple[int, str, int, int]] = field(default_factory=list)
+    duplicate_users: Set[int] = field(default_factory=set)
+
+    @property
+    def ok(self) -> bool:
+        counts_match = all(source == target for source, target in self.row_counts.values())
+        return counts_match and not self.point_mismatches
+
+
+class JsonToSQLiteMigrator:
+    """将JSON快照逐条流式写入SQLite，内存占用与集合大小无关"""
+
+    def __init__(self, data_dir: str = None, db_path: str = None, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        @description: 初始化迁移器
+        @param {str} data_dir: JSON数据目录，默认读取配置 DATA_DIR
+        @param {str} db_path: 目标数据库路径，默认读取配置 STORAGE_SQLITE_PATH
+        @param {int} batch_size: 每个事务写入的记录数
+        """
+        self.data_dir = data_dir or config.DATA_DIR
+        self.db_path = db_path or config.STORAGE_SQLITE_PATH
+        self.batch_size = max(1, batch_size)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.executescript(PROGRESS_SCHEMA)
+        # 已归档的签到与交易记录只保存在归档分区中，需要一并迁移
+        self._archive = ArchiveStore(os.path.join(self.data_dir, "archive"))
+
+    def close(self) -> None:
+        """
+        @description: 合并WAL并关闭数据库连接
+        """
+        try:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self._conn.close()
+
+    def _source_paths(self, name: str) -> List[str]:
+        """
+        @description: 获取集合的源快照文件；用户数据与存储的加载规则一致，users.json 有数据时以它为准，否则读取各分片
+        @param {str} name: 集合名称
+        @return {List[str]}: 存在的源文件路径
+        """
+        path = os.path.join(self.data_dir, COLLECTIONS[name][0])
+        if name == "users":
+            shard_paths = user_shard_paths(self.data_dir)
+            if shard_paths and not (os.path.exists(path) and self._has_records(path)):
+                return shard_paths
+        return [path] if os.path.exists(path) else []
+
+    def _archive_paths(self, name: str) -> List[str]:
+        """
+        @description: 获取集合的归档分区文件
+        @param {str} name: 集合名称
+        @return {List[str]}: 分区文件路径，不可归档的集合或从未归档时为空列表
+        """
+        return self._archive.partition_paths(name) if name in ARCHIVE_DATE_FIELDS else []
+
+    @staticmethod
+    def _has_records(path: str) -> bool:
+        records = iter_snapshot(path)
+        try:
+            return next(records, None) is not None
+        finally:
+            records.close()
+
+    def _check_journal(self, name: str) -> None:
+        """
+        @description: 日志模式下尚未压缩进快照的变更不会被迁移，发现时拒绝继续
+        @param {str} name: 集合名称
+        @raises {MigrationError}: 存在未压缩的日志
+        """
+        path = os.path.join(self.data_dir, "journal", f"{name}.jsonl")
+        for candidate in (path, f"{path}.compacting"):
+            if os.path.exists(candidate) and os.path.getsize(candidate) > 0:
+                raise MigrationError(
+                    f"{COLLECTION_LABELS[name]}存在未压缩的日志 {candidate}，请先停止机器人并完成日志压缩"
+                )
+
+    def _load_progress(self, name: str, size: int, mtime: float) -> Tuple[int, bool]:
+        """
+        @description: 读取集合的迁移进度；源文件变化后从头开始（写入为幂等的插入或更新）
+        @param {str} name: 集合名称
+        @param {int} size: 源文件大小
+        @param {float} mtime: 源文件修改时间
+        @return {Tuple[int, bool]}: (已完成记录数, 是否已完成)
+        """
+        row = self._conn.execute(
+            "SELECT source_size, source_mtime, records_done, completed FROM migration_progress WHERE collection = ?",
+            (name,),
+        ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO migration_progress VALUES (?, ?, ?, 0, 0)", (name, size, mtime)
+                )
+            return 0, False
+        return row[2], bool(row[3])
+
+    def _normalize(self, name: str, data: Dict[str, Any], ordinal: int) -> Dict[str, Any]:
+        """
+        @description: 经数据模型往返一次，使写入的记录与SQLite存储保存的格式一致
+        @param {str} name: 集合名称
+        @param {Dict[str, Any]} data: 源记录
+        @param {int} ordinal: 记录在源文件中的序号（从0开始）
+        @return {Dict[str, Any]}: 规范化后的记录
+        """
+        model = COLLECTION_MODELS[name]
+        if model is not None:
+            data = model.from_dict(data).to_dict()
+        if name == "transactions" and data.get("transaction_id") is None:
+            data["transaction_id"] = -(ordinal + 1)
+        return data
+
+    def _write_batch(self, name: str, rows: List[tuple], records_done: int) -> None:
+        """
+        @description: 在一个事务中写入一批记录并推进迁移进度
+        @param {str} name: 集合名称
+        @param {List[tuple]} rows: 写入参数
+        @param {int} records_done: 本批提交后已处理的源记录数
+        """
+        with self._conn:
+            self._conn.executemany(build_upsert_sql(name), rows)
+            self._conn.execute(
+                "UPDATE migration_progress SET records_done = ? WHERE collection = ?", (records_done, name)
+            )
+
+    def migrate_collection(self, name: str) -> CollectionStats:
+        """
+        @description: 迁移单个集合
+        @param {str} name: 集合名称
+        @return {CollectionStats}: 迁移统计
+        """
+        stats = CollectionStats(name)
+        paths = self._source_paths(name) + self._archive_paths(name)
+        if not paths:
+            logger.info(f"{COLLECTION_LABELS[name]}文件不存在，跳过: {COLLECTIONS[name][0]}")
+            return stats
+        self._check_journal(name)
+
+        stat = [os.stat(path) for path in paths]
+        records_done, completed = self._load_progress(
+            name, sum(s.st_size for s in stat), max(s.st_mtime for s in stat)
+        )
+        if completed:
+            stats.skipped = records_done
+            return stats
+        stats.resumed = records_done > 0
+        if stats.resumed:
+            logger.info(f"{COLLECTION_LABELS[name]}从第 {records_done} 条记录继续迁移")
+
+        started = time.perf_counter()
+        rows = []
+        ordinal = -1
+        for ordinal, data in enumerate(self._iter_source(name)):
+            if ordinal < records_done:
+                stats.skipped += 1
+                continue
+            try:
+                rows.append(row_values(name, self._normalize(name, data, ordinal)))
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"第 {ordinal} 条{COLLECTION_LABELS[name]}无法迁移: {e!r}")
+                continue
+            if len(rows) >= self.batch_size:
+                self._write_batch(name, rows, ordinal + 1)
+                stats.records += len(rows)
+                rows = []
+
+        with self._conn:
+            if rows:
+                self._conn.executemany(build_upsert_sql(name), rows)
+                stats.records += len(rows)
+            if name == "transactions":
+                self._assign_placeholder_ids()
+            self._conn.execute(
+                "UPDATE migration_progress SET records_done = ?, completed = 1 WHERE collection = ?",
+                (ordinal + 1, name),
+            )
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def _assign_placeholder_ids(self) -> None:
+        """
+        @description: 为缺少交易ID的记录分配正式ID（接在现有最大ID之后，按写入顺序递增）
+        """
+        next_id = (self._conn.execute("SELECT MAX(transaction_id) FROM transactions").fetchone()[0] or 0) + 1
+        next_id = max(next_id, 1)
+        seqs = [seq for (seq,) in self._conn.execute(_PLACEHOLDER_ID_SQL)]
+        self._conn.executemany(
+            "UPDATE transactions SET transaction_id = ?, data = json_set(data, '$.transaction_id', ?) WHERE seq = ?",
+            [(next_id + i, next_id + i, seq) for i, seq in enumerate(seqs)],
+        )
+        if seqs:
+            logger.info(f"为 {len(seqs)} 条缺少ID的积分交易分配了新ID")
+
+    def migrate(self, collections: Optional[List[str]] = None) -> List[CollectionStats]:
+        """
+        @description: 依次迁移所有集合
+        @param {Optional[List[str]]} collections: 要迁移的集合，默认全部
+        @return {List[CollectionStats]}: 各集合的迁移统计
+        """
+        results = []
+        for name in collections or list(TABLE_COLUMNS):
+            stats = self.migrate_collection(name)
+            logger.info(
+                f"{COLLECTION_LABELS[name]}: 写入 {stats.records} 条，跳过 {stats.skipped} 条，"
+                f"失败 {stats.failed} 条，耗时 {stats.seconds:.2f}s，{stats.rate:,.0f} 条/秒"
+            )
+            results.append(stats)
+        return results
+
+    def _iter_source(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        @description: 流式读取集合的源记录：先读取归档分区，再读取快照；与存储加载时一致，跳过因归档中断仍留在快照中的已归档记录
+        @param {str} name: 集合名称
+        @return {Iterator[Dict[str, Any]]}: 源记录
+        """
+        cutoff = self._archive.cutoff(name) if name in ARCHIVE_DATE_FIELDS else None
+        if cutoff is not None:
+            yield from self._archive.iter_records(name)
+        key_field = COLLECTIONS[name][1]
+        # 分区名 -> 分区中的主键，只在快照中出现早于截止日期的记录时读取
+        archived_keys: Dict[str, Set[Any]] = {}
+        for path in self._source_paths(name):
+            for data in iter_snapshot(path):
+                day = record_date(name, data) if cutoff is not None else None
+                key = data.get(key_field)
+                if day is not None and day < cutoff and key is not None:
+                    month = month_key(day)
+                    if month not in archived_keys:
+                        archived_keys[month] = {
+                            record.get(key_field) for record in self._archive.read_partition(name, month)
+                        }
+                    if key in archived_keys[month]:
+                        continue
+                yield data
+
+    def verify(self) -> VerificationResult:
+        """
+        @description: 流式重新读取源文件（含归档分区），核对各表行数、每个用户的交易积分合计与积分余额
+        @return {VerificationResult}: 校验结果；存在重复交易ID的用户无法按源文件求和，单独列出而不参与比较
+        """
+        result = VerificationResult()
+        for name in TABLE_COLUMNS:
+            key_field = COLLECTIONS[name][1]
+            keys = set()
+            source_sums: Dict[int, int] = {}
+            missing_ids = 0
+            for data in self._iter_source(name):
+                key = data.get(key_field)
+                if name == "transactions":
+                    user_id = data.get("user_id")
+                    if key is None:
+                        missing_ids += 1
+                    elif key in keys:
+                        result.duplicate_users.add(user_id)
+                    source_sums[user_id] = source_sums.get(user_id, 0) + int(data.get("amount", 0))
+                if key is not None:
+                    keys.add(key)
+            target = self._conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            result.row_counts[name] = (len(keys) + missing_ids, target)
+
+            if name == "transactions":
+                target_sums = dict(self._conn.execute(
+                    "SELECT user_id, SUM(amount) FROM transactions GROUP BY user_id"
+                ))
+                for user_id in set(source_sums) | set(target_sums):
+                    if user_id in result.duplicate_users:
+                        continue
+                    source, migrated = source_sums.get(user_id, 0), target_sums.get(user_id, 0)
+                    if source != migrated:
+                        result.point_mismatches.append((user_id, "transactions", source, migrated))
+
+        source_points = {data.get("user_id"): data.get("points", 0) for data in self._iter_source("users")}
+        target_points = dict(self._conn.execute("SELECT user_id, json_extract(data, '$.points') FROM users"))
+        for user_id, points in source_points.items():
+            if target_points.get(user_id) != points:
+                result.point_mismatches.append((user_id, "points", points, target_points.get(user_id)))
+        return result
+
+
+def format_report(stats: List[CollectionStats], verification: Optional[VerificationResult] = None) -> str:
+    """
+    @description: 生成迁移吞吐量与校验结果报告
+    @param {List[CollectionStats]} stats: 各集合迁移统计
+    @param {Optional[VerificationResult]} verification: 校验结果
+    @return {str}: 报告文本
+    """
+    lines = [f"{'集合':<22}{'写入':>10}{'跳过':>10}{'失败':>8}{'耗时(s)':>10}{'条/秒':>12}"]
+    for s in stats:
+        lines.append(f"{s.name:<22}{s.records:>10}{s.skipped:>10}{s.failed:>8}{s.seconds:>10.2f}{s.rate:>12,.0f}")
+    total_records = sum(s.records for s in stats)
+    total_seconds = sum(s.seconds for s in stats)
+    total_rate = total_records / total_seconds if total_seconds > 0 else 0.0
+    lines.append(f"{'合计':<22}{total_records:>10}{'':>10}{'':>8}{total_seconds:>10.2f}{total_rate:>12,.0f}")
+
+    if verification is not None:
+        lines.append("")
+        for name, (source, target) in verification.row_counts.items():
+            mark = "OK" if source == target else "不一致"
+            lines.append(f"{name:<22} 源 {source:>10}  目标 {target:>10}  {mark}")
+        for user_id, kind, source, target in verification.point_mismatches[:20]:
+            lines.append(f"用户 {user_id} {kind} 不一致: 源 {source} 目标 {target}")
+        if len(verification.point_mismatches) > 20:
+            lines.append(f"... 共 {len(verification.point_mismatches)} 处积分不一致")
+        if verification.duplicate_users:
+            lines.append(f"{len(verification.duplicate_users)} 个用户存在重复交易ID，未参与积分合计比较")
+        lines.append("校验通过" if verification.ok else "校验失败")
+    return "\n".join(lines)
@@ -1,8 +1,10 @@
 """
 @description: 数据模型模块，定义系统中使用的数据模型
 """
-from dataclasses import dataclass, field
+import sys
+from dataclasses import dataclass, field, fields
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 from typing import Optional, List, Dict, Any, Union
 from enum import Enum, auto
 from ..config.constants import (
@@ -28,6 +30,31 @@ class RecoveryStatus(Enum):
     EXPIRED = "已过期"
     CANCELLED = "已取消"
 
+def slotted(cls):
+    """
+    @description: 为数据类生成使用 __slots__ 的版本，去掉每个实例的 __dict__（兼容 Python 3.8，等价于 3.10 的 dataclass(slots=True)）
+    @param {type} cls: 已经过 @dataclass 处理的类
+    @return {type}: 字段保存在槽中的新类
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {k: v for k, v in cls.__dict__.items() if k not in names + ("__dict__", "__weakref__")}
+    namespace["__slots__"] = names
+    new_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls
+
+# 大量记录共享的重复值：日期与描述文本只保留一份
+_intern = sys.intern
+
+@lru_cache(maxsize=4096)
+def _shared_date(value: str) -> date:
+    """
+    @description: 解析日期字符串，相同日期返回同一个对象
+    @param {str} value: ISO格式日期
+    @return {date}: 日期对象
+    """
+    return date.fromisoformat(value)
+
 @dataclass
 class User:
     """用户数据模型"""
@@ -134,6 +161,7 @@ class User:
             last_active=datetime.fromisoformat(data["last_active"]) if data.get("last_active") else None
         )
 
+@slotted
 @dataclass
 class PointsTransaction:
     """积分交易数据模型"""
@@ -183,14 +211,15 @@ class PointsTransaction:
             transaction_id=data.get("transaction_id"),
             user_id=data["user_id"],
             amount=data["amount"],
-            transaction_type=next(t for t in PointsTransactionType if t.value == data["transaction_type"]),
-            description=data["description"],
+            transaction_type=PointsTransactionType(data["transaction_type"]),
+            description=_intern(data["description"]),
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else datetime.now(),
             related_user_id=data.get("related_user_id"),
-            status=next(s for s in TransactionStatus if s.value == data["status"]) if data.get("status") else TransactionStatus.COMPLETED,
+            status=TransactionStatus(data["status"]) if data.get("status") else TransactionStatus.COMPLETED,
             expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None
         )
 
+@slotted
 @dataclass
 class CheckinRecord:
     """签到记录数据模型"""
@@ -227,13 +256,14 @@ class CheckinRecord:
         return cls(
             record_id=data.get("record_id"),
             user_id=data["user_id"],
-            checkin_date=date.fromisoformat(data["checkin_date"]),
+            checkin_date=_shared_date(data["checkin_date"]),
             points_earned=data["points_earned"],
             streak_bonus=data.get("streak_bonus", 0),
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else datetime.now(),
             is_makeup=data.get("is_makeup", False)
         )
 
+@slotted
 @dataclass
 class EmailVerification:
     """邮箱验证数据模型"""
@@ -277,11 +307,11 @@ class EmailVerification:
         obj = cls(
             verification_id=data.get("verification_id"),
             user_id=data["user_id"],
-            email=data["email"],
+            email=_intern(data["email"]),
             verification_code=data["verification_code"],
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else datetime.now(),
             expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
-            status=next(s for s in EmailVerifyStatus if s.value == data["status"]) if data.get("status") else EmailVerifyStatus.PENDING
+            status=EmailVerifyStatus(data["status"]) if data.get("status") else EmailVerifyStatus.PENDING
         )
         return obj
 
@@ -387,6 +417,7 @@ class Group:
             created_at=datetime.fromisoformat(data["created_at"]) if data.get("created_at") else datetime.now()
         )
 
+@slotted
 @dataclass
 class UserGroupAccess:
     """用户群组访问权限数据模型"""
@@ -395,6 +426,7 @@ class UserGroupAccess:
     start_date: datetime = field(default_factory=datetime.now)
     end_date: Optional[datetime] = None  # None表示永久
     access_id: Optional[int] = None
+    verified_at: Optional[datetime] = None  # 最近一次确认用户仍在群组中的时间，None表示从未确认
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -406,7 +438,8 @@ class UserGroupAccess:
             "user_id": self.user_id,
             "group_id": self.group_id,
             "start_date": self.start_date.isoformat(),
-            "end_date": self.end_date.isoformat() if self.end_date else None
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "verified_at": self.verified_at.isoformat() if self.verified_at else None
         }
     
     @classmethod
@@ -421,5 +454,6 @@ class UserGroupAccess:
             user_id=data["user_id"],
             group_id=data["group_id"],
             start_date=datetime.fromisoformat(data["start_date"]) if data.get("start_date") else datetime.now(),
-            end_date=datetime.fromisoformat(data["end_date"]) if data.get("end_date") else None
+            end_date=datetime.fromisoformat(data["end_date"]) if data.get("end_date") else None,
+            verified_at=datetime.fromisoformat(data["verified_at"]) if data.get("verified_at") else None
         ) 
\ No newline at end of file
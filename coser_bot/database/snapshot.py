@@ -0,0 +1,428 @@
+"""
+@description: 快照文件读写模块，提供带校验头的原子写入与校验读取；支持JSON与紧凑的二进制两种格式，读取时按文件头自动识别
+"""
+import os
+import json
+import zlib
+import codecs
+import struct
+import hashlib
+from typing import Any, Iterable, Iterator, List
+
+try:
+    import zstandard
+except ImportError:  # zstandard为可选依赖，未安装时不能使用zstd压缩
+    zstandard = None
+
+# 快照校验头前缀，格式为 "#coser-snapshot v1 sha256=<摘要>"，其后为JSON正文
+SNAPSHOT_HEADER_PREFIX = b"#coser-snapshot v1 sha256="
+
+# 流式读取时每次读取的字节数
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# JSON中的空白字符
+_JSON_WHITESPACE = " \t\n\r"
+
+# 快照格式
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+# 二进制快照：文件头之后是（可压缩的）记录块流，每块为4字节小端长度前缀加一个紧凑JSON数组
+BINARY_MAGIC = b"CSNB"
+# 二进制容器格式版本，文件头或记录编码方式变化时递增
+BINARY_FORMAT_VERSION = 1
+# 记录结构版本，数据模型发生不兼容变化时递增，旧程序拒绝读取新版本写入的快照
+SNAPSHOT_SCHEMA_VERSION = 1
+# 魔数、容器版本、结构版本、压缩方式、记录数、未压缩记录流的sha256
+_BINARY_HEADER = struct.Struct("<4sHHB3xQ32s")
+_BLOCK_LENGTH = struct.Struct("<I")
+
+# 压缩方式 -> 文件头中的编号
+COMPRESSION_CODES = {"none": 0, "gzip": 1, "zstd": 2}
+
+# 每个记录块包含的记录数，按块解析可以减少逐条解析的开销，同时限制读取时的内存占用
+BINARY_BLOCK_RECORDS = 1024
+
+# 写入二进制快照时的缓冲大小
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class SnapshotError(Exception):
+    """快照文件损坏或校验失败"""
+
+
+def write_snapshot(path: str, data: List[Any], fmt: str = FORMAT_JSON, compression: str = "none") -> int:
+    """
+    @description: 原子写入快照：先写临时文件并fsync，再重命名覆盖目标文件
+    @param {str} path: 快照文件路径
+    @param {List[Any]} data: 可序列化的记录列表
+    @param {str} fmt: 快照格式，json 或 binary
+    @param {str} compression: 二进制快照的压缩方式，none/gzip/zstd
+    @return {int}: 写入的字节数
+    """
+    if fmt == FORMAT_BINARY:
+        return write_binary_snapshot(path, data, compression)
+    body = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    content = SNAPSHOT_HEADER_PREFIX + hashlib.sha256(body).hexdigest().encode("ascii") + b"\n" + body
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(os.path.abspath(path)))
+    return len(content)
+
+
+def read_snapshot(path: str) -> List[Any]:
+    """
+    @description: 读取快照并校验摘要；兼容没有校验头的旧版JSON文件
+    @param {str} path: 快照文件路径
+    @return {List[Any]}: 记录列表
+    @raises {SnapshotError}: 文件被截断、摘要不匹配或JSON无法解析
+    """
+    if is_binary_snapshot(path):
+        return list(iter_binary_snapshot(path))
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    body = content
+    if content.startswith(SNAPSHOT_HEADER_PREFIX):
+        header, sep, body = content.partition(b"\n")
+        expected = header[len(SNAPSHOT_HEADER_PREFIX):].decode("ascii", "replace")
+        if not sep or hashlib.sha256(body).hexdigest() != expected:
+            raise SnapshotError(f"快照校验失败: {path}")
+
+    try:
+        return json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"快照解析失败: {path}: {e}") from e
+
+
+def iter_snapshot(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    @description: 流式读取快照中的记录，内存占用只与单条记录和读取块大小有关
+    @param {str} path: 快照文件路径
+    @param {int} chunk_size: 每次读取的字节数
+    @return {Iterator[Any]}: 记录迭代器；全部记录读出后才校验摘要，校验失败时抛出SnapshotError
+    @raises {SnapshotError}: 文件被截断、格式错误或摘要不匹配
+    """
+    if is_binary_snapshot(path):
+        yield from iter_binary_snapshot(path, chunk_size)
+        return
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        head = f.readline()
+        expected = None
+        if head.startswith(SNAPSHOT_HEADER_PREFIX):
+            expected = head[len(SNAPSHOT_HEADER_PREFIX):].strip().decode("ascii", "replace")
+            head = b""
+        digest.update(head)
+
+        buf = text_decoder.decode(head)
+        pos = 0
+        eof = False
+        state = "start"  # start -> first -> (item -> sep)* -> end
+
+        while state != "end":
+            while pos < len(buf) and buf[pos] in _JSON_WHITESPACE:
+                pos += 1
+
+            need_more = pos >= len(buf)
+            if not need_more:
+                ch = buf[pos]
+                if state == "start":
+                    if ch != "[":
+                        raise SnapshotError(f"快照格式错误，应为JSON数组: {path}")
+                    pos += 1
+                    state = "first"
+                    continue
+                if state in ("first", "sep") and ch == "]":
+                    pos += 1
+                    state = "end"
+                    continue
+                if state == "sep":
+                    if ch != ",":
+                        raise SnapshotError(f"快照格式错误: {path}")
+                    pos += 1
+                    state = "item"
+                    continue
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                    # 数字等标量可能恰好在块边界被截断，读取更多数据后重新解析
+                    need_more = end == len(buf) and not eof and not isinstance(record, (dict, list, str))
+                except json.JSONDecodeError:
+                    need_more = True
+                if not need_more:
+                    yield record
+                    pos = end
+                    state = "sep"
+                    continue
+
+            if eof:
+                raise SnapshotError(f"快照被截断: {path}")
+            chunk = f.read(chunk_size)
+            digest.update(chunk)
+            eof = not chunk
+            buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+            pos = 0
+
+        # 数组结束后只允许空白，同时读完剩余内容以完成摘要计算
+        trailing = buf[pos:]
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            trailing += text_decoder.decode(chunk)
+        if trailing.strip(_JSON_WHITESPACE):
+            raise SnapshotError(f"快照数组之后存在多余内容: {path}")
+
+    if expected is not None and digest.hexdigest() != expected:
+        raise SnapshotError(f"快照校验失败: {path}")
+
+
+def verify_snapshot(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> bool:
+    """
+    @description: 流式计算快照正文摘要并与校验头比较，不解析JSON
+    @param {str} path: 快照文件路径
+    @param {int} chunk_size: 每次读取的字节数
+    @return {bool}: 校验是否通过；没有校验头的旧版文件视为通过
+    """
+    if is_binary_snapshot(path):
+        try:
+            for _ in iter_binary_snapshot(path, chunk_size):
+                pass
+        except SnapshotError:
+            return False
+        return True
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = f.readline()
+        if not head.startswith(SNAPSHOT_HEADER_PREFIX):
+            return True
+        expected = head[len(SNAPSHOT_HEADER_PREFIX):].strip().decode("ascii", "replace")
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest() == expected
+
+
+def is_binary_snapshot(path: str) -> bool:
+    """
+    @description: 根据文件头判断快照是否为二进制格式
+    @param {str} path: 快照文件路径
+    @return {bool}: 是否为二进制快照
+    """
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def resolve_format(fmt: str) -> str:
+    """
+    @description: 检查快照格式是否受支持
+    @param {str} fmt: 配置的快照格式
+    @return {str}: 快照格式
+    """
+    if fmt not in (FORMAT_JSON, FORMAT_BINARY):
+        raise ValueError(f"不支持的快照格式: {fmt}（可选 {FORMAT_JSON} 或 {FORMAT_BINARY}）")
+    return fmt
+
+
+def resolve_compression(compression: str) -> str:
+    """
+    @description: 检查压缩方式是否可用，未安装zstandard时zstd退化为gzip
+    @param {str} compression: 配置的压缩方式
+    @return {str}: 实际使用的压缩方式
+    """
+    if compression not in COMPRESSION_CODES:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    if compression == "zstd" and zstandard is None:
+        return "gzip"
+    return compression
+
+
+def _compressor(compression: str):
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        if zstandard is None:
+            raise SnapshotError("未安装zstandard，无法使用zstd压缩")
+        return zstandard.ZstdCompressor().compressobj()
+    if compression == "none":
+        return None
+    raise ValueError(f"不支持的压缩方式: {compression}")
+
+
+def _decompressor(code: int, path: str):
+    if code == COMPRESSION_CODES["gzip"]:
+        return zlib.decompressobj(31)
+    if code == COMPRESSION_CODES["zstd"]:
+        if zstandard is None:
+            raise SnapshotError(f"快照使用zstd压缩，需要安装zstandard: {path}")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if code == COMPRESSION_CODES["none"]:
+        return None
+    raise SnapshotError(f"未知的快照压缩方式 {code}: {path}")
+
+
+def write_binary_snapshot(path: str, data: Iterable[Any], compression: str = "none") -> int:
+    """
+    @description: 原子写入二进制快照，记录按块编码，文件头中的记录数与摘要在记录流写完后回填
+    @param {str} path: 快照文件路径
+    @param {Iterable[Any]} data: 可序列化的记录
+    @param {str} compression: 压缩方式，none/gzip/zstd
+    @return {int}: 写入的字节数
+    """
+    compressor = _compressor(compression)
+    digest = hashlib.sha256()
+    count = 0
+    buf = bytearray()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(bytes(_BINARY_HEADER.size))
+
+        def drain(final: bool = False) -> None:
+            chunk = bytes(buf)
+            buf.clear()
+            digest.update(chunk)
+            if compressor is None:
+                f.write(chunk)
+                return
+            f.write(compressor.compress(chunk))
+            if final:
+                f.write(compressor.flush())
+
+        def add_block(block: List[Any]) -> None:
+            body = json.dumps(block, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            buf.extend(_BLOCK_LENGTH.pack(len(body)))
+            buf.extend(body)
+            if len(buf) >= _WRITE_BUFFER_SIZE:
+                drain()
+
+        block = []
+        for record in data:
+            block.append(record)
+            count += 1
+            if len(block) >= BINARY_BLOCK_RECORDS:
+                add_block(block)
+                block = []
+        if block:
+            add_block(block)
+        drain(final=True)
+
+        size = f.tell()
+        f.seek(0)
+        f.write(_BINARY_HEADER.pack(
+            BINARY_MAGIC, BINARY_FORMAT_VERSION, SNAPSHOT_SCHEMA_VERSION,
+            COMPRESSION_CODES[compression], count, digest.digest()
+        ))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(os.path.abspath(path)))
+    return size
+
+
+def iter_binary_snapshot(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    @description: 流式读取二进制快照中的记录
+    @param {str} path: 快照文件路径
+    @param {int} chunk_size: 每次读取的字节数
+    @return {Iterator[Any]}: 记录迭代器；全部记录读出后才校验记录数与摘要
+    @raises {SnapshotError}: 版本不支持、文件被截断或摘要不匹配
+    """
+    with open(path, "rb") as f:
+        header = f.read(_BINARY_HEADER.size)
+        if len(header) < _BINARY_HEADER.size:
+            raise SnapshotError(f"快照被截断: {path}")
+        magic, format_version, schema_version, code, count, expected = _BINARY_HEADER.unpack(header)
+        if magic != BINARY_MAGIC:
+            raise SnapshotError(f"不是二进制快照: {path}")
+        if format_version > BINARY_FORMAT_VERSION or schema_version > SNAPSHOT_SCHEMA_VERSION:
+            raise SnapshotError(
+                f"快照版本过新（容器 v{format_version}，结构 v{schema_version}），请升级程序: {path}"
+            )
+        decompressor = _decompressor(code, path)
+
+        # 记录流就是全部未压缩数据，摘要按块计算即可
+        digest = hashlib.sha256()
+        decode = json.JSONDecoder().decode
+        unpack_length = _BLOCK_LENGTH.unpack_from
+        prefix = _BLOCK_LENGTH.size
+        buf = b""
+        pos = 0
+        read = 0
+        eof = False
+        while True:
+            size = len(buf)
+            while size - pos >= prefix:
+                (length,) = unpack_length(buf, pos)
+                end = pos + prefix + length
+                if end > size:
+                    break
+                try:
+                    block = decode(buf[pos + prefix:end].decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    raise SnapshotError(f"快照解析失败: {path}: {e}") from e
+                yield from block
+                read += len(block)
+                pos = end
+            if eof:
+                break
+
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            try:
+                if decompressor is None:
+                    data = chunk
+                elif chunk:
+                    data = decompressor.decompress(chunk)
+                else:
+                    data = decompressor.flush() if code == COMPRESSION_CODES["gzip"] else b""
+            except Exception as e:
+                raise SnapshotError(f"快照解压失败: {path}: {e}") from e
+            digest.update(data)
+            buf = buf[pos:] + data
+            pos = 0
+
+    if pos != len(buf) or read != count:
+        raise SnapshotError(f"快照被截断: {path}")
+    if digest.digest() != expected:
+        raise SnapshotError(f"快照校验失败: {path}")
+
+
+def convert_snapshot(src: str, dst: str = None, fmt: str = FORMAT_BINARY, compression: str = "none") -> int:
+    """
+    @description: 在JSON与二进制快照之间转换，源文件格式自动识别
+    @param {str} src: 源快照文件
+    @param {str} dst: 目标文件，默认原地转换
+    @param {str} fmt: 目标格式，json 或 binary
+    @param {str} compression: 目标为二进制时的压缩方式
+    @return {int}: 写入的字节数
+    """
+    return write_snapshot(dst or src, read_snapshot(src), fmt, compression)
+
+
+def fsync_dir(dir_path: str) -> None:
+    """
+    @description: fsync目录以持久化重命名操作（Windows不支持打开目录，直接跳过）
+    @param {str} dir_path: 目录路径
+    """
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,1009 @@
+"""
+@description: SQLite存储后端，实现与JSON存储相同的Storage接口，按行读写数据
+"""
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Iterable
+from datetime import datetime, date, timedelta
+
+from ..config import config
+from .models import (
+    User, CheckinRecord, PointsTransaction, EmailVerification,
+    Group, UserGroupAccess, PointsTransactionType, EmailVerifyStatus,
+    RecoveryRequest, RecoveryStatus
+)
+from .storage import COLLECTIONS, COLLECTION_MODELS, COLLECTION_LABELS
+from .checkin_columns import distribution
+
+logger = logging.getLogger(__name__)
+
+# 建表语句：主键与常用查询字段单独成列并建立索引，完整记录以JSON保存在data列
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    email_norm TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users (email_norm);
+
+CREATE TABLE IF NOT EXISTS checkin_records (
+    record_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    checkin_date TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkin_user_date ON checkin_records (user_id, checkin_date);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY,
+    transaction_id UNIQUE NOT NULL,
+    user_id INTEGER NOT NULL,
+    related_user_id INTEGER,
+    transaction_type TEXT,
+    amount INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_time ON transactions (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_related_time ON transactions (related_user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS email_verifications (
+    verification_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    verification_code TEXT NOT NULL,
+    status TEXT,
+    expires_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_verifications_code ON email_verifications (verification_code);
+CREATE INDEX IF NOT EXISTS idx_verifications_user ON email_verifications (user_id);
+
+CREATE TABLE IF NOT EXISTS groups (
+    group_id INTEGER PRIMARY KEY,
+    chat_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_groups_chat ON groups (chat_id);
+
+CREATE TABLE IF NOT EXISTS user_group_access (
+    access_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    group_id INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_access_user_group ON user_group_access (user_id, group_id);
+CREATE INDEX IF NOT EXISTS idx_access_group ON user_group_access (group_id);
+
+CREATE TABLE IF NOT EXISTS recovery_requests (
+    request_id TEXT PRIMARY KEY,
+    old_user_id INTEGER,
+    new_user_id INTEGER,
+    email TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recovery_old_user ON recovery_requests (old_user_id);
+CREATE INDEX IF NOT EXISTS idx_recovery_new_user ON recovery_requests (new_user_id, status);
+CREATE INDEX IF NOT EXISTS idx_recovery_email ON recovery_requests (email);
+
+CREATE TABLE IF NOT EXISTS invite_links (
+    invite_link TEXT PRIMARY KEY,
+    user_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invite_links_user ON invite_links (user_id);
+CREATE TABLE IF NOT EXISTS id_sequences (
+    name TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+"""
+
+# 集合名称 -> 用于推算下一个整数ID的列（即记录的主键列，新ID不能与已有主键冲突）
+ID_COLUMNS = {
+    "checkin_records": "record_id",
+    "transactions": "transaction_id",
+    "email_verifications": "verification_id",
+    "user_group_access": "access_id",
+}
+
+# 集合名称 -> 除data外需要写入的列（值取自记录字典的同名字段）
+TABLE_COLUMNS = {
+    "users": ("user_id", "email_norm"),
+    "checkin_records": ("record_id", "user_id", "checkin_date"),
+    "transactions": ("transaction_id", "user_id", "related_user_id", "transaction_type", "amount", "created_at"),
+    "email_verifications": ("verification_id", "user_id", "verification_code", "status", "expires_at"),
+    "groups": ("group_id", "chat_id"),
+    "user_group_access": ("access_id", "user_id", "group_id"),
+    "recovery_requests": ("request_id", "old_user_id", "new_user_id", "email", "status"),
+    "invite_links": ("invite_link", "user_id"),
+}
+
+# 默认群组，与JSON存储初始化的数据保持一致
+DEFAULT_GROUPS = [
+    Group(group_id=1, group_name="Coser社群", chat_id=-1002295555543, is_topics_group=True),
+    Group(group_id=2, group_name="Coser权益群", chat_id=-1002317028637, is_paid=True,
+          required_points=1000, access_days=30),
+]
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """
+    @description: 统一邮箱大小写与首尾空白
+    @param {Optional[str]} email: 邮箱
+    @return {Optional[str]}: 规范化后的邮箱，为空时返回None
+    """
+    return email.strip().lower() if email else None
+
+
+def build_upsert_sql(name: str) -> str:
+    """
+    @description: 生成集合对应表的插入或更新语句
+    @param {str} name: 集合名称
+    @return {str}: SQL语句，参数顺序与row_values一致
+    """
+    key = COLLECTIONS[name][1]
+    all_columns = TABLE_COLUMNS[name] + ("data",)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in all_columns if c != key)
+    return (
+        f"INSERT INTO {name} ({', '.join(all_columns)}) "
+        f"VALUES ({', '.join('?' for _ in all_columns)}) "
+        f"ON CONFLICT({key}) DO UPDATE SET {updates}"
+    )
+
+
+def build_insert_sql(name: str) -> str:
+    """
+    @description: 生成集合对应表的插入语句，主键冲突时报错而不是覆盖已有记录
+    @param {str} name: 集合名称
+    @return {str}: SQL语句，参数顺序与row_values一致
+    """
+    all_columns = TABLE_COLUMNS[name] + ("data",)
+    return f"INSERT INTO {name} ({', '.join(all_columns)}) VALUES ({', '.join('?' for _ in all_columns)})"
+
+
+def row_values(name: str, data: Dict[str, Any]) -> tuple:
+    """
+    @description: 由记录字典生成写入语句的参数
+    @param {str} name: 集合名称
+    @param {Dict[str, Any]} data: 记录字典
+    @return {tuple}: 参数元组
+    """
+    values = []
+    for column in TABLE_COLUMNS[name]:
+        if column == "email_norm":
+            values.append(normalize_email(data.get("email")))
+        else:
+            values.append(data.get(column))
+    values.append(json.dumps(data, ensure_ascii=False))
+    return tuple(values)
+
+
+class SQLiteStorage:
+    """SQLite存储类，接口与Storage一致，每次读写只涉及相关的行"""
+
+    def __init__(self, db_path: str = None):
+        """
+        @description: 打开数据库并初始化表结构
+        @param {str} db_path: 数据库文件路径，默认读取配置 STORAGE_SQLITE_PATH
+        """
+        self.db_path = db_path or config.STORAGE_SQLITE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        # 同一连接在事件循环线程与任务线程间共享，由锁串行化
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # 预先生成每张表的写入语句，sqlite3按SQL文本缓存预编译语句
+        self._upsert_sql = {name: build_upsert_sql(name) for name in TABLE_COLUMNS}
+        self._insert_sql = {name: build_insert_sql(name) for name in TABLE_COLUMNS}
+
+        if self._scalar("SELECT COUNT(*) FROM groups") == 0:
+            for group in DEFAULT_GROUPS:
+                self.save_group(group)
+        logger.info(f"SQLite存储已打开: {self.db_path}")
+
+    # 通用读写方法
+    def _scalar(self, sql: str, params: Iterable[Any] = ()) -> Any:
+        """
+        @description: 执行查询并返回第一行第一列
+        @param {str} sql: SQL语句
+        @param {Iterable[Any]} params: 参数
+        @return {Any}: 查询结果，没有结果时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(sql, tuple(params)).fetchone()
+        return row[0] if row else None
+
+    def _query(self, name: str, where: str = "", params: Iterable[Any] = (), suffix: str = "") -> List[Any]:
+        """
+        @description: 查询集合记录并转换为数据模型
+        @param {str} name: 集合名称
+        @param {str} where: WHERE条件
+        @param {Iterable[Any]} params: 参数
+        @param {str} suffix: ORDER BY / LIMIT 等附加子句
+        @return {List[Any]}: 记录列表
+        """
+        sql = f"SELECT data FROM {name}"
+        if where:
+            sql += f" WHERE {where}"
+        if suffix:
+            sql += f" {suffix}"
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(params)).fetchall()
+        model = COLLECTION_MODELS[name]
+        return [json.loads(data) if model is None else model.from_dict(json.loads(data)) for (data,) in rows]
+
+    def _query_one(self, name: str, where: str, params: Iterable[Any] = (), suffix: str = "") -> Optional[Any]:
+        """
+        @description: 查询单条集合记录
+        @param {str} name: 集合名称
+        @param {str} where: WHERE条件
+        @param {Iterable[Any]} params: 参数
+        @param {str} suffix: ORDER BY 等附加子句
+        @return {Optional[Any]}: 记录对象，不存在则返回None
+        """
+        records = self._query(name, where, params, f"{suffix} LIMIT 1".strip())
+        return records[0] if records else None
+
+    def _row_params(self, name: str, record: Any) -> tuple:
+        """
+        @description: 生成写入语句的参数
+        @param {str} name: 集合名称
+        @param {Any} record: 记录对象
+        @return {tuple}: 参数元组
+        """
+        data = record if COLLECTION_MODELS[name] is None else record.to_dict()
+        return row_values(name, data)
+
+    def _upsert(self, name: str, record: Any) -> bool:
+        """
+        @description: 插入或更新一条记录
+        @param {str} name: 集合名称
+        @param {Any} record: 记录对象
+        @return {bool}: 是否成功
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(self._upsert_sql[name], self._row_params(name, record))
+            return True
+        except Exception as e:
+            logger.error(f"保存{COLLECTION_LABELS[name]}失败: {e}")
+            return False
+
+    def reserve_ids(self, name: str, count: int) -> range:
+        """
+        @description: 预留一段连续的整数ID；已分配的位置保存在 id_sequences 表中，删除记录后ID也不会被复用
+        @param {str} name: 集合名称，见 ID_COLUMNS
+        @param {int} count: 预留数量
+        @return {range}: 预留的ID区间
+        """
+        if count < 1:
+            raise ValueError("count 必须大于0")
+        with self._lock, self._conn:
+            stored = self._scalar("SELECT next_id FROM id_sequences WHERE name = ?", (name,)) or 1
+            # 迁移工具等直接写入的记录不经过序列，取两者中较大的一个；交易ID可能为字符串，只统计整数ID
+            column = ID_COLUMNS[name]
+            floor = self._scalar(f"SELECT MAX({column}) FROM {name} WHERE typeof({column}) = 'integer'") or 0
+            start = max(stored, floor + 1)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO id_sequences (name, next_id) VALUES (?, ?)", (name, start + count)
+            )
+        return range(start, start + count)
+
+    def _next_id(self, name: str) -> int:
+        """
+        @description: 分配下一个整数ID
+        @param {str} name: 集合名称
+        @return {int}: 新ID
+        """
+        return self.reserve_ids(name, 1).start
+
+    # 生命周期
+    def flush(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 每次写入已在事务中提交，无需额外刷新
+        @return {Dict[str, Dict[str, float]]}: 空字典
+        """
+        return {}
+
+    def get_flush_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 与JSON存储接口保持一致，SQLite后端没有快照刷新统计
+        @return {Dict[str, Dict[str, float]]}: 空字典
+        """
+        return {}
+
+    def get_load_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 与JSON存储接口保持一致，SQLite后端启动时不加载集合
+        @return {Dict[str, Dict[str, float]]}: 空字典
+        """
+        return {}
+
+    def get_loaded_collections(self) -> List[str]:
+        """
+        @description: 与JSON存储接口保持一致，SQLite后端不在内存中缓存集合
+        @return {List[str]}: 空列表
+        """
+        return []
+
+    def close(self) -> None:
+        """
+        @description: 合并WAL并关闭数据库连接
+        """
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
+
+    def backup_data(self) -> bool:
+        """
+        @description: 使用SQLite在线备份接口备份数据库
+        @return {bool}: 是否备份成功
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_dir = os.path.join(config.BACKUP_DIR, f"backup_{timestamp}")
+        os.makedirs(backup_dir, exist_ok=True)
+
+        try:
+            target = sqlite3.connect(os.path.join(backup_dir, os.path.basename(self.db_path)))
+            with self._lock:
+                self._conn.backup(target)
+            target.close()
+            logger.info(f"数据已备份到 {backup_dir}")
+            return True
+        except Exception as e:
+            logger.error(f"数据备份失败: {e}")
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            return False
+
+    # 整表视图（仅用于统计等低频场景，每次访问都会读取整张表）
+    @property
+    def users(self) -> Dict[int, User]:
+        return {user.user_id: user for user in self._query("users")}
+
+    @property
+    def groups(self) -> Dict[int, Group]:
+        return {group.group_id: group for group in self._query("groups")}
+
+    @property
+    def checkin_records(self) -> List[CheckinRecord]:
+        return self._query("checkin_records", suffix="ORDER BY record_id")
+
+    @property
+    def transactions(self) -> List[PointsTransaction]:
+        return self._query("transactions", suffix="ORDER BY seq")
+
+    @property
+    def email_verifications(self) -> List[EmailVerification]:
+        return self._query("email_verifications", suffix="ORDER BY verification_id")
+
+    @property
+    def user_group_access(self) -> List[UserGroupAccess]:
+        return self._query("user_group_access", suffix="ORDER BY access_id")
+
+    @property
+    def recovery_requests(self) -> List[RecoveryRequest]:
+        return self._query("recovery_requests", suffix="ORDER BY rowid")
+
+    @property
+    def invite_links(self) -> List[Dict[str, Any]]:
+        return self._query("invite_links", suffix="ORDER BY rowid")
+
+    # 用户相关方法
+    def get_user(self, user_id: int) -> Optional[User]:
+        """
+        @description: 获取用户信息
+        @param {int} user_id: 用户ID
+        @return {Optional[User]}: 用户对象，不存在则返回None
+        """
+        return self._query_one("users", "user_id = ?", (user_id,))
+
+    def save_user(self, user: User) -> bool:
+        """
+        @description: 保存用户信息
+        @param {User} user: 用户对象
+        @return {bool}: 是否保存成功
+        """
+        return self._upsert("users", user)
+
+    def get_all_users(self) -> List[User]:
+        """
+        @description: 获取所有用户列表
+        @return {List[User]}: 用户列表
+        """
+        return self._query("users")
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """
+        @description: 根据邮箱获取用户（不区分大小写）
+        @param {str} email: 邮箱
+        @return {Optional[User]}: 用户对象
+        """
+        return self._query_one("users", "email_norm = ?", (normalize_email(email),))
+
+    # 签到记录相关方法
+    def add_checkin_record(self, record: CheckinRecord) -> bool:
+        """
+        @description: 添加签到记录
+        @param {CheckinRecord} record: 签到记录对象
+        @return {bool}: 是否添加成功
+        """
+        with self._lock:
+            if record.record_id is None:
+                record.record_id = self._next_id("checkin_records")
+            return self._upsert("checkin_records", record)
+
+    def get_user_checkin_records(self, user_id: int, limit: int = 30) -> List[CheckinRecord]:
+        """
+        @description: 获取用户的签到记录，最新的在前
+        @param {int} user_id: 用户ID
+        @param {int} limit: 返回记录数量限制
+        @return {List[CheckinRecord]}: 签到记录列表
+        """
+        return self._query("checkin_records", "user_id = ?", (user_id, limit),
+                           "ORDER BY checkin_date DESC LIMIT ?")
+
+    def get_user_checkin_record_by_date(self, user_id: int, checkin_date: date) -> Optional[CheckinRecord]:
+        """
+        @description: 获取用户指定日期的签到记录
+        @param {int} user_id: 用户ID
+        @param {date} checkin_date: 签到日期
+        @return {Optional[CheckinRecord]}: 签到记录，不存在则返回None
+        """
+        return self._query_one("checkin_records", "user_id = ? AND checkin_date = ?",
+                               (user_id, checkin_date.isoformat()))
+
+    def get_user_last_checkin_record(self, user_id: int) -> Optional[CheckinRecord]:
+        """
+        @description: 获取用户最后一次签到记录
+        @param {int} user_id: 用户ID
+        @return {Optional[CheckinRecord]}: 签到记录，不存在则返回None
+        """
+        return self._query_one("checkin_records", "user_id = ?", (user_id,), "ORDER BY checkin_date DESC")
+
+    def get_user_continuous_checkin_days(self, user_id: int) -> int:
+        """
+        @description: 获取用户连续签到天数
+        @param {int} user_id: 用户ID
+        @return {int}: 连续签到天数
+        """
+        user = self.get_user(user_id)
+        return user.streak_days if user else 0
+
+    def count_checkins_on(self, checkin_date: date) -> int:
+        """
+        @description: 统计某天的签到次数
+        @param {date} checkin_date: 签到日期
+        @return {int}: 签到次数
+        """
+        return self._scalar("SELECT COUNT(*) FROM checkin_records WHERE checkin_date = ?", (checkin_date.isoformat(),))
+
+    def get_checkin_counts_by_user(self, start: date, end: date) -> Dict[int, int]:
+        """
+        @description: 统计日期区间内每个用户的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[int, int]}: 用户ID -> 签到次数，没有签到的用户不出现
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, COUNT(*) FROM checkin_records WHERE checkin_date >= ? AND checkin_date < ? "
+                "GROUP BY user_id",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        return dict(rows)
+
+    def get_daily_checkin_counts(self, start: date, end: date) -> Dict[date, int]:
+        """
+        @description: 统计日期区间内每天的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[date, int]}: 日期 -> 签到次数
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT checkin_date, COUNT(*) FROM checkin_records WHERE checkin_date >= ? AND checkin_date < ? "
+                "GROUP BY checkin_date",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        counts = {date.fromisoformat(day): count for day, count in rows}
+        return {start + timedelta(days=i): counts.get(start + timedelta(days=i), 0) for i in range((end - start).days)}
+
+    def get_checkin_points_by_user(self) -> Dict[int, int]:
+        """
+        @description: 统计每个用户通过签到获得的积分（含连续签到奖励）
+        @return {Dict[int, int]}: 用户ID -> 积分
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, SUM(COALESCE(json_extract(data, '$.points_earned'), 0) "
+                "+ COALESCE(json_extract(data, '$.streak_bonus'), 0)) FROM checkin_records GROUP BY user_id"
+            ).fetchall()
+        return dict(rows)
+
+    def get_checkin_count_distribution(self, start: date, end: date) -> Dict[str, Optional[float]]:
+        """
+        @description: 统计日期区间内有签到的用户的签到次数分布
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[str, Optional[float]]}: users/mean/median/p90/max
+        """
+        return distribution(list(self.get_checkin_counts_by_user(start, end).values()))
+
+    def get_user_checkin_count(self, user_id: int) -> int:
+        """
+        @description: 获取用户的签到总次数
+        @param {int} user_id: 用户ID
+        @return {int}: 签到次数
+        """
+        return self._scalar("SELECT COUNT(*) FROM checkin_records WHERE user_id = ?", (user_id,))
+
+    def get_total_checkin_count(self) -> int:
+        """
+        @description: 获取所有用户的签到总次数
+        @return {int}: 签到次数
+        """
+        return self._scalar("SELECT COUNT(*) FROM checkin_records")
+
+    # 积分交易相关方法
+    def get_total_transaction_count(self) -> int:
+        """
+        @description: 获取所有用户的积分交易总数
+        @return {int}: 交易数
+        """
+        return self._scalar("SELECT COUNT(*) FROM transactions")
+
+    def add_transaction(self, transaction: PointsTransaction) -> bool:
+        """
+        @description: 添加积分交易记录；交易ID已存在时添加失败，不会覆盖已有记录
+        @param {PointsTransaction} transaction: 积分交易记录对象
+        @return {bool}: 是否添加成功
+        """
+        with self._lock:
+            if transaction.transaction_id is None:
+                transaction.transaction_id = self._next_id("transactions")
+            try:
+                with self._conn:
+                    self._conn.execute(self._insert_sql["transactions"], self._row_params("transactions", transaction))
+                return True
+            except sqlite3.IntegrityError:
+                logger.error(f"添加积分交易记录失败: 交易ID {transaction.transaction_id} 已存在")
+                return False
+            except Exception as e:
+                logger.error(f"添加积分交易记录失败: {e}")
+                return False
+
+    def save_transaction(self, transaction: PointsTransaction) -> bool:
+        """
+        @description: 保存积分交易记录；没有交易ID时新增，交易ID已存在时更新
+        @param {PointsTransaction} transaction: 积分交易记录对象
+        @return {bool}: 是否保存成功
+        """
+        if transaction.transaction_id is None:
+            return self.add_transaction(transaction)
+        return self._upsert("transactions", transaction)
+
+    def get_transaction(self, transaction_id: Any) -> Optional[PointsTransaction]:
+        """
+        @description: 根据交易ID获取积分交易记录
+        @param {Any} transaction_id: 交易ID
+        @return {Optional[PointsTransaction]}: 积分交易记录，不存在则返回None
+        """
+        return self._query_one("transactions", "transaction_id = ?", (transaction_id,))
+
+    def update_transaction(self, transaction: PointsTransaction) -> bool:
+        """
+        @description: 原地更新积分交易记录
+        @param {PointsTransaction} transaction: 积分交易记录对象
+        @return {bool}: 是否更新成功
+        """
+        with self._lock:
+            if self._scalar("SELECT 1 FROM transactions WHERE transaction_id = ?", (transaction.transaction_id,)) is None:
+                logger.warning(f"要更新的积分交易不存在: {transaction.transaction_id}")
+                return False
+            return self._upsert("transactions", transaction)
+
+    def get_user_transactions(self, user_id: int, limit: int = 30) -> List[PointsTransaction]:
+        """
+        @description: 获取用户的积分交易记录，最新的在前
+        @param {int} user_id: 用户ID
+        @param {int} limit: 返回记录数量限制
+        @return {List[PointsTransaction]}: 积分交易记录列表
+        """
+        return self._query("transactions", "user_id = ?", (user_id, limit), "ORDER BY created_at DESC LIMIT ?")
+
+    def get_user_gift_transactions(self, user_id: int, limit: int = 10) -> List[PointsTransaction]:
+        """
+        @description: 获取用户发出和收到的赠送记录，最新的在前
+        @param {int} user_id: 用户ID
+        @param {int} limit: 返回记录数量限制
+        @return {List[PointsTransaction]}: 赠送记录列表
+        """
+        gift_types = [t.value for t in (PointsTransactionType.GIFT_SENT, PointsTransactionType.GIFT_RECEIVED)]
+        return self._query(
+            "transactions",
+            "(user_id = ? OR related_user_id = ?) AND transaction_type IN (?, ?)",
+            (user_id, user_id, *gift_types, limit),
+            "ORDER BY created_at DESC LIMIT ?"
+        )
+
+    def get_user_total_earned(self, user_id: int) -> int:
+        """
+        @description: 获取用户总收入积分
+        @param {int} user_id: 用户ID
+        @return {int}: 总收入积分
+        """
+        return self._scalar("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE user_id = ? AND amount > 0",
+                            (user_id,))
+
+    def get_user_total_spent(self, user_id: int) -> int:
+        """
+        @description: 获取用户总支出积分
+        @param {int} user_id: 用户ID
+        @return {int}: 总支出积分（正数）
+        """
+        return self._scalar("SELECT COALESCE(-SUM(amount), 0) FROM transactions WHERE user_id = ? AND amount < 0",
+                            (user_id,))
+
+    def get_user_transaction_summary(self, user_id: int) -> Dict[str, int]:
+        """
+        @description: 获取用户的交易汇总
+        @param {int} user_id: 用户ID
+        @return {Dict[str, int]}: count/earned/spent
+        """
+        with self._lock:
+            count, earned, spent = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(CASE WHEN amount > 0 THEN amount END), 0), "
+                "COALESCE(-SUM(CASE WHEN amount < 0 THEN amount END), 0) FROM transactions WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        return {"count": count, "earned": earned, "spent": spent}
+
+    def archive_old_records(self, horizon_days: int = None, today: date = None) -> Dict[str, int]:
+        """
+        @description: 与JSON存储接口保持一致，SQLite后端按索引查询历史记录，不需要归档
+        @return {Dict[str, int]}: 空字典
+        """
+        return {}
+
+    def iter_archived_records(self, name: str, start: date = None, end: date = None, user_id: int = None):
+        """
+        @description: 与JSON存储接口保持一致，SQLite后端没有归档记录
+        @return {Iterator[Any]}: 空迭代器
+        """
+        return iter(())
+
+    # 邮箱验证相关方法
+    def add_email_verification(self, verification: EmailVerification) -> bool:
+        """
+        @description: 添加邮箱验证记录
+        @param {EmailVerification} verification: 邮箱验证记录对象
+        @return {bool}: 是否添加成功
+        """
+        with self._lock:
+            if verification.verification_id is None:
+                verification.verification_id = self._next_id("email_verifications")
+            return self._upsert("email_verifications", verification)
+
+    def update_email_verification(self, verification: EmailVerification) -> bool:
+        """
+        @description: 更新邮箱验证记录，不存在时添加
+        @param {EmailVerification} verification: 验证记录
+        @return {bool}: 是否更新成功
+        """
+        with self._lock:
+            existing_id = self._scalar(
+                "SELECT verification_id FROM email_verifications WHERE user_id = ? AND verification_code = ? "
+                "ORDER BY verification_id LIMIT 1",
+                (verification.user_id, verification.verification_code)
+            )
+            if existing_id is not None:
+                verification.verification_id = existing_id
+            return self.add_email_verification(verification)
+
+    def prune_email_verifications(self, now: datetime = None) -> int:
+        """
+        @description: 删除过期超过保留时长且未完成验证的记录
+        @param {datetime} now: 当前时间，默认datetime.now()
+        @return {int}: 删除的记录数
+        """
+        cutoff = (now or datetime.now()) - timedelta(hours=config.STORAGE_VERIFICATION_RETENTION_HOURS)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM email_verifications WHERE status != ? AND expires_at < ?",
+                (EmailVerifyStatus.VERIFIED.value, cutoff.isoformat())
+            )
+        if cursor.rowcount:
+            logger.info(f"已清理 {cursor.rowcount} 条过期的邮箱验证记录")
+        return cursor.rowcount
+
+    def get_email_verifications_by_user(self, user_id: int) -> List[EmailVerification]:
+        """
+        @description: 获取用户的邮箱验证记录
+        @param {int} user_id: 用户ID
+        @return {List[EmailVerification]}: 邮箱验证记录列表
+        """
+        return self._query("email_verifications", "user_id = ?", (user_id,), "ORDER BY verification_id")
+
+    def get_email_verification(self, user_id: int, verification_code: str) -> Optional[EmailVerification]:
+        """
+        @description: 获取邮箱验证记录
+        @param {int} user_id: 用户ID
+        @param {str} verification_code: 验证码
+        @return {Optional[EmailVerification]}: 验证记录，不存在则返回None
+        """
+        return self._query_one("email_verifications", "user_id = ? AND verification_code = ?",
+                               (user_id, verification_code), "ORDER BY verification_id")
+
+    def get_email_verification_by_code(self, verification_code: str) -> Optional[EmailVerification]:
+        """
+        @description: 通过验证码获取邮箱验证记录，验证码重复时返回最新的一条
+        @param {str} verification_code: 验证码
+        @return {Optional[EmailVerification]}: 验证记录，不存在则返回None
+        """
+        return self._query_one("email_verifications", "verification_code = ?", (verification_code,),
+                               "ORDER BY verification_id DESC")
+
+    def get_user_pending_email_verifications(self, user_id: int) -> List[EmailVerification]:
+        """
+        @description: 获取用户待处理的邮箱验证记录
+        @param {int} user_id: 用户ID
+        @return {List[EmailVerification]}: 邮箱验证记录列表
+        """
+        return self._query("email_verifications", "user_id = ? AND status = ?",
+                           (user_id, EmailVerifyStatus.PENDING.value), "ORDER BY verification_id")
+
+    # 群组相关方法
+    def get_group(self, group_id: int) -> Optional[Group]:
+        """
+        @description: 获取群组信息
+        @param {int} group_id: 群组ID
+        @return {Optional[Group]}: 群组对象，不存在则返回None
+        """
+        return self._query_one("groups", "group_id = ?", (group_id,))
+
+    def save_group(self, group: Group) -> bool:
+        """
+        @description: 保存群组信息
+        @param {Group} group: 群组对象
+        @return {bool}: 是否保存成功
+        """
+        return self._upsert("groups", group)
+
+    def delete_group(self, group_id: int) -> bool:
+        """
+        @description: 删除群组
+        @param {int} group_id: 群组ID
+        @return {bool}: 是否删除成功
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM groups WHERE group_id = ?", (group_id,))
+        return cursor.rowcount > 0
+
+    def get_all_groups(self) -> List[Group]:
+        """
+        @description: 获取所有群组
+        @return {List[Group]}: 群组列表
+        """
+        return self._query("groups", suffix="ORDER BY group_id")
+
+    def get_group_by_chat_id(self, chat_id: int) -> Optional[Group]:
+        """
+        @description: 通过 chat_id 获取群组信息
+        @param {int} chat_id: Telegram 群组的 chat_id
+        @return {Optional[Group]}: 群组对象，不存在则返回None
+        """
+        return self._query_one("groups", "chat_id = ?", (chat_id,))
+
+    def get_user_groups(self, user_id: int) -> List[Group]:
+        """
+        @description: 获取用户有效访问权限对应的群组
+        @param {int} user_id: 用户ID
+        @return {List[Group]}: 群组列表
+        """
+        now = datetime.now()
+        groups = []
+        for access in self.get_user_group_accesses(user_id):
+            if access.end_date and access.end_date <= now:
+                continue
+            group = self.get_group(access.group_id)
+            if group:
+                groups.append(group)
+            else:
+                logger.warning(f"未找到群组ID {access.group_id} 的信息")
+        return groups
+
+    # 用户群组访问权限相关方法
+    def add_user_group_access(self, access: UserGroupAccess) -> bool:
+        """
+        @description: 添加用户群组访问权限
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {bool}: 是否添加成功
+        """
+        with self._lock:
+            if access.access_id is None:
+                access.access_id = self._next_id("user_group_access")
+            return self._upsert("user_group_access", access)
+
+    def update_user_group_access(self, access: UserGroupAccess) -> bool:
+        """
+        @description: 更新用户群组访问权限，不存在时添加
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {bool}: 是否更新成功
+        """
+        return self.add_user_group_access(access)
+
+    def remove_user_group_access(self, access: UserGroupAccess) -> bool:
+        """
+        @description: 删除用户群组访问权限
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {bool}: 是否删除成功
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM user_group_access WHERE access_id = ?", (access.access_id,))
+        return cursor.rowcount > 0
+
+    def apply_user_group_access_changes(self, added: List[UserGroupAccess],
+                                        removed: List[UserGroupAccess],
+                                        updated: List[UserGroupAccess] = ()) -> bool:
+        """
+        @description: 在一个事务中批量添加、删除与更新用户群组访问权限
+        @param {List[UserGroupAccess]} added: 要添加的访问权限
+        @param {List[UserGroupAccess]} removed: 要删除的访问权限
+        @param {List[UserGroupAccess]} updated: 已修改的访问权限
+        @return {bool}: 是否保存成功
+        """
+        if not added and not removed and not updated:
+            return True
+        try:
+            with self._lock:
+                missing_ids = [access for access in added if access.access_id is None]
+                if missing_ids:
+                    for access, access_id in zip(missing_ids, self.reserve_ids("user_group_access", len(missing_ids))):
+                        access.access_id = access_id
+                with self._conn:
+                    self._conn.executemany(
+                        self._upsert_sql["user_group_access"],
+                        [self._row_params("user_group_access", access) for access in list(added) + list(updated)]
+                    )
+                    self._conn.executemany(
+                        "DELETE FROM user_group_access WHERE access_id = ?",
+                        [(access.access_id,) for access in removed]
+                    )
+            return True
+        except Exception as e:
+            logger.error(f"批量更新用户群组访问权限失败: {e}")
+            return False
+
+    def get_user_group_access(self, user_id: int, group_id: int) -> Optional[UserGroupAccess]:
+        """
+        @description: 获取用户群组访问权限
+        @param {int} user_id: 用户ID
+        @param {int} group_id: 群组ID
+        @return {Optional[UserGroupAccess]}: 用户群组访问权限对象，不存在则返回None
+        """
+        return self._query_one("user_group_access", "user_id = ? AND group_id = ?", (user_id, group_id),
+                               "ORDER BY access_id")
+
+    def get_user_group_accesses(self, user_id: int) -> List[UserGroupAccess]:
+        """
+        @description: 获取用户的所有群组访问权限
+        @param {int} user_id: 用户ID
+        @return {List[UserGroupAccess]}: 用户群组访问权限列表
+        """
+        return self._query("user_group_access", "user_id = ?", (user_id,), "ORDER BY access_id")
+
+    def get_group_user_accesses(self, group_id: int) -> List[UserGroupAccess]:
+        """
+        @description: 获取群组的所有用户访问权限
+        @param {int} group_id: 群组ID
+        @return {List[UserGroupAccess]}: 用户群组访问权限列表
+        """
+        return self._query("user_group_access", "group_id = ?", (group_id,), "ORDER BY access_id")
+
+    # 恢复请求相关方法
+    def add_recovery_request(self, request: RecoveryRequest) -> bool:
+        """
+        @description: 添加恢复请求，相同ID的请求会被更新
+        @param {RecoveryRequest} request: 恢复请求对象
+        @return {bool}: 是否添加成功
+        """
+        return self._upsert("recovery_requests", request)
+
+    def update_recovery_request(self, request: RecoveryRequest) -> bool:
+        """
+        @description: 更新恢复请求，不存在时添加
+        @param {RecoveryRequest} request: 恢复请求对象
+        @return {bool}: 是否更新成功
+        """
+        return self._upsert("recovery_requests", request)
+
+    def get_recovery_request(self, request_id: str) -> Optional[RecoveryRequest]:
+        """
+        @description: 获取恢复请求
+        @param {str} request_id: 请求ID
+        @return {Optional[RecoveryRequest]}: 恢复请求对象，不存在则返回None
+        """
+        return self._query_one("recovery_requests", "request_id = ?", (request_id,))
+
+    def get_pending_recovery_request_by_new_user(self, user_id: int) -> Optional[RecoveryRequest]:
+        """
+        @description: 获取用户的待处理恢复请求
+        @param {int} user_id: 新用户ID
+        @return {Optional[RecoveryRequest]}: 恢复请求对象，不存在则返回None
+        """
+        return self._query_one("recovery_requests", "new_user_id = ? AND status = ?",
+                               (user_id, RecoveryStatus.PENDING.value), "ORDER BY rowid")
+
+    def get_recovery_requests_by_old_user(self, user_id: int) -> List[RecoveryRequest]:
+        """
+        @description: 获取原用户的所有恢复请求
+        @param {int} user_id: 原用户ID
+        @return {List[RecoveryRequest]}: 恢复请求列表
+        """
+        return self._query("recovery_requests", "old_user_id = ?", (user_id,), "ORDER BY rowid")
+
+    def get_recovery_requests_by_new_user(self, user_id: int) -> List[RecoveryRequest]:
+        """
+        @description: 获取新用户的所有恢复请求
+        @param {int} user_id: 新用户ID
+        @return {List[RecoveryRequest]}: 恢复请求列表
+        """
+        return self._query("recovery_requests", "new_user_id = ?", (user_id,), "ORDER BY rowid")
+
+    def get_recovery_requests_by_email(self, email: str) -> List[RecoveryRequest]:
+        """
+        @description: 获取邮箱的所有恢复请求
+        @param {str} email: 邮箱地址
+        @return {List[RecoveryRequest]}: 恢复请求列表
+        """
+        return self._query("recovery_requests", "email = ?", (email,), "ORDER BY rowid")
+
+    # 邀请链接相关方法
+    def add_invite_link(self, group_id: int, user_id: int, invite_link: str, expires_at: datetime) -> bool:
+        """
+        @description: 添加邀请链接
+        @param {int} group_id: 群组ID
+        @param {int} user_id: 用户ID
+        @param {str} invite_link: 邀请链接
+        @param {datetime} expires_at: 过期时间
+        @return {bool}: 是否添加成功
+        """
+        return self._upsert("invite_links", {
+            "group_id": group_id,
+            "user_id": user_id,
+            "invite_link": invite_link,
+            "created_at": datetime.now().isoformat(),
+            "expires_at": expires_at.isoformat(),
+            "is_used": False
+        })
+
+    def get_user_invite_links(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        @description: 获取用户的所有邀请链接
+        @param {int} user_id: 用户ID
+        @return {List[Dict[str, Any]]}: 邀请链接列表
+        """
+        return self._query("invite_links", "user_id = ?", (user_id,), "ORDER BY rowid")
+
+    def mark_invite_link_used(self, invite_link: str) -> bool:
+        """
+        @description: 标记邀请链接为已使用
+        @param {str} invite_link: 邀请链接
+        @return {bool}: 是否标记成功
+        """
+        with self._lock:
+            link = self._query_one("invite_links", "invite_link = ?", (invite_link,))
+            if link is None:
+                return False
+            link["is_used"] = True
+            return self._upsert("invite_links", link)
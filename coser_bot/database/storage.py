@@ -2,29 +2,229 @@
 @description: 数据存储模块，负责数据的持久化存储和读取
 """
 import os
+import sys
+import glob
 import json
 import logging
 from typing import List, Dict, Any, Optional, Union, Tuple
 from datetime import datetime, date, timedelta
 import shutil
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，无法统计峰值内存
+    resource = None
+
 from ..config import config
 from .models import (
     User, CheckinRecord, PointsTransaction, EmailVerification,
     Group, UserGroupAccess, PointsTransactionType, TransactionStatus, EmailVerifyStatus,
     RecoveryRequest, RecoveryStatus
 )
+from .journal import CollectionJournal, OP_PUT, OP_DELETE
+from .checkin_columns import CheckinColumns, distribution
+from .archive import ArchiveStore, ARCHIVE_DATE_FIELDS, month_key
+from .id_allocator import IdAllocator
+from .snapshot import write_snapshot, iter_snapshot, resolve_format, resolve_compression
 
 logger = logging.getLogger(__name__)
 
+# 集合名称 -> (数据文件名, 主键字段)
+COLLECTIONS: Dict[str, Tuple[str, str]] = {
+    "users": ("users.json", "user_id"),
+    "checkin_records": ("checkin_records.json", "record_id"),
+    "transactions": ("transactions.json", "transaction_id"),
+    "email_verifications": ("email_verifications.json", "verification_id"),
+    "groups": ("groups.json", "group_id"),
+    "user_group_access": ("user_group_access.json", "access_id"),
+    "recovery_requests": ("recovery_requests.json", "request_id"),
+    "invite_links": ("invite_links.json", "invite_link"),
+}
+
+# 集合名称 -> 数据模型（邀请链接直接以字典形式保存）
+COLLECTION_MODELS = {
+    "users": User,
+    "checkin_records": CheckinRecord,
+    "transactions": PointsTransaction,
+    "email_verifications": EmailVerification,
+    "groups": Group,
+    "user_group_access": UserGroupAccess,
+    "recovery_requests": RecoveryRequest,
+    "invite_links": None,
+}
+
+# 以字典形式（主键 -> 对象）保存在内存中的集合
+DICT_COLLECTIONS = ("users", "groups")
+
+# 按需加载模式下启动时立即加载的集合（签到、群消息等常用路径只涉及这两个集合）
+EAGER_COLLECTIONS = ("users", "groups")
+
+# 需要同步落盘的交易类型（积分赠送涉及双方余额，不能停留在延迟写入队列中）
+SYNC_TRANSACTION_TYPES = (PointsTransactionType.GIFT_SENT, PointsTransactionType.GIFT_RECEIVED)
+
+# 自动清理过期邮箱验证记录的最小间隔（秒）
+VERIFICATION_PRUNE_INTERVAL = 3600
+
+# 用户分片快照所在的子目录，分片文件名为 users_<序号>.json
+USER_SHARD_DIR = "users"
+
+# 并行读取用户分片的最大线程数
+USER_SHARD_LOAD_WORKERS = 8
+
+# 归档的最小保留天数，保证本月与上月（月度排行、连续签到、近30天统计）始终在内存中
+ARCHIVE_MIN_HORIZON_DAYS = 62
+
+def _peak_rss_kb() -> Optional[int]:
+    """
+    @description: 获取进程自启动以来的峰值常驻内存
+    @return {Optional[int]}: 峰值内存（KB），平台不支持时返回None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以KB为单位
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def user_shard_paths(data_dir: str) -> List[str]:
+    """
+    @description: 列出数据目录中的用户分片快照文件
+    @param {str} data_dir: 数据目录
+    @return {List[str]}: 分片文件路径，按分片序号排序
+    """
+    return sorted(glob.glob(os.path.join(data_dir, USER_SHARD_DIR, "users_*.json")))
+
+
+# 集合名称 -> 日志中使用的描述
+COLLECTION_LABELS = {
+    "users": "用户数据",
+    "checkin_records": "签到记录",
+    "transactions": "积分交易记录",
+    "email_verifications": "邮箱验证记录",
+    "groups": "群组数据",
+    "user_group_access": "用户群组访问权限",
+    "recovery_requests": "恢复请求",
+    "invite_links": "邀请链接",
+}
+
+class SortedRecords:
+    """按排序键升序保存的记录列表，用于按用户维护的二级索引"""
+    
+    __slots__ = ("keys", "records")
+    
+    def __init__(self):
+        self.keys: List[Any] = []
+        self.records: List[Any] = []
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def insert(self, key: Any, record: Any) -> None:
+        """
+        @description: 插入记录；键不小于末尾时直接追加，否则按二分位置插入
+        @param {Any} key: 排序键
+        @param {Any} record: 记录对象
+        """
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.records.insert(pos, record)
+    
+    def find(self, key: Any) -> Optional[Any]:
+        """
+        @description: 二分查找排序键等于key的第一条记录
+        @param {Any} key: 排序键
+        @return {Optional[Any]}: 记录对象，不存在则返回None
+        """
+        pos = bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return self.records[pos]
+        return None
+    
+    def last(self) -> Optional[Any]:
+        """
+        @description: 获取排序键最大的记录
+        @return {Optional[Any]}: 记录对象，为空时返回None
+        """
+        return self.records[-1] if self.records else None
+    
+    def latest(self, limit: int) -> List[Any]:
+        """
+        @description: 按排序键倒序返回最多limit条记录
+        @param {int} limit: 返回记录数量限制
+        @return {List[Any]}: 记录列表
+        """
+        if limit <= 0:
+            return []
+        return self.records[:-limit - 1:-1]
+
+class _LazyAttribute:
+    """集合或索引属性：首次访问时加载所属集合，加载完成前其他线程会等待存储锁"""
+    
+    __slots__ = ("collection", "attr")
+    
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.attr = None
+    
+    def __set_name__(self, owner, attr: str) -> None:
+        self.attr = attr
+    
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if self.collection not in obj._loaded:
+            obj._ensure_loaded(self.collection)
+        try:
+            return obj.__dict__[self.attr]
+        except KeyError:
+            raise AttributeError(self.attr) from None
+    
+    def __set__(self, obj, value) -> None:
+        obj.__dict__[self.attr] = value
+
 class Storage:
     """数据存储类，负责数据的持久化存储和读取"""
     
-    def __init__(self, data_dir: str = None):
+    # 内存缓存：各集合及其二级索引在首次访问时加载
+    users: Dict[int, User] = _LazyAttribute("users")
+    checkin_records: List[CheckinRecord] = _LazyAttribute("checkin_records")
+    transactions: List[PointsTransaction] = _LazyAttribute("transactions")
+    email_verifications: List[EmailVerification] = _LazyAttribute("email_verifications")
+    groups: Dict[int, Group] = _LazyAttribute("groups")
+    user_group_access: List[UserGroupAccess] = _LazyAttribute("user_group_access")
+    recovery_requests: List[RecoveryRequest] = _LazyAttribute("recovery_requests")
+    invite_links: List[Dict[str, Any]] = _LazyAttribute("invite_links")
+    
+    # 二级索引：加载集合后重建，通过存储接口新增记录时增量维护
+    _user_id_by_email: Dict[str, int] = _LazyAttribute("users")
+    _email_by_user_id: Dict[int, str] = _LazyAttribute("users")
+    _checkins_by_user: Dict[int, SortedRecords] = _LazyAttribute("checkin_records")
+    _checkin_columns: CheckinColumns = _LazyAttribute("checkin_records")
+    _transactions_by_id: Dict[Any, PointsTransaction] = _LazyAttribute("transactions")
+    _transactions_by_user: Dict[int, SortedRecords] = _LazyAttribute("transactions")
+    _gift_transactions_by_user: Dict[int, SortedRecords] = _LazyAttribute("transactions")
+    _earned_by_user: Dict[int, int] = _LazyAttribute("transactions")
+    _spent_by_user: Dict[int, int] = _LazyAttribute("transactions")
+    _verifications_by_code: Dict[str, List[EmailVerification]] = _LazyAttribute("email_verifications")
+    _verifications_by_user: Dict[int, List[EmailVerification]] = _LazyAttribute("email_verifications")
+    _access_by_key: Dict[Tuple[int, int], UserGroupAccess] = _LazyAttribute("user_group_access")
+    _accesses_by_user: Dict[int, List[UserGroupAccess]] = _LazyAttribute("user_group_access")
+    _accesses_by_group: Dict[int, List[UserGroupAccess]] = _LazyAttribute("user_group_access")
+    
+    def __init__(self, data_dir: str = None, journal: bool = None, write_behind: bool = None, lazy: bool = None,
+                 user_shards: int = None):
         """
         @description: 初始化存储对象
         @param {str} data_dir: 数据存储目录
+        @param {bool} journal: 是否启用追加日志模式，默认读取配置 STORAGE_JOURNAL_ENABLED
+        @param {bool} write_behind: 是否启用延迟写入模式，默认读取配置 STORAGE_WRITE_BEHIND_ENABLED
+        @param {bool} lazy: 是否按需加载集合，默认读取配置 STORAGE_LAZY_LOAD_ENABLED
+        @param {int} user_shards: 用户数据分片数，默认读取配置 STORAGE_USER_SHARDS，1表示使用单个 users.json
         """
         self.data_dir = data_dir or config.DATA_DIR
         self._ensure_dirs_exist()
@@ -39,18 +239,69 @@ class Storage:
         self.recovery_requests_file = os.path.join(self.data_dir, "recovery_requests.json")
         self.invite_links_file = os.path.join(self.data_dir, "invite_links.json")
         
-        # 内存缓存
-        self.users: Dict[int, User] = {}
-        self.checkin_records: List[CheckinRecord] = []
-        self.transactions: List[PointsTransaction] = []
-        self.email_verifications: List[EmailVerification] = []
-        self.groups: Dict[int, Group] = {}
-        self.user_group_access: List[UserGroupAccess] = []
-        self.recovery_requests: List[RecoveryRequest] = []
-        self.invite_links: List[Dict[str, Any]] = []
+        # 按需加载：启动时只加载常用集合，其余集合在首次访问时加载
+        self._lock = threading.RLock()
+        self._lazy = config.STORAGE_LAZY_LOAD_ENABLED if lazy is None else lazy
+        self._loaded: set = set()
+        self._loading: set = set()
+        
+        # 追加日志模式：每次变更只追加一条记录，由后台压缩合并进快照
+        self._compact_lock = threading.Lock()
+        # 归档冷数据：同一时间只允许一次归档，获取顺序在存储锁之前
+        self._archive_lock = threading.Lock()
+        self._compact_thread: Optional[threading.Thread] = None
+        self._journals: Dict[str, CollectionJournal] = {}
+        if config.STORAGE_JOURNAL_ENABLED if journal is None else journal:
+            journal_dir = os.path.join(self.data_dir, "journal")
+            os.makedirs(journal_dir, exist_ok=True)
+            self._journals = {
+                name: CollectionJournal(os.path.join(journal_dir, f"{name}.jsonl"))
+                for name in COLLECTIONS
+            }
+        
+        # 脏集合跟踪：只有通过存储接口修改过的集合才会在刷新时写入
+        self._dirty: set = set()
+        self._flush_stats: Dict[str, Dict[str, float]] = {}
+        self._load_stats: Dict[str, Dict[str, float]] = {}
+        
+        # 延迟写入模式：变更只标记脏集合，由后台线程按时间或变更数合并刷新
+        self._write_behind = config.STORAGE_WRITE_BEHIND_ENABLED if write_behind is None else write_behind
+        self._pending_mutations = 0
+        self._flush_wakeup = threading.Event()
+        self._flush_now = threading.Event()
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        
+        self._last_verification_prune = 0.0
+        
+        # 快照格式：读取时按文件头自动识别，写入时使用配置的格式，切换配置后随下一次写入逐步转换
+        self._snapshot_format = resolve_format(config.STORAGE_SNAPSHOT_FORMAT)
+        self._snapshot_compression = resolve_compression(config.STORAGE_SNAPSHOT_COMPRESSION)
+        if self._snapshot_compression != config.STORAGE_SNAPSHOT_COMPRESSION:
+            logger.warning("未安装zstandard，快照改用gzip压缩")
+        
+        # 用户数据分片：保存用户时只重写 user_id % 分片数 对应的分片
+        self._user_shards = max(1, config.STORAGE_USER_SHARDS if user_shards is None else user_shards)
+        self._dirty_user_shards: set = set()
+        # 分片数变化、首次启用分片或从备份恢复后，下一次写入需要重写全部分片并清理旧布局的文件
+        self._users_full_rewrite = False
+        
+        # 冷数据归档：超过保留期限的签到与交易记录按月压缩保存，内存中只保留按用户汇总的统计
+        self._archive = ArchiveStore(os.path.join(self.data_dir, "archive"))
+        
+        # 整数ID分配：高水位持久化在 ids.json 中，删除或归档记录后ID也不会被复用
+        self._ids = IdAllocator(os.path.join(self.data_dir, "ids.json"))
+        for name in ARCHIVE_DATE_FIELDS:
+            self._ids.observe(name, self._archive.max_id(name))
         
         # 加载数据
         self._load_data()
+        
+        if self._write_behind:
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="storage-flusher", daemon=True
+            )
+            self._flush_thread.start()
     
     def _ensure_dirs_exist(self):
         """确保必要的目录存在"""
@@ -59,204 +310,830 @@ class Storage:
         os.makedirs(config.BACKUP_DIR, exist_ok=True)
         
         # 确保所有数据文件存在
-        for file_name in [
-            "users.json", 
-            "checkin_records.json", 
-            "transactions.json",
-            "email_verifications.json", 
-            "groups.json", 
-            "user_group_access.json",
-            "recovery_requests.json", 
-            "invite_links.json"
-        ]:
+        for file_name, _ in COLLECTIONS.values():
             file_path = os.path.join(self.data_dir, file_name)
             if not os.path.exists(file_path):
-                # 创建空的 JSON 文件
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    if file_name == "users.json":
-                        json.dump([], f)  # 空用户列表
-                    elif file_name == "groups.json":
-                        # 初始化默认群组
-                        json.dump([
-                            {
-                                "group_id": 1,
-                                "group_name": "Coser社群",
-                                "chat_id": -1002295555543,
-                                "is_paid": False,
-                                "required_points": 0,
-                                "access_days": 0,
-                                "is_topics_group": True,
-                                "created_at": datetime.now().isoformat()
-                            },
-                            {
-                                "group_id": 2,
-                                "group_name": "Coser权益群",
-                                "chat_id": -1002317028637,
-                                "is_paid": True,
-                                "required_points": 1000,
-                                "access_days": 30,
-                                "is_topics_group": False,
-                                "created_at": datetime.now().isoformat()
-                            }
-                        ], f, ensure_ascii=False, indent=2)
-                    else:
-                        json.dump([], f)  # 其他文件使用空列表
+                if file_name == "groups.json":
+                    # 初始化默认群组
+                    write_snapshot(file_path, [
+                        {
+                            "group_id": 1,
+                            "group_name": "Coser社群",
+                            "chat_id": -1002295555543,
+                            "is_paid": False,
+                            "required_points": 0,
+                            "access_days": 0,
+                            "is_topics_group": True,
+                            "created_at": datetime.now().isoformat()
+                        },
+                        {
+                            "group_id": 2,
+                            "group_name": "Coser权益群",
+                            "chat_id": -1002317028637,
+                            "is_paid": True,
+                            "required_points": 1000,
+                            "access_days": 30,
+                            "is_topics_group": False,
+                            "created_at": datetime.now().isoformat()
+                        }
+                    ])
+                else:
+                    write_snapshot(file_path, [])  # 其他文件使用空列表
     
-    def _load_data(self):
-        """从文件加载数据到内存"""
-        # 加载用户数据
-        if os.path.exists(self.users_file):
-            try:
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    users_data = json.load(f)
-                    for user_data in users_data:
-                        user = User.from_dict(user_data)
-                        self.users[user.user_id] = user
-                logger.info(f"已加载 {len(self.users)} 个用户数据")
-            except Exception as e:
-                logger.error(f"加载用户数据失败: {e}")
+    def _collection_file(self, name: str) -> str:
+        """
+        @description: 获取集合对应的快照文件路径
+        @param {str} name: 集合名称
+        @return {str}: 快照文件路径
+        """
+        return os.path.join(self.data_dir, COLLECTIONS[name][0])
+    
+    def _record_key(self, name: str, record: Any) -> Any:
+        """
+        @description: 获取记录的主键
+        @param {str} name: 集合名称
+        @param {Any} record: 记录对象
+        @return {Any}: 主键值
+        """
+        key_field = COLLECTIONS[name][1]
+        if isinstance(record, dict):
+            return record.get(key_field)
+        return getattr(record, key_field)
+    
+    def _record_to_dict(self, name: str, record: Any) -> Dict[str, Any]:
+        """
+        @description: 将记录转换为可序列化的字典
+        @param {str} name: 集合名称
+        @param {Any} record: 记录对象
+        @return {Dict[str, Any]}: 记录字典
+        """
+        return record if COLLECTION_MODELS[name] is None else record.to_dict()
+    
+    def _record_from_dict(self, name: str, data: Dict[str, Any]) -> Any:
+        """
+        @description: 从字典创建记录对象
+        @param {str} name: 集合名称
+        @param {Dict[str, Any]} data: 记录字典
+        @return {Any}: 记录对象
+        """
+        model = COLLECTION_MODELS[name]
+        return data if model is None else model.from_dict(data)
+    
+    def _collection_records(self, name: str) -> List[Any]:
+        """
+        @description: 复制集合中记录的引用（调用方持有存储锁），避免后台压缩时与事件循环线程的修改冲突
+        @param {str} name: 集合名称
+        @return {List[Any]}: 记录列表
+        """
+        records = getattr(self, name)
+        return list(records.values()) if name in DICT_COLLECTIONS else list(records)
+    
+    def _serialize_records(self, name: str, records: List[Any]) -> List[Dict[str, Any]]:
+        """
+        @description: 将记录序列化为字典列表，无需持有存储锁
+        @param {str} name: 集合名称
+        @param {List[Any]} records: 记录列表
+        @return {List[Dict[str, Any]]}: 字典列表
+        """
+        return [self._record_to_dict(name, record) for record in records]
+    
+    def _load_collection(self, name: str) -> None:
+        """
+        @description: 从快照文件加载单个集合，并回放尚未压缩的日志
+        @param {str} name: 集合名称
+        """
+        started = time.perf_counter()
+        if name == "users":
+            records = self._load_users()
+        else:
+            records = self._read_snapshot_records(name, self._collection_file(name))
         
-        # 加载签到记录
-        if os.path.exists(self.checkin_records_file):
-            try:
-                with open(self.checkin_records_file, 'r', encoding='utf-8') as f:
-                    records_data = json.load(f)
-                    self.checkin_records = [CheckinRecord.from_dict(record) for record in records_data]
-                logger.info(f"已加载 {len(self.checkin_records)} 条签到记录")
-            except Exception as e:
-                logger.error(f"加载签到记录失败: {e}")
+        if name in DICT_COLLECTIONS:
+            setattr(self, name, {self._record_key(name, record): record for record in records})
+        else:
+            setattr(self, name, records)
         
-        # 加载积分交易记录
-        if os.path.exists(self.transactions_file):
-            try:
-                with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                    transactions_data = json.load(f)
-                    self.transactions = [PointsTransaction.from_dict(tx) for tx in transactions_data]
-                logger.info(f"已加载 {len(self.transactions)} 条积分交易记录")
-            except Exception as e:
-                logger.error(f"加载积分交易记录失败: {e}")
+        replayed = self._replay_journal(name)
+        if replayed:
+            logger.info(f"已回放 {replayed} 条{COLLECTION_LABELS[name]}日志")
+        dropped = self._drop_archived_records(name)
+        if dropped:
+            logger.warning(f"已移除 {dropped} 条已归档但仍留在快照中的{COLLECTION_LABELS[name]}")
+            self._dirty.add(name)
+        self._rebuild_indexes(name)
         
-        # 加载邮箱验证记录
-        if os.path.exists(self.email_verifications_file):
+        count = len(getattr(self, name))
+        seconds = time.perf_counter() - started
+        peak_rss_kb = _peak_rss_kb()
+        self._load_stats[name] = {"records": count, "seconds": seconds, "peak_rss_kb": peak_rss_kb}
+        peak_text = f"，峰值内存 {peak_rss_kb / 1024:.1f} MB" if peak_rss_kb is not None else ""
+        logger.info(f"已加载 {count} 条{COLLECTION_LABELS[name]}，耗时 {seconds:.3f}s{peak_text}")
+    
+    def _read_snapshot_records(self, name: str, file_path: str) -> List[Any]:
+        """
+        @description: 流式读取一个快照文件中的记录，损坏时从备份恢复
+        @param {str} name: 集合名称
+        @param {str} file_path: 快照文件路径
+        @return {List[Any]}: 记录对象列表，文件不存在时为空列表
+        """
+        records = []
+        if os.path.exists(file_path):
             try:
-                with open(self.email_verifications_file, 'r', encoding='utf-8') as f:
-                    verifications_data = json.load(f)
-                    self.email_verifications = [EmailVerification.from_dict(v) for v in verifications_data]
-                logger.info(f"已加载 {len(self.email_verifications)} 条邮箱验证记录")
+                # 逐条解析并构建对象，不会同时持有完整的字典列表和对象列表
+                for data in iter_snapshot(file_path):
+                    records.append(self._record_from_dict(name, data))
             except Exception as e:
-                logger.error(f"加载邮箱验证记录失败: {e}")
+                logger.error(f"加载{COLLECTION_LABELS[name]}失败: {e}")
+                records = self._load_backup_collection(name, file_path)
+        return records
+    
+    def _user_shard_file(self, shard: int) -> str:
+        """
+        @description: 获取用户分片的快照文件路径
+        @param {int} shard: 分片序号
+        @return {str}: 快照文件路径
+        """
+        return os.path.join(self.data_dir, USER_SHARD_DIR, f"users_{shard:03d}.json")
+    
+    def _user_shard(self, user_id: int) -> int:
+        """
+        @description: 获取用户所在的分片
+        @param {int} user_id: 用户ID
+        @return {int}: 分片序号
+        """
+        return user_id % self._user_shards
+    
+    def _load_users(self) -> List[User]:
+        """
+        @description: 加载用户数据；users.json 有数据时以它为准（未分片或分片迁移未完成），否则并行读取各分片
+        @return {List[User]}: 用户列表
+        """
+        users = self._read_snapshot_records("users", self._collection_file("users"))
+        shard_paths = user_shard_paths(self.data_dir)
+        if users:
+            if self._user_shards > 1 or shard_paths:
+                logger.info(f"用户数据将重新分布到 {self._user_shards} 个分片")
+                self._users_full_rewrite = True
+                self._dirty.add("users")
+            return users
+        if not shard_paths:
+            return users
         
-        # 加载群组数据
-        if os.path.exists(self.groups_file):
-            try:
-                with open(self.groups_file, 'r', encoding='utf-8') as f:
-                    groups_data = json.load(f)
-                    for group_data in groups_data:
-                        group = Group.from_dict(group_data)
-                        self.groups[group.group_id] = group
-                logger.info(f"已加载 {len(self.groups)} 个群组数据")
-            except Exception as e:
-                logger.error(f"加载群组数据失败: {e}")
+        workers = min(len(shard_paths), USER_SHARD_LOAD_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-loader") as pool:
+            shards = list(pool.map(lambda path: self._read_snapshot_records("users", path), shard_paths))
         
-        # 加载用户群组访问权限
-        if os.path.exists(self.user_group_access_file):
-            try:
-                with open(self.user_group_access_file, 'r', encoding='utf-8') as f:
-                    access_data = json.load(f)
-                    self.user_group_access = [UserGroupAccess.from_dict(a) for a in access_data]
-                logger.info(f"已加载 {len(self.user_group_access)} 条用户群组访问权限")
-            except Exception as e:
-                logger.error(f"加载用户群组访问权限失败: {e}")
+        expected = {self._user_shard_file(i) for i in range(self._user_shards)} if self._user_shards > 1 else set()
+        misplaced = any(
+            path not in expected or any(self._user_shard_file(self._user_shard(user.user_id)) != path for user in shard)
+            for path, shard in zip(shard_paths, shards)
+        )
+        if misplaced:
+            # 分片数发生变化
+            logger.info(f"用户分片数已变化，将重新分布到 {self._user_shards} 个分片")
+            self._users_full_rewrite = True
+            self._dirty.add("users")
+        return [user for shard in shards for user in shard]
+    
+    def _load_backup_collection(self, name: str, file_path: str = None) -> List[Any]:
+        """
+        @description: 快照损坏时保留损坏文件，并从 BACKUP_DIR 中最近一份可用的备份加载集合
+        @param {str} name: 集合名称
+        @param {str} file_path: 损坏的快照文件路径，默认为集合的快照文件
+        @return {List[Any]}: 记录列表，没有可用备份时为空列表
+        """
+        file_path = file_path or self._collection_file(name)
+        corrupt_path = f"{file_path}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            shutil.copy2(file_path, corrupt_path)
+            logger.warning(f"已保留损坏的{COLLECTION_LABELS[name]}快照: {corrupt_path}")
+        except Exception as e:
+            logger.error(f"保留损坏快照失败: {e}")
         
-        # 加载恢复请求数据
-        if os.path.exists(self.recovery_requests_file):
+        file_name = os.path.relpath(file_path, self.data_dir)
+        backup_dirs = sorted(Path(config.BACKUP_DIR).glob("backup_*"), reverse=True)
+        for backup_dir in backup_dirs:
+            backup_file = backup_dir / file_name
+            if not backup_file.exists():
+                continue
             try:
-                with open(self.recovery_requests_file, 'r', encoding='utf-8') as f:
-                    requests_data = json.load(f)
-                    self.recovery_requests = [RecoveryRequest.from_dict(r) for r in requests_data]
-                logger.info(f"已加载 {len(self.recovery_requests)} 条恢复请求")
+                records = [self._record_from_dict(name, data) for data in iter_snapshot(str(backup_file))]
             except Exception as e:
-                logger.error(f"加载恢复请求失败: {e}")
+                logger.warning(f"备份中的{COLLECTION_LABELS[name]}不可用: {backup_file}: {e}")
+                continue
+            logger.warning(f"已从备份 {backup_dir.name} 恢复 {len(records)} 条{COLLECTION_LABELS[name]}")
+            # 恢复的数据需要重新写回快照
+            self._dirty.add(name)
+            if name == "users":
+                self._users_full_rewrite = True
+            return records
+        
+        logger.error(f"没有可用的{COLLECTION_LABELS[name]}备份，将以空数据启动")
+        return []
+    
+    def _drop_archived_records(self, name: str) -> int:
+        """
+        @description: 移除已写入归档分区、但因归档中断仍留在快照中的记录，避免与归档汇总重复计算
+        @param {str} name: 集合名称
+        @return {int}: 移除的记录数
+        """
+        cutoff = self._archive.cutoff(name) if name in ARCHIVE_DATE_FIELDS else None
+        if cutoff is None:
+            return 0
+        
+        records = getattr(self, name)
+        stale: Dict[str, List[Any]] = {}
+        for record in records:
+            day = self._record_day(name, record)
+            if day < cutoff and self._record_key(name, record) is not None:
+                stale.setdefault(month_key(day), []).append(record)
+        if not stale:
+            return 0
+        
+        key_field = COLLECTIONS[name][1]
+        dropped = set()
+        for month, candidates in stale.items():
+            archived_keys = {data.get(key_field) for data in self._archive.read_partition(name, month)}
+            dropped.update(id(record) for record in candidates if self._record_key(name, record) in archived_keys)
+        if dropped:
+            setattr(self, name, [record for record in records if id(record) not in dropped])
+        return len(dropped)
+    
+    @staticmethod
+    def _record_day(name: str, record: Any) -> date:
+        """
+        @description: 获取可归档记录决定冷热的日期
+        @param {str} name: 集合名称
+        @param {Any} record: 签到记录或交易记录
+        @return {date}: 日期
+        """
+        value = getattr(record, ARCHIVE_DATE_FIELDS[name])
+        return value.date() if isinstance(value, datetime) else value
+    
+    def _replay_journal(self, name: str) -> int:
+        """
+        @description: 将集合日志回放到内存数据上
+        @param {str} name: 集合名称
+        @return {int}: 回放的记录数
+        """
+        journal = self._journals.get(name)
+        if not journal or not journal.has_entries():
+            return 0
         
-        # 加载邀请链接数据
-        if os.path.exists(self.invite_links_file):
+        container = getattr(self, name)
+        if name in DICT_COLLECTIONS:
+            items = container
+        else:
+            # 列表集合先按主键建立有序映射，无主键的记录使用位置占位
+            items = {}
+            for i, record in enumerate(container):
+                key = self._record_key(name, record)
+                items[("", i) if key is None else key] = record
+        
+        count = 0
+        for entry in journal.replay():
+            key = entry.get("key")
             try:
-                with open(self.invite_links_file, 'r', encoding='utf-8') as f:
-                    self.invite_links = json.load(f)
-                logger.info(f"已加载 {len(self.invite_links)} 条邀请链接")
+                if entry.get("op") == OP_DELETE:
+                    items.pop(key, None)
+                else:
+                    if key is None:
+                        key = ("journal", count)
+                    items[key] = self._record_from_dict(name, entry["data"])
+                if name == "users" and isinstance(key, int):
+                    # 日志压缩时需要重写这些用户所在的分片
+                    self._dirty_user_shards.add(self._user_shard(key))
+                count += 1
             except Exception as e:
-                logger.error(f"加载邀请链接失败: {e}")
+                logger.error(f"回放{COLLECTION_LABELS[name]}日志失败: {e}")
+        
+        if name not in DICT_COLLECTIONS:
+            setattr(self, name, list(items.values()))
+        return count
     
-    def _save_data(self):
-        """将内存数据保存到文件"""
-        # 保存用户数据
-        try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                users_data = [user.to_dict() for user in self.users.values()]
-                json.dump(users_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.users)} 个用户数据")
-        except Exception as e:
-            logger.error(f"保存用户数据失败: {e}")
+    def _rebuild_indexes(self, name: str) -> None:
+        """
+        @description: 根据内存数据重建集合的二级索引
+        @param {str} name: 集合名称
+        """
+        if name == "users":
+            self._user_id_by_email = {}
+            self._email_by_user_id = {}
+            for user in self.users.values():
+                self._index_user_email(user)
+        elif name == "email_verifications":
+            self._verifications_by_code = {}
+            self._verifications_by_user = {}
+            for verification in self.email_verifications:
+                self._index_email_verification(verification)
+        elif name == "user_group_access":
+            self._access_by_key = {}
+            self._accesses_by_user = {}
+            self._accesses_by_group = {}
+            for access in self.user_group_access:
+                self._index_user_group_access(access)
+        elif name == "checkin_records":
+            self._checkins_by_user = {}
+            self._checkin_columns = CheckinColumns()
+            for record in self.checkin_records:
+                self._index_checkin_record(record)
+        elif name == "transactions":
+            self._transactions_by_id = {}
+            self._transactions_by_user = {}
+            self._gift_transactions_by_user = {}
+            self._earned_by_user = {}
+            self._spent_by_user = {}
+            for transaction in self.transactions:
+                self._index_transaction(transaction)
+    
+    @staticmethod
+    def _normalize_email(email: Optional[str]) -> Optional[str]:
+        """
+        @description: 统一邮箱大小写与首尾空白，作为索引键
+        @param {Optional[str]} email: 邮箱
+        @return {Optional[str]}: 规范化后的邮箱，为空时返回None
+        """
+        return email.strip().lower() if email else None
+    
+    def _index_user_email(self, user: User) -> None:
+        """
+        @description: 更新用户的邮箱索引，用户更换邮箱时移除旧映射
+        @param {User} user: 用户对象
+        """
+        old_email = self._email_by_user_id.pop(user.user_id, None)
+        if old_email is not None and self._user_id_by_email.get(old_email) == user.user_id:
+            del self._user_id_by_email[old_email]
         
-        # 保存签到记录
-        try:
-            with open(self.checkin_records_file, 'w', encoding='utf-8') as f:
-                records_data = [record.to_dict() for record in self.checkin_records]
-                json.dump(records_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.checkin_records)} 条签到记录")
-        except Exception as e:
-            logger.error(f"保存签到记录失败: {e}")
+        email = self._normalize_email(user.email)
+        if email:
+            self._user_id_by_email[email] = user.user_id
+            self._email_by_user_id[user.user_id] = email
+    
+    def _index_email_verification(self, verification: EmailVerification) -> None:
+        """
+        @description: 将邮箱验证记录加入验证码索引与用户索引
+        @param {EmailVerification} verification: 邮箱验证记录对象
+        """
+        self._verifications_by_code.setdefault(verification.verification_code, []).append(verification)
+        self._verifications_by_user.setdefault(verification.user_id, []).append(verification)
+        self._ids.observe("email_verifications", verification.verification_id)
+    
+    def _index_user_group_access(self, access: UserGroupAccess) -> None:
+        """
+        @description: 将访问权限加入 (用户, 群组) 组合索引以及按用户、按群组的索引
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        """
+        # 同一用户群组存在重复记录时，组合索引保留最早的一条
+        self._access_by_key.setdefault((access.user_id, access.group_id), access)
+        self._accesses_by_user.setdefault(access.user_id, []).append(access)
+        self._accesses_by_group.setdefault(access.group_id, []).append(access)
+        self._ids.observe("user_group_access", access.access_id)
+    
+    def _unindex_user_group_access(self, access: UserGroupAccess) -> None:
+        """
+        @description: 从索引中移除访问权限
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        """
+        user_accesses = self._accesses_by_user.get(access.user_id, [])
+        self._remove_identical(user_accesses, access)
+        self._remove_identical(self._accesses_by_group.get(access.group_id, []), access)
         
-        # 保存积分交易记录
-        try:
-            with open(self.transactions_file, 'w', encoding='utf-8') as f:
-                transactions_data = [tx.to_dict() for tx in self.transactions]
-                json.dump(transactions_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.transactions)} 条积分交易记录")
-        except Exception as e:
-            logger.error(f"保存积分交易记录失败: {e}")
+        key = (access.user_id, access.group_id)
+        if self._access_by_key.get(key) is access:
+            # 若还有同一用户群组的重复记录，组合索引指向下一条
+            remaining = next((a for a in user_accesses if a.group_id == access.group_id), None)
+            if remaining is None:
+                del self._access_by_key[key]
+            else:
+                self._access_by_key[key] = remaining
+    
+    @staticmethod
+    def _remove_identical(records: List[Any], record: Any) -> bool:
+        """
+        @description: 按对象身份从列表中移除记录（数据类的==比较字段值，可能误删重复记录）
+        @param {List[Any]} records: 记录列表
+        @param {Any} record: 要移除的记录
+        @return {bool}: 是否移除
+        """
+        for i, item in enumerate(records):
+            if item is record:
+                del records[i]
+                return True
+        return False
+    
+    def _index_checkin_record(self, record: CheckinRecord) -> None:
+        """
+        @description: 将签到记录加入按用户、按日期排序的索引
+        @param {CheckinRecord} record: 签到记录对象
+        """
+        # 正常签到总是最新日期，直接追加；补签等历史日期按二分位置插入
+        self._checkins_by_user.setdefault(record.user_id, SortedRecords()).insert(record.checkin_date, record)
+        self._checkin_columns.append(record)
+        self._ids.observe("checkin_records", record.record_id)
+    
+    def _index_transaction(self, transaction: PointsTransaction) -> None:
+        """
+        @description: 将交易加入按用户、按时间排序的索引，并累计用户的收入与支出
+        @param {PointsTransaction} transaction: 积分交易记录对象
+        """
+        user_id = transaction.user_id
+        if transaction.transaction_id is not None:
+            self._transactions_by_id[transaction.transaction_id] = transaction
+            self._ids.observe("transactions", transaction.transaction_id)
+        self._transactions_by_user.setdefault(user_id, SortedRecords()).insert(transaction.created_at, transaction)
         
-        # 保存邮箱验证记录
-        try:
-            with open(self.email_verifications_file, 'w', encoding='utf-8') as f:
-                verifications_data = [v.to_dict() for v in self.email_verifications]
-                json.dump(verifications_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.email_verifications)} 条邮箱验证记录")
-        except Exception as e:
-            logger.error(f"保存邮箱验证记录失败: {e}")
+        if transaction.transaction_type in (PointsTransactionType.GIFT_SENT, PointsTransactionType.GIFT_RECEIVED):
+            # 赠送记录同时出现在双方的赠送历史中
+            for related_id in {user_id, transaction.related_user_id} - {None}:
+                self._gift_transactions_by_user.setdefault(related_id, SortedRecords()).insert(
+                    transaction.created_at, transaction
+                )
         
-        # 保存群组数据
+        if transaction.amount > 0:
+            self._earned_by_user[user_id] = self._earned_by_user.get(user_id, 0) + transaction.amount
+        elif transaction.amount < 0:
+            self._spent_by_user[user_id] = self._spent_by_user.get(user_id, 0) - transaction.amount
+    
+    def _load_data(self):
+        """从文件加载数据到内存；按需加载模式下只加载 EAGER_COLLECTIONS"""
+        # 重新加载前先写入尚未落盘的变更，避免被旧快照覆盖
+        if self._dirty:
+            self.flush()
+        started = time.perf_counter()
+        with self._lock:
+            self._loaded.clear()
+            self._load_stats.clear()
+            for name in EAGER_COLLECTIONS if self._lazy else COLLECTIONS:
+                self._ensure_loaded(name)
+        logger.info(f"存储加载完成，总耗时 {time.perf_counter() - started:.3f}s")
+        if "email_verifications" in self._loaded:
+            self.prune_email_verifications()
+        # 从备份恢复的集合立即写回快照
+        if self._dirty:
+            self.flush()
+    
+    def _ensure_loaded(self, name: str) -> None:
+        """
+        @description: 确保集合已加载；加载期间持有存储锁，其他线程访问同一集合时会等待加载完成
+        @param {str} name: 集合名称
+        """
+        with self._lock:
+            if name in self._loaded or name in self._loading:
+                return
+            self._loading.add(name)
+            try:
+                self._load_collection(name)
+            finally:
+                self._loading.discard(name)
+            self._loaded.add(name)
+            restored = name in self._dirty
+        # 按需加载时从备份恢复的集合随下一次刷新写回（此处可能已持有存储锁，不能直接刷新）
+        if restored and self._write_behind:
+            self._schedule_flush()
+    
+    def _next_id(self, name: str) -> int:
+        """
+        @description: 为集合分配下一个整数ID；先确保集合已加载，使已有记录的ID都已计入分配器
+        @param {str} name: 集合名称
+        @return {int}: 新ID
+        """
+        self._ensure_loaded(name)
+        return self._ids.allocate(name)
+    
+    def reserve_ids(self, name: str, count: int) -> range:
+        """
+        @description: 为批量导入预留一段连续的整数ID
+        @param {str} name: 集合名称，checkin_records/transactions/email_verifications/user_group_access
+        @param {int} count: 预留数量
+        @return {range}: 预留的ID区间
+        """
+        self._ensure_loaded(name)
+        return self._ids.reserve(name, count)
+    
+    def get_loaded_collections(self) -> List[str]:
+        """
+        @description: 获取已加载到内存的集合，用于观察实际用到了哪些集合
+        @return {List[str]}: 集合名称列表，按 COLLECTIONS 顺序
+        """
+        with self._lock:
+            return [name for name in COLLECTIONS if name in self._loaded]
+    
+    def _write_snapshot(self, name: str, data: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        @description: 将集合数据写入快照文件
+        @param {str} name: 集合名称
+        @param {List[Dict[str, Any]]} data: 序列化后的集合数据
+        @return {Optional[int]}: 写入的字节数，失败返回None
+        """
         try:
-            with open(self.groups_file, 'w', encoding='utf-8') as f:
-                groups_data = [group.to_dict() for group in self.groups.values()]
-                json.dump(groups_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.groups)} 个群组数据")
+            written = write_snapshot(
+                self._collection_file(name), data, self._snapshot_format, self._snapshot_compression
+            )
+            logger.debug(f"已保存 {len(data)} 条{COLLECTION_LABELS[name]}")
+            return written
         except Exception as e:
-            logger.error(f"保存群组数据失败: {e}")
+            logger.error(f"保存{COLLECTION_LABELS[name]}失败: {e}")
+            return None
+    
+    def _write_collections(self, names) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 将指定集合写入快照；日志模式下先轮转日志，快照写入成功后再丢弃
+        @param {Iterable[str]} names: 集合名称列表
+        @return {Dict[str, Dict[str, float]]}: 每个集合写入的字节数(bytes)与耗时(seconds)
+        """
+        stats = {}
+        with self._compact_lock:
+            # 持有存储锁时只复制记录引用并轮转日志，序列化在锁外进行，避免阻塞事件循环线程的写入
+            with self._lock:
+                snapshots = {}
+                full_rewrite = False
+                for name in names:
+                    started = time.perf_counter()
+                    self._dirty.discard(name)
+                    if name in self._journals:
+                        self._journals[name].rotate()
+                    if name == "users" and self._user_shards > 1:
+                        records = self._user_shard_records()
+                    else:
+                        records = self._collection_records(name)
+                    if name == "users":
+                        full_rewrite, self._users_full_rewrite = self._users_full_rewrite, False
+                    snapshots[name] = (records, time.perf_counter() - started)
+            
+            for name, (records, elapsed) in snapshots.items():
+                started = time.perf_counter()
+                if isinstance(records, dict):
+                    data = {shard: self._serialize_records(name, users) for shard, users in records.items()}
+                else:
+                    data = self._serialize_records(name, records)
+                if isinstance(data, dict):
+                    written = self._write_user_shards(data)
+                else:
+                    written = self._write_snapshot(name, data)
+                if written is None:
+                    # 写入失败，保留脏标记等待下次刷新
+                    with self._lock:
+                        self._dirty.add(name)
+                        if isinstance(data, dict):
+                            self._dirty_user_shards.update(data)
+                        if name == "users" and full_rewrite:
+                            self._users_full_rewrite = True
+                    continue
+                if name == "users" and full_rewrite:
+                    self._finish_user_relayout()
+                if name in self._journals:
+                    self._journals[name].discard_rotated()
+                stats[name] = {"bytes": written, "seconds": elapsed + time.perf_counter() - started}
         
-        # 保存用户群组访问权限
+        self._record_flush_stats(stats)
+        return stats
+    
+    def _user_shard_records(self) -> Dict[int, List[User]]:
+        """
+        @description: 按分片复制需要写入的用户引用（调用方持有存储锁）；没有记录到具体分片时写入全部分片
+        @return {Dict[int, List[User]]}: 分片序号 -> 用户列表
+        """
+        if self._users_full_rewrite or not self._dirty_user_shards:
+            shards = set(range(self._user_shards))
+        else:
+            shards = self._dirty_user_shards
+        self._dirty_user_shards = set()
+        data = {shard: [] for shard in shards}
+        for user in list(self.users.values()):
+            shard = self._user_shard(user.user_id)
+            if shard in data:
+                data[shard].append(user)
+        return data
+    
+    def _write_user_shards(self, shards: Dict[int, List[Dict[str, Any]]]) -> Optional[int]:
+        """
+        @description: 将用户分片写入各自的快照文件
+        @param {Dict[int, List[Dict[str, Any]]]} shards: 分片序号 -> 用户字典列表
+        @return {Optional[int]}: 写入的总字节数，任一分片失败时返回None
+        """
         try:
-            with open(self.user_group_access_file, 'w', encoding='utf-8') as f:
-                access_data = [access.to_dict() for access in self.user_group_access]
-                json.dump(access_data, f, ensure_ascii=False, indent=2)
-            logger.debug(f"已保存 {len(self.user_group_access)} 条用户群组访问权限")
+            os.makedirs(os.path.join(self.data_dir, USER_SHARD_DIR), exist_ok=True)
+            written = 0
+            for shard, data in sorted(shards.items()):
+                written += write_snapshot(
+                    self._user_shard_file(shard), data, self._snapshot_format, self._snapshot_compression
+                )
+            logger.debug(f"已保存 {len(shards)} 个用户分片")
+            return written
         except Exception as e:
-            logger.error(f"保存用户群组访问权限失败: {e}")
-        
-        # 保存恢复请求数据
+            logger.error(f"保存用户分片失败: {e}")
+            return None
+    
+    def _finish_user_relayout(self) -> None:
+        """
+        @description: 按新布局写入全部用户数据后，删除不再使用的分片文件；启用分片时最后清空 users.json
+        """
+        keep = {self._user_shard_file(i) for i in range(self._user_shards)} if self._user_shards > 1 else set()
         try:
-            with open(self.recovery_requests_file, 'w', encoding='utf-8') as f:
-                requests_data = [r.to_dict() for r in self.recovery_requests]
-                json.dump(requests_data, f, ensure_ascii=False, indent=2)
+            for path in user_shard_paths(self.data_dir):
+                if path not in keep:
+                    os.remove(path)
+            if self._user_shards > 1:
+                write_snapshot(self._collection_file("users"), [])
+            logger.info(f"用户数据已按 {self._user_shards} 个分片重新保存")
         except Exception as e:
-            logger.error(f"保存恢复请求失败: {e}")
+            logger.error(f"清理旧的用户数据文件失败: {e}")
+    
+    def _record_flush_stats(self, stats: Dict[str, Dict[str, float]]) -> None:
+        """
+        @description: 累计每个集合的刷新次数、写入字节数与耗时
+        @param {Dict[str, Dict[str, float]]} stats: 本次写入的统计
+        """
+        with self._lock:
+            for name, item in stats.items():
+                total = self._flush_stats.setdefault(name, {"flushes": 0, "bytes": 0, "seconds": 0.0})
+                total["flushes"] += 1
+                total["bytes"] += item["bytes"]
+                total["seconds"] += item["seconds"]
+    
+    def get_flush_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 获取自启动以来每个集合的累计刷新统计
+        @return {Dict[str, Dict[str, float]]}: 集合名称 -> {flushes, bytes, seconds}
+        """
+        with self._lock:
+            return {name: dict(item) for name, item in self._flush_stats.items()}
+    
+    def get_load_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 获取最近一次加载每个集合的统计
+        @return {Dict[str, Dict[str, float]]}: 集合名称 -> {records, seconds, peak_rss_kb}；peak_rss_kb为加载完该集合时的进程峰值内存，平台不支持时为None
+        """
+        with self._lock:
+            return {name: dict(item) for name, item in self._load_stats.items()}
+    
+    def _mark_dirty(self, name: str) -> None:
+        """
+        @description: 将集合标记为已修改，等待下次刷新写入
+        @param {str} name: 集合名称
+        """
+        with self._lock:
+            self._dirty.add(name)
+    
+    def flush(self) -> Dict[str, Dict[str, float]]:
+        """
+        @description: 只将已修改的集合写入快照
+        @return {Dict[str, Dict[str, float]]}: 每个集合写入的字节数(bytes)与耗时(seconds)
+        """
+        with self._lock:
+            names = [name for name in COLLECTIONS if name in self._dirty]
+        if not names:
+            return {}
+        
+        stats = self._write_collections(names)
+        if stats:
+            logger.debug("已刷新存储: " + ", ".join(
+                f"{name} {item['bytes']} 字节/{item['seconds'] * 1000:.1f} ms" for name, item in stats.items()
+            ))
+        return stats
+    
+    def _save_data(self):
+        """将内存数据全部保存到文件（用于直接修改了内存对象、无法确定脏集合的场景）"""
+        # 未加载的集合没有内存修改，只需合并尚未压缩的日志
+        with self._lock:
+            names = [
+                name for name in COLLECTIONS
+                if name in self._loaded or (name in self._journals and self._journals[name].has_entries())
+            ]
+            self._dirty_user_shards.update(range(self._user_shards))
+        self._write_collections(names)
+    
+    def _commit(self, name: str, record: Any = None, key: Any = None, delete: bool = False, sync: bool = False) -> None:
+        """
+        @description: 提交一次集合变更；日志模式下只追加一条记录，延迟写入模式下只标记脏集合，否则只写入该集合的快照
+        @param {str} name: 集合名称
+        @param {Any} record: 新增或更新后的记录
+        @param {Any} key: 删除操作的记录主键
+        @param {bool} delete: 是否为删除操作
+        @param {bool} sync: 是否要求变更在返回前落盘
+        """
+        journal = self._journals.get(name)
+        if journal is None:
+            self._mark_dirty(name)
+            if self._write_behind and not sync:
+                self._schedule_flush()
+            else:
+                self.flush()
+            return
         
-        # 保存邀请链接数据
+        with self._lock:
+            if delete:
+                journal.append(OP_DELETE, key, sync=sync)
+            else:
+                journal.append(OP_PUT, self._record_key(name, record), self._record_to_dict(name, record), sync=sync)
+        self._maybe_compact()
+    
+    def _schedule_flush(self) -> None:
+        """记录一次待刷新的变更，达到变更数阈值时立即唤醒刷新线程"""
+        with self._lock:
+            self._pending_mutations += 1
+            pending = self._pending_mutations
+        self._flush_wakeup.set()
+        if pending >= config.STORAGE_FLUSH_MAX_MUTATIONS:
+            self._flush_now.set()
+    
+    def _flush_loop(self) -> None:
+        """延迟写入后台线程：首次变更后最多等待刷新间隔，期间的变更合并为一次写入"""
+        interval = config.STORAGE_FLUSH_INTERVAL_MS / 1000
+        while True:
+            self._flush_wakeup.wait()
+            if not self._flush_stop.is_set():
+                self._flush_now.wait(interval)
+            self._flush_wakeup.clear()
+            self._flush_now.clear()
+            with self._lock:
+                self._pending_mutations = 0
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"后台刷新存储失败: {e}")
+            if self._flush_stop.is_set():
+                break
+    
+    def _commit_deletes(self, name: str, keys: List[Any]) -> None:
+        """
+        @description: 批量提交删除操作；非日志模式下只标记一次脏集合
+        @param {str} name: 集合名称
+        @param {List[Any]} keys: 被删除记录的主键列表
+        """
+        self._commit_many(name, keys=keys)
+    
+    def _commit_many(self, name: str, records: List[Any] = (), keys: List[Any] = ()) -> None:
+        """
+        @description: 批量提交新增/更新与删除操作；非日志模式下只标记一次脏集合并写入一次
+        @param {str} name: 集合名称
+        @param {List[Any]} records: 新增或更新后的记录
+        @param {List[Any]} keys: 被删除记录的主键列表
+        """
+        journal = self._journals.get(name)
+        if journal is None:
+            self._commit(name)
+            return
+        
+        with self._lock:
+            for record in records:
+                journal.append(OP_PUT, self._record_key(name, record), self._record_to_dict(name, record))
+            for key in keys:
+                journal.append(OP_DELETE, key)
+        self._maybe_compact()
+    
+    def _maybe_compact(self) -> None:
+        """日志超过阈值时在后台线程中压缩"""
+        total_size = sum(journal.size for journal in self._journals.values())
+        if total_size < config.STORAGE_JOURNAL_COMPACT_BYTES:
+            return
+        if self._compact_thread and self._compact_thread.is_alive():
+            return
+        self._compact_thread = threading.Thread(
+            target=self.compact_journal, name="storage-compactor", daemon=True
+        )
+        self._compact_thread.start()
+    
+    def compact_journal(self) -> bool:
+        """
+        @description: 将日志合并进新的快照并清空日志
+        @return {bool}: 是否压缩成功
+        """
+        if not self._journals:
+            return False
         try:
-            with open(self.invite_links_file, 'w', encoding='utf-8') as f:
-                json.dump(self.invite_links, f, ensure_ascii=False, indent=2)
+            names = [name for name, journal in self._journals.items() if journal.has_entries()]
+            if names:
+                self._write_collections(names)
+                logger.info(f"已压缩存储日志: {', '.join(names)}")
+            return True
         except Exception as e:
-            logger.error(f"保存邀请链接失败: {e}")
+            logger.error(f"压缩存储日志失败: {e}")
+            return False
+    
+    def close(self) -> None:
+        """
+        @description: 关闭存储，写入脏集合、将未压缩的日志合并进快照并释放文件句柄
+        """
+        if self._flush_thread and self._flush_thread.is_alive():
+            self._flush_stop.set()
+            self._flush_wakeup.set()
+            self._flush_now.set()
+            self._flush_thread.join()
+        if self._compact_thread and self._compact_thread.is_alive():
+            self._compact_thread.join()
+        self.flush()
+        if self._journals:
+            self.compact_journal()
+            for journal in self._journals.values():
+                journal.close()
+        self._ids.checkpoint()
+        if self._lazy:
+            loaded = self.get_loaded_collections()
+            logger.info(
+                f"本次运行加载的集合: {', '.join(loaded) or '无'}；"
+                f"未加载: {', '.join(name for name in COLLECTIONS if name not in loaded) or '无'}"
+            )
     
     def backup_data(self):
         """备份数据"""
@@ -269,12 +1146,13 @@ class Storage:
             self._save_data()
             
             # 复制所有数据文件到备份目录
-            for file_name in ["users.json", "checkin_records.json", "transactions.json", 
-                             "email_verifications.json", "groups.json", "user_group_access.json",
-                             "recovery_requests.json", "invite_links.json"]:
+            for file_name, _ in COLLECTIONS.values():
                 src_file = os.path.join(self.data_dir, file_name)
                 if os.path.exists(src_file):
                     shutil.copy2(src_file, os.path.join(backup_dir, file_name))
+            for src_file in user_shard_paths(self.data_dir):
+                os.makedirs(os.path.join(backup_dir, USER_SHARD_DIR), exist_ok=True)
+                shutil.copy2(src_file, os.path.join(backup_dir, USER_SHARD_DIR, os.path.basename(src_file)))
             
             logger.info(f"数据已备份到 {backup_dir}")
             return True
@@ -298,8 +1176,11 @@ class Storage:
         @return {bool}: 是否保存成功
         """
         try:
-            self.users[user.user_id] = user
-            self._save_data()
+            with self._lock:
+                self.users[user.user_id] = user
+                self._dirty_user_shards.add(self._user_shard(user.user_id))
+            self._index_user_email(user)
+            self._commit("users", user)
             return True
         except Exception as e:
             logger.error(f"保存用户信息失败: {e}")
@@ -330,10 +1211,11 @@ class Storage:
         try:
             # 设置记录ID
             if record.record_id is None:
-                record.record_id = len(self.checkin_records) + 1
+                record.record_id = self._next_id("checkin_records")
             
             self.checkin_records.append(record)
-            self._save_data()
+            self._index_checkin_record(record)
+            self._commit("checkin_records", record)
             return True
         except Exception as e:
             logger.error(f"添加签到记录失败: {e}")
@@ -346,9 +1228,8 @@ class Storage:
         @param {int} limit: 返回记录数量限制
         @return {List[CheckinRecord]}: 签到记录列表
         """
-        records = [r for r in self.checkin_records if r.user_id == user_id]
-        records.sort(key=lambda r: r.checkin_date, reverse=True)
-        return records[:limit]
+        records = self._checkins_by_user.get(user_id)
+        return records.latest(limit) if records else []
     
     def get_user_checkin_record_by_date(self, user_id: int, checkin_date: date) -> Optional[CheckinRecord]:
         """
@@ -357,10 +1238,8 @@ class Storage:
         @param {date} checkin_date: 签到日期
         @return {Optional[CheckinRecord]}: 签到记录，不存在则返回None
         """
-        for record in self.checkin_records:
-            if record.user_id == user_id and record.checkin_date == checkin_date:
-                return record
-        return None
+        records = self._checkins_by_user.get(user_id)
+        return records.find(checkin_date) if records else None
     
     def get_user_last_checkin_record(self, user_id: int) -> Optional[CheckinRecord]:
         """
@@ -368,11 +1247,8 @@ class Storage:
         @param {int} user_id: 用户ID
         @return {Optional[CheckinRecord]}: 签到记录，不存在则返回None
         """
-        user_records = [r for r in self.checkin_records if r.user_id == user_id]
-        if not user_records:
-            return None
-        
-        return max(user_records, key=lambda r: r.checkin_date)
+        records = self._checkins_by_user.get(user_id)
+        return records.last() if records else None
     
     def get_user_continuous_checkin_days(self, user_id: int) -> int:
         """
@@ -386,25 +1262,150 @@ class Storage:
         
         return user.streak_days
     
+    def count_checkins_on(self, checkin_date: date) -> int:
+        """
+        @description: 统计某天的签到次数
+        @param {date} checkin_date: 签到日期
+        @return {int}: 签到次数
+        """
+        with self._lock:
+            archived = sum(1 for _ in self._archive.iter_records(
+                "checkin_records", checkin_date, checkin_date + timedelta(days=1)
+            ))
+            return self._checkin_columns.count_on(checkin_date) + archived
+    
+    def get_checkin_counts_by_user(self, start: date, end: date) -> Dict[int, int]:
+        """
+        @description: 统计日期区间内每个用户的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[int, int]}: 用户ID -> 签到次数，没有签到的用户不出现
+        """
+        with self._lock:
+            counts = self._checkin_columns.counts_by_user(start, end)
+            for data in self._archive.iter_records("checkin_records", start, end):
+                counts[data["user_id"]] = counts.get(data["user_id"], 0) + 1
+            return counts
+    
+    def get_daily_checkin_counts(self, start: date, end: date) -> Dict[date, int]:
+        """
+        @description: 统计日期区间内每天的签到次数
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[date, int]}: 日期 -> 签到次数
+        """
+        with self._lock:
+            counts = self._checkin_columns.daily_counts(start, end)
+            for record in self.iter_archived_records("checkin_records", start, end):
+                counts[record.checkin_date] += 1
+            return counts
+    
+    def get_checkin_points_by_user(self) -> Dict[int, int]:
+        """
+        @description: 统计每个用户通过签到获得的积分（含连续签到奖励，已归档的记录按汇总计入）
+        @return {Dict[int, int]}: 用户ID -> 积分
+        """
+        with self._lock:
+            totals = self._checkin_columns.points_by_user()
+            for user_id, rollup in self._archive.rollups("checkin_records").items():
+                totals[user_id] = totals.get(user_id, 0) + rollup.get("points", 0)
+            return totals
+    
+    def get_checkin_count_distribution(self, start: date, end: date) -> Dict[str, Optional[float]]:
+        """
+        @description: 统计日期区间内有签到的用户的签到次数分布
+        @param {date} start: 开始日期（含）
+        @param {date} end: 结束日期（不含）
+        @return {Dict[str, Optional[float]]}: users/mean/median/p90/max
+        """
+        return distribution(list(self.get_checkin_counts_by_user(start, end).values()))
+    
+    def get_user_checkin_count(self, user_id: int) -> int:
+        """
+        @description: 获取用户的签到总次数（含已归档的记录）
+        @param {int} user_id: 用户ID
+        @return {int}: 签到次数
+        """
+        records = self._checkins_by_user.get(user_id)
+        return (len(records) if records else 0) + self._archive.rollup("checkin_records", user_id).get("count", 0)
+    
+    def get_total_checkin_count(self) -> int:
+        """
+        @description: 获取所有用户的签到总次数（含已归档的记录）
+        @return {int}: 签到次数
+        """
+        archived = sum(totals.get("count", 0) for totals in self._archive.rollups("checkin_records").values())
+        return len(self.checkin_records) + archived
+    
     # 积分交易相关方法
+    def get_total_transaction_count(self) -> int:
+        """
+        @description: 获取所有用户的积分交易总数（含已归档的记录）
+        @return {int}: 交易数
+        """
+        archived = sum(totals.get("count", 0) for totals in self._archive.rollups("transactions").values())
+        return len(self.transactions) + archived
+    
     def add_transaction(self, transaction: PointsTransaction) -> bool:
         """
-        @description: 添加积分交易记录
+        @description: 添加积分交易记录；交易ID已存在时按更新处理，避免产生重复记录
         @param {PointsTransaction} transaction: 积分交易记录对象
         @return {bool}: 是否添加成功
         """
         try:
             # 设置交易ID
             if transaction.transaction_id is None:
-                transaction.transaction_id = len(self.transactions) + 1
+                transaction.transaction_id = self._next_id("transactions")
+            elif transaction.transaction_id in self._transactions_by_id:
+                return self.update_transaction(transaction)
             
             self.transactions.append(transaction)
-            self._save_data()
+            self._index_transaction(transaction)
+            self._commit("transactions", transaction, sync=self._is_sync_transaction(transaction))
             return True
         except Exception as e:
             logger.error(f"添加积分交易记录失败: {e}")
             return False
     
+    def get_transaction(self, transaction_id: Any) -> Optional[PointsTransaction]:
+        """
+        @description: 根据交易ID获取积分交易记录
+        @param {Any} transaction_id: 交易ID
+        @return {Optional[PointsTransaction]}: 积分交易记录，不存在则返回None
+        """
+        return self._transactions_by_id.get(transaction_id)
+    
+    def update_transaction(self, transaction: PointsTransaction) -> bool:
+        """
+        @description: 原地更新积分交易记录（如状态变更），不会追加新记录
+        @param {PointsTransaction} transaction: 积分交易记录对象；修改用户、金额或时间时请传入新对象
+        @return {bool}: 是否更新成功
+        """
+        try:
+            existing = self._transactions_by_id.get(transaction.transaction_id)
+            if existing is None:
+                logger.warning(f"要更新的积分交易不存在: {transaction.transaction_id}")
+                return False
+            
+            if existing is not transaction:
+                # 替换为新对象，涉及索引字段的变化需要重建索引
+                self.transactions[self.transactions.index(existing)] = transaction
+                self._rebuild_indexes("transactions")
+            
+            self._commit("transactions", transaction, sync=self._is_sync_transaction(transaction))
+            return True
+        except Exception as e:
+            logger.error(f"更新积分交易记录失败: {e}")
+            return False
+    
+    def _is_sync_transaction(self, transaction: PointsTransaction) -> bool:
+        """
+        @description: 判断交易是否需要同步落盘
+        @param {PointsTransaction} transaction: 积分交易记录对象
+        @return {bool}: 是否同步落盘
+        """
+        return config.STORAGE_SYNC_POINT_TRANSFERS and transaction.transaction_type in SYNC_TRANSACTION_TYPES
+    
     def save_transaction(self, transaction: PointsTransaction) -> bool:
         """
         @description: 保存积分交易记录（与add_transaction功能相同，为兼容性保留）
@@ -420,9 +1421,8 @@ class Storage:
         @param {int} limit: 返回记录数量限制
         @return {List[PointsTransaction]}: 积分交易记录列表
         """
-        transactions = [t for t in self.transactions if t.user_id == user_id]
-        transactions.sort(key=lambda t: t.created_at, reverse=True)
-        return transactions[:limit]
+        transactions = self._transactions_by_user.get(user_id)
+        return transactions.latest(limit) if transactions else []
     
     def get_user_gift_transactions(self, user_id: int, limit: int = 10) -> List[PointsTransaction]:
         """获取用户的赠送记录
@@ -434,15 +1434,9 @@ class Storage:
         Returns:
             List[PointsTransaction]: 赠送记录列表
         """
-        # 过滤出与该用户相关的赠送和接收记录
-        gift_transactions = [
-            t for t in self.transactions 
-            if (t.user_id == user_id or t.related_user_id == user_id) 
-            and t.transaction_type in [PointsTransactionType.GIFT_SENT, PointsTransactionType.GIFT_RECEIVED]
-        ]
-        
-        # 按时间倒序排序并限制数量
-        return sorted(gift_transactions, key=lambda x: x.created_at, reverse=True)[:limit]
+        # 索引中包含该用户发出和接收的赠送记录，按时间倒序取前limit条
+        gift_transactions = self._gift_transactions_by_user.get(user_id)
+        return gift_transactions.latest(limit) if gift_transactions else []
     
     # 邮箱验证相关方法
     def add_email_verification(self, verification: EmailVerification) -> bool:
@@ -452,24 +1446,54 @@ class Storage:
         @return {bool}: 是否添加成功
         """
         try:
+            # 定期清理过期的验证记录，保持集合大小有界
+            if time.monotonic() - self._last_verification_prune >= VERIFICATION_PRUNE_INTERVAL:
+                self.prune_email_verifications()
+            
             # 设置验证ID
             if verification.verification_id is None:
-                verification.verification_id = len(self.email_verifications) + 1
+                verification.verification_id = self._next_id("email_verifications")
             
             self.email_verifications.append(verification)
-            self._save_data()
+            self._index_email_verification(verification)
+            self._commit("email_verifications", verification)
             return True
         except Exception as e:
             logger.error(f"添加邮箱验证记录失败: {e}")
             return False
     
+    def prune_email_verifications(self, now: datetime = None) -> int:
+        """
+        @description: 删除过期超过保留时长且未完成验证的记录，已验证的记录保留
+        @param {datetime} now: 当前时间，默认datetime.now()
+        @return {int}: 删除的记录数
+        """
+        now = now or datetime.now()
+        cutoff = now - timedelta(hours=config.STORAGE_VERIFICATION_RETENTION_HOURS)
+        self._last_verification_prune = time.monotonic()
+        
+        expired = [
+            v for v in self.email_verifications
+            if v.status != EmailVerifyStatus.VERIFIED and v.expires_at < cutoff
+        ]
+        if not expired:
+            return 0
+        
+        with self._lock:
+            expired_ids = {id(v) for v in expired}
+            self.email_verifications = [v for v in self.email_verifications if id(v) not in expired_ids]
+            self._rebuild_indexes("email_verifications")
+        self._commit_deletes("email_verifications", [v.verification_id for v in expired])
+        logger.info(f"已清理 {len(expired)} 条过期的邮箱验证记录")
+        return len(expired)
+    
     def get_email_verifications_by_user(self, user_id: int) -> List[EmailVerification]:
         """
         @description: 获取用户的邮箱验证记录
         @param {int} user_id: 用户ID
         @return {List[EmailVerification]}: 邮箱验证记录列表
         """
-        return [v for v in self.email_verifications if v.user_id == user_id]
+        return list(self._verifications_by_user.get(user_id, []))
     
     def get_email_verification(self, user_id: int, verification_code: str) -> Optional[EmailVerification]:
         """
@@ -478,33 +1502,28 @@ class Storage:
         @param {str} verification_code: 验证码
         @return {Optional[EmailVerification]}: 验证记录，不存在则返回None
         """
-        for verification in self.email_verifications:
-            if verification.user_id == user_id and verification.verification_code == verification_code:
+        for verification in self._verifications_by_code.get(verification_code, []):
+            if verification.user_id == user_id:
                 return verification
         return None
     
     def get_email_verification_by_code(self, verification_code: str) -> Optional[EmailVerification]:
         """
-        @description: 通过验证码获取邮箱验证记录
+        @description: 通过验证码获取邮箱验证记录，验证码重复时返回最新的一条
         @param {str} verification_code: 验证码
         @return {Optional[EmailVerification]}: 验证记录，不存在则返回None
         """
-        for verification in self.email_verifications:
-            if verification.verification_code == verification_code:
-                return verification
-        return None
+        verifications = self._verifications_by_code.get(verification_code)
+        return verifications[-1] if verifications else None
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """
-        @description: 根据邮箱获取用户
+        @description: 根据邮箱获取用户（不区分大小写）
         @param {str} email: 邮箱
         @return {Optional[User]}: 用户对象
         """
-        self._load_data()
-        for user in self.users.values():
-            if user.email == email:
-                return user
-        return None
+        user_id = self._user_id_by_email.get(self._normalize_email(email))
+        return self.users.get(user_id) if user_id is not None else None
     
     def get_user_pending_email_verifications(self, user_id: int) -> List[EmailVerification]:
         """
@@ -512,8 +1531,8 @@ class Storage:
         @param {int} user_id: 用户ID
         @return {List[EmailVerification]}: 邮箱验证记录列表
         """
-        return [v for v in self.email_verifications 
-                if v.user_id == user_id and v.status == EmailVerifyStatus.PENDING]
+        return [v for v in self._verifications_by_user.get(user_id, [])
+                if v.status == EmailVerifyStatus.PENDING]
     
     # 群组相关方法
     def get_group(self, group_id: int) -> Optional[Group]:
@@ -532,12 +1551,27 @@ class Storage:
         """
         try:
             self.groups[group.group_id] = group
-            self._save_data()
+            self._commit("groups", group)
             return True
         except Exception as e:
             logger.error(f"保存群组信息失败: {e}")
             return False
     
+    def delete_group(self, group_id: int) -> bool:
+        """
+        @description: 删除群组
+        @param {int} group_id: 群组ID
+        @return {bool}: 是否删除成功
+        """
+        try:
+            if self.groups.pop(group_id, None) is None:
+                return False
+            self._commit("groups", key=group_id, delete=True)
+            return True
+        except Exception as e:
+            logger.error(f"删除群组失败: {e}")
+            return False
+    
     def get_all_groups(self) -> List[Group]:
         """
         @description: 获取所有群组
@@ -555,15 +1589,118 @@ class Storage:
         try:
             # 设置访问ID
             if access.access_id is None:
-                access.access_id = len(self.user_group_access) + 1
+                access.access_id = self._next_id("user_group_access")
             
             self.user_group_access.append(access)
-            self._save_data()
+            self._index_user_group_access(access)
+            self._commit("user_group_access", access)
             return True
         except Exception as e:
             logger.error(f"添加用户群组访问权限失败: {e}")
             return False
     
+    def update_user_group_access(self, access: UserGroupAccess) -> bool:
+        """
+        @description: 更新用户群组访问权限（如有效期变化），不存在时添加
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {bool}: 是否更新成功
+        """
+        try:
+            existing = self._find_user_group_access(access)
+            if existing is None:
+                return self.add_user_group_access(access)
+            
+            if existing is not access:
+                self.user_group_access[self.user_group_access.index(existing)] = access
+                self._rebuild_indexes("user_group_access")
+            self._commit("user_group_access", access)
+            return True
+        except Exception as e:
+            logger.error(f"更新用户群组访问权限失败: {e}")
+            return False
+    
+    def remove_user_group_access(self, access: UserGroupAccess) -> bool:
+        """
+        @description: 删除用户群组访问权限
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {bool}: 是否删除成功
+        """
+        try:
+            existing = self._find_user_group_access(access)
+            if existing is None:
+                return False
+            
+            self._remove_identical(self.user_group_access, existing)
+            self._unindex_user_group_access(existing)
+            self._commit("user_group_access", key=existing.access_id, delete=True)
+            return True
+        except Exception as e:
+            logger.error(f"删除用户群组访问权限失败: {e}")
+            return False
+    
+    def apply_user_group_access_changes(self, added: List[UserGroupAccess],
+                                        removed: List[UserGroupAccess],
+                                        updated: List[UserGroupAccess] = ()) -> bool:
+        """
+        @description: 批量添加、删除与更新用户群组访问权限，所有变更只提交一次
+        @param {List[UserGroupAccess]} added: 要添加的访问权限
+        @param {List[UserGroupAccess]} removed: 要删除的访问权限，不存在的记录会被忽略
+        @param {List[UserGroupAccess]} updated: 已修改的访问权限（如确认时间），不存在的记录会被忽略
+        @return {bool}: 是否保存成功
+        """
+        if not added and not removed and not updated:
+            return True
+        try:
+            missing_ids = [access for access in added if access.access_id is None]
+            if missing_ids:
+                for access, access_id in zip(missing_ids, self.reserve_ids("user_group_access", len(missing_ids))):
+                    access.access_id = access_id
+            
+            for access in added:
+                self.user_group_access.append(access)
+                self._index_user_group_access(access)
+            
+            saved = list(added)
+            for access in updated:
+                existing = self._find_user_group_access(access)
+                if existing is None:
+                    continue
+                if existing is not access:
+                    self.user_group_access[self.user_group_access.index(existing)] = access
+                    self._rebuild_indexes("user_group_access")
+                saved.append(access)
+            
+            deleted_keys = []
+            for access in removed:
+                existing = self._find_user_group_access(access)
+                if existing is None:
+                    continue
+                self._remove_identical(self.user_group_access, existing)
+                self._unindex_user_group_access(existing)
+                deleted_keys.append(existing.access_id)
+            
+            self._commit_many("user_group_access", records=saved, keys=deleted_keys)
+            return True
+        except Exception as e:
+            logger.error(f"批量更新用户群组访问权限失败: {e}")
+            return False
+    
+    def _find_user_group_access(self, access: UserGroupAccess) -> Optional[UserGroupAccess]:
+        """
+        @description: 在索引中查找与给定对象对应的已保存记录（优先按对象身份，其次按访问ID）
+        @param {UserGroupAccess} access: 用户群组访问权限对象
+        @return {Optional[UserGroupAccess]}: 已保存的记录，不存在则返回None
+        """
+        candidates = self._accesses_by_user.get(access.user_id, [])
+        for candidate in candidates:
+            if candidate is access:
+                return candidate
+        if access.access_id is not None:
+            for candidate in candidates:
+                if candidate.access_id == access.access_id:
+                    return candidate
+        return None
+    
     def get_user_group_access(self, user_id: int, group_id: int) -> Optional[UserGroupAccess]:
         """
         @description: 获取用户群组访问权限
@@ -571,10 +1708,7 @@ class Storage:
         @param {int} group_id: 群组ID
         @return {Optional[UserGroupAccess]}: 用户群组访问权限对象，不存在则返回None
         """
-        for access in self.user_group_access:
-            if access.user_id == user_id and access.group_id == group_id:
-                return access
-        return None
+        return self._access_by_key.get((user_id, group_id))
     
     def get_user_group_accesses(self, user_id: int) -> List[UserGroupAccess]:
         """
@@ -582,7 +1716,7 @@ class Storage:
         @param {int} user_id: 用户ID
         @return {List[UserGroupAccess]}: 用户群组访问权限列表
         """
-        return [a for a in self.user_group_access if a.user_id == user_id]
+        return list(self._accesses_by_user.get(user_id, []))
     
     def get_group_user_accesses(self, group_id: int) -> List[UserGroupAccess]:
         """
@@ -590,7 +1724,7 @@ class Storage:
         @param {int} group_id: 群组ID
         @return {List[UserGroupAccess]}: 用户群组访问权限列表
         """
-        return [a for a in self.user_group_access if a.group_id == group_id]
+        return list(self._accesses_by_group.get(group_id, []))
     
     # 恢复请求相关方法
     def add_recovery_request(self, request: RecoveryRequest) -> bool:
@@ -605,12 +1739,12 @@ class Storage:
                 if r.request_id == request.request_id:
                     # 更新现有请求
                     self.recovery_requests[i] = request
-                    self._save_data()
+                    self._commit("recovery_requests", request)
                     return True
             
             # 添加新请求
             self.recovery_requests.append(request)
-            self._save_data()
+            self._commit("recovery_requests", request)
             return True
         except Exception as e:
             logger.error(f"添加恢复请求失败: {e}")
@@ -682,7 +1816,7 @@ class Storage:
             }
             
             self.invite_links.append(invite_data)
-            self._save_data()
+            self._commit("invite_links", invite_data)
             return True
         except Exception as e:
             logger.error(f"添加邀请链接失败: {e}")
@@ -706,7 +1840,7 @@ class Storage:
             for link in self.invite_links:
                 if link["invite_link"] == invite_link:
                     link["is_used"] = True
-                    self._save_data()
+                    self._commit("invite_links", link)
                     return True
             return False
         except Exception as e:
@@ -720,16 +1854,16 @@ class Storage:
         @return {bool}: 是否更新成功
         """
         try:
-            for i, v in enumerate(self.email_verifications):
-                if v.user_id == verification.user_id and v.verification_code == verification.verification_code:
-                    self.email_verifications[i] = verification
-                    self._save_data()
-                    return True
+            existing = self.get_email_verification(verification.user_id, verification.verification_code)
+            if existing is not None:
+                if existing is not verification:
+                    self.email_verifications[self.email_verifications.index(existing)] = verification
+                    self._rebuild_indexes("email_verifications")
+                self._commit("email_verifications", verification)
+                return True
             
             # 如果没有找到匹配的记录，添加新记录
-            self.email_verifications.append(verification)
-            self._save_data()
-            return True
+            return self.add_email_verification(verification)
         except Exception as e:
             logger.error(f"更新邮箱验证记录失败: {e}")
             return False
@@ -746,12 +1880,12 @@ class Storage:
                 if r.request_id == request.request_id:
                     # 更新请求
                     self.recovery_requests[i] = request
-                    self._save_data()
+                    self._commit("recovery_requests", request)
                     return True
             
             # 如果不存在，添加新请求
             self.recovery_requests.append(request)
-            self._save_data()
+            self._commit("recovery_requests", request)
             return True
         except Exception as e:
             logger.error(f"更新恢复请求失败: {str(e)}")
@@ -817,12 +1951,7 @@ class Storage:
         @param {int} user_id: 用户ID
         @return {int}: 总收入积分
         """
-        self._load_data()
-        total = 0
-        for tx in self.transactions:
-            if tx.user_id == user_id and tx.amount > 0:
-                total += tx.amount
-        return total
+        return self._earned_by_user.get(user_id, 0) + self._archive.rollup("transactions", user_id).get("earned", 0)
         
     def get_user_total_spent(self, user_id: int) -> int:
         """
@@ -830,13 +1959,160 @@ class Storage:
         @param {int} user_id: 用户ID
         @return {int}: 总支出积分（正数）
         """
-        self._load_data()
-        total = 0
-        for tx in self.transactions:
-            if tx.user_id == user_id and tx.amount < 0:
-                total += abs(tx.amount)
-        return total
+        return self._spent_by_user.get(user_id, 0) + self._archive.rollup("transactions", user_id).get("spent", 0)
+    
+    def get_user_transaction_summary(self, user_id: int) -> Dict[str, int]:
+        """
+        @description: 获取用户的交易汇总（含已归档的记录）
+        @param {int} user_id: 用户ID
+        @return {Dict[str, int]}: count/earned/spent
+        """
+        transactions = self._transactions_by_user.get(user_id)
+        rollup = self._archive.rollup("transactions", user_id)
+        return {
+            "count": (len(transactions) if transactions else 0) + rollup.get("count", 0),
+            "earned": self.get_user_total_earned(user_id),
+            "spent": self.get_user_total_spent(user_id),
+        }
+    
+    # 冷数据归档相关方法
+    def _is_archivable(self, name: str, record: Any, cutoff: date) -> bool:
+        """
+        @description: 判断记录是否应归档：早于截止日期、有主键，且不是待处理的交易
+        @param {str} name: 集合名称
+        @param {Any} record: 签到记录或交易记录
+        @param {date} cutoff: 截止日期
+        @return {bool}: 是否归档
+        """
+        if self._record_key(name, record) is None or self._record_day(name, record) >= cutoff:
+            return False
+        return name != "transactions" or record.status != TransactionStatus.PENDING
+    
+    @staticmethod
+    def _add_to_rollup(name: str, rollup: Dict[str, int], record: Any) -> None:
+        """
+        @description: 将一条归档记录计入用户汇总
+        @param {str} name: 集合名称
+        @param {Dict[str, int]} rollup: 用户汇总
+        @param {Any} record: 签到记录或交易记录
+        """
+        rollup["count"] = rollup.get("count", 0) + 1
+        if name == "checkin_records":
+            rollup["points"] = rollup.get("points", 0) + (record.points_earned or 0) + (record.streak_bonus or 0)
+        elif record.amount > 0:
+            rollup["earned"] = rollup.get("earned", 0) + record.amount
+        elif record.amount < 0:
+            rollup["spent"] = rollup.get("spent", 0) - record.amount
+    
+    def archive_old_records(self, horizon_days: int = None, today: date = None) -> Dict[str, int]:
+        """
+        @description: 将超过保留期限的签到与交易记录移入按月压缩的归档分区，并计入按用户汇总的统计；待处理的交易保留在内存中
+        @param {int} horizon_days: 保留天数，默认读取配置 STORAGE_ARCHIVE_HORIZON_DAYS，0表示不归档；不足 ARCHIVE_MIN_HORIZON_DAYS 时按最小值处理
+        @param {date} today: 当前日期，默认今天
+        @return {Dict[str, int]}: 集合名称 -> 本次归档的记录数
+        """
+        horizon = config.STORAGE_ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days
+        if horizon <= 0:
+            return {}
+        horizon = max(horizon, ARCHIVE_MIN_HORIZON_DAYS)
+        # 截止日期对齐到月初，已归档的月份分区之后不再变化
+        cutoff = ((today or date.today()) - timedelta(days=horizon)).replace(day=1)
+        
+        archived = {}
+        with self._archive_lock:
+            # 持有存储锁时只挑出冷记录的引用；读取、合并与写入分区以及写入清单都在锁外进行，避免阻塞事件循环线程
+            with self._lock:
+                manifest = json.loads(json.dumps(self._archive.manifest))
+                cold_records = {}
+                for name in ARCHIVE_DATE_FIELDS:
+                    previous = self._archive.cutoff(name)
+                    manifest["cutoff"][name] = max(previous, cutoff).isoformat() if previous else cutoff.isoformat()
+                    cold = [record for record in getattr(self, name) if self._is_archivable(name, record, cutoff)]
+                    if cold:
+                        cold_records[name] = cold
+            
+            # 在副本上计算新的清单，分区与清单都写入成功后才从内存中移除记录
+            for name, cold in cold_records.items():
+                key_field = COLLECTIONS[name][1]
+                self._archive.append(name, key_field, self._serialize_records(name, cold))
+                rollups = manifest["rollups"].setdefault(name, {})
+                for record in cold:
+                    self._add_to_rollup(name, rollups.setdefault(str(record.user_id), {}), record)
+                ids = [self._record_key(name, record) for record in cold]
+                manifest["max_ids"][name] = max(
+                    [manifest["max_ids"].get(name, 0)] + [key for key in ids if isinstance(key, int)]
+                )
+            self._archive.write_manifest(manifest)
+            
+            # 清单与内存中的记录必须同时切换，否则查询会重复计算或遗漏已归档的记录
+            with self._lock:
+                self._archive.apply_manifest(manifest)
+                for name, cold in cold_records.items():
+                    cold_ids = {id(record) for record in cold}
+                    setattr(self, name, [record for record in getattr(self, name) if id(record) not in cold_ids])
+                    self._rebuild_indexes(name)
+                    self._dirty.add(name)
+                    archived[name] = len(cold)
+        
+        if archived:
+            self._write_collections(list(archived))
+            logger.info(f"已归档 {cutoff.isoformat()} 之前的记录: " + ", ".join(
+                f"{COLLECTION_LABELS[name]} {count} 条" for name, count in archived.items()
+            ))
+        return archived
+    
+    def iter_archived_records(self, name: str, start: date = None, end: date = None, user_id: int = None):
+        """
+        @description: 按需读取已归档的签到或交易记录（不包含仍在内存中的记录）
+        @param {str} name: 集合名称，checkin_records 或 transactions
+        @param {date} start: 开始日期（含），默认不限
+        @param {date} end: 结束日期（不含），默认不限
+        @param {int} user_id: 只返回该用户的记录，默认不限
+        @return {Iterator[Any]}: 记录对象，按日期升序
+        """
+        for data in self._archive.iter_records(name, start, end):
+            if user_id is None or data.get("user_id") == user_id:
+                yield self._record_from_dict(name, data)
+
+# 进程级共享存储实例
+_storage_instance: Optional[Storage] = None
+_storage_instance_lock = threading.Lock()
+
+def init_storage(data_dir: str = None) -> Storage:
+    """
+    @description: 创建进程级共享存储实例，已存在时直接返回；根据配置 STORAGE_BACKEND 选择JSON或SQLite后端
+    @param {str} data_dir: 数据存储目录（仅JSON后端使用）
+    @return {Storage}: 共享存储实例（SQLite后端为接口相同的SQLiteStorage）
+    """
+    global _storage_instance
+    with _storage_instance_lock:
+        if _storage_instance is None:
+            if config.STORAGE_BACKEND == "sqlite":
+                from .sqlite_storage import SQLiteStorage
+                _storage_instance = SQLiteStorage()
+                logger.info(f"共享存储实例已初始化(SQLite): {_storage_instance.db_path}")
+            else:
+                _storage_instance = Storage(data_dir)
+                logger.info(f"共享存储实例已初始化: {_storage_instance.data_dir}")
+        return _storage_instance
+
+def get_storage() -> Storage:
+    """
+    @description: 获取进程级共享存储实例，未初始化时自动创建
+    @return {Storage}: 共享存储实例
+    """
+    if _storage_instance is None:
+        return init_storage()
+    return _storage_instance
 
-# 创建全局存储实例
-storage = Storage()
-storage._load_data() 
\ No newline at end of file
+def close_storage() -> None:
+    """
+    @description: 刷新并关闭共享存储实例
+    """
+    global _storage_instance
+    with _storage_instance_lock:
+        if _storage_instance is not None:
+            _storage_instance.close()
+            _storage_instance = None
+            logger.info("共享存储实例已关闭")
+ 
\ No newline at end of file
@@ -4,9 +4,10 @@
 import logging
 import csv
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict
 import re
+from itertools import chain
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -17,8 +18,8 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 
 from coser_bot.config.settings import ADMIN_IDS, DATA_DIR
-from coser_bot.config.constants import TEMPLATES
-from coser_bot.database.storage import Storage
+from coser_bot.config.constants import TEMPLATES, EmailVerifyStatus
+from coser_bot.database.storage import get_storage
 from coser_bot.database.models import Group, PointsTransaction, PointsTransactionType, User
 
 logger = logging.getLogger(__name__)
@@ -127,7 +128,7 @@ async def days_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         
         # 保存群组信息
-        storage = Storage()
+        storage = get_storage()
         if storage.save_group(group):
             await update.message.reply_text(
                 f"✅ 群组添加成功！\n\n"
@@ -174,7 +175,7 @@ async def admin_group_remove(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     try:
         group_id = int(context.args[0])
-        storage = Storage()
+        storage = get_storage()
         group = storage.get_group(group_id)
         
         if not group:
@@ -185,10 +186,7 @@ async def admin_group_remove(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         
         # 删除群组
-        if group_id in storage.groups:
-            del storage.groups[group_id]
-            storage._save_data()
-            
+        if storage.delete_group(group_id):
             await update.message.reply_text(
                 f"✅ 已成功删除群组：{group.group_name}",
                 parse_mode=ParseMode.HTML
@@ -215,7 +213,7 @@ async def admin_group_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         )
         return
     
-    storage = Storage()
+    storage = get_storage()
     groups = storage.groups
     
     if not groups:
@@ -273,7 +271,7 @@ async def admin_points(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         return
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 查找目标用户
     target_user = None
@@ -341,7 +339,7 @@ async def admin_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
     
-    storage = Storage()
+    storage = get_storage()
     users = storage.users
     
     if not users:
@@ -447,7 +445,7 @@ async def admin_list_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     page = int(match.group(1))
     
     # 获取用户列表
-    storage = Storage()
+    storage = get_storage()
     users = storage.users
     
     # 按积分排序
@@ -543,7 +541,7 @@ async def admin_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     target_user_id_or_username = context.args[0]
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 查找目标用户
     target_user = None
@@ -568,12 +566,15 @@ async def admin_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
     
-    # 获取用户的签到记录
-    checkins = storage.get_user_checkins(target_user.user_id)
-    total_checkins = len(checkins)
+    # 获取用户的签到次数（含已归档的记录）
+    total_checkins = storage.get_user_checkin_count(target_user.user_id)
     
-    # 获取用户的交易记录
-    transactions = storage.get_user_transactions(target_user.user_id)
+    # 获取用户的全部交易记录，已归档的部分按需从归档分区读取
+    summary = storage.get_user_transaction_summary(target_user.user_id)
+    transactions = chain(
+        storage.get_user_transactions(target_user.user_id, limit=summary["count"]),
+        storage.iter_archived_records("transactions", user_id=target_user.user_id)
+    )
     
     # 计算收到和发出的礼物
     received_gifts = 0
@@ -585,21 +586,21 @@ async def admin_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
             sent_gifts += 1
     
     # 获取用户的邮箱验证状态
-    email_verifications = storage.get_user_email_verifications(target_user.user_id)
+    email_verifications = storage.get_email_verifications_by_user(target_user.user_id)
     email_status = "未验证"
     if email_verifications:
         for verification in email_verifications:
-            if verification.is_verified:
+            if verification.status == EmailVerifyStatus.VERIFIED:
                 email_status = f"已验证 ({verification.email})"
                 break
     
     # 获取用户的群组权限
-    group_permissions = storage.get_user_group_permissions(target_user.user_id)
+    group_permissions = storage.get_user_group_accesses(target_user.user_id)
     groups_info = []
     for perm in group_permissions:
         group = storage.get_group(perm.group_id)
         if group:
-            expiry_info = "永久" if perm.expiry_date is None else f"到期: {perm.expiry_date.strftime('%Y-%m-%d')}"
+            expiry_info = "永久" if perm.end_date is None else f"到期: {perm.end_date.strftime('%Y-%m-%d')}"
             groups_info.append(f"{group.group_name} ({expiry_info})")
     
     groups_text = "\n".join([f"• {g}" for g in groups_info]) if groups_info else "无"
@@ -618,6 +619,8 @@ async def admin_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
 <b>累计数据：</b>
 📝 总签到次数：{total_checkins}
+📈 累计获得：{summary['earned']} 积分
+📉 累计支出：{summary['spent']} 积分
 🎁 收到礼物：{received_gifts}
 💝 发出礼物：{sent_gifts}
 
@@ -658,7 +661,7 @@ async def admin_info_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     target_user_id = int(match.group(1))
     
     # 获取用户信息
-    storage = Storage()
+    storage = get_storage()
     user = storage.get_user(target_user_id)
     
     if not user:
@@ -729,7 +732,7 @@ async def admin_adjust_callback(update: Update, context: ContextTypes.DEFAULT_TY
     target_user_id = int(match.group(1))
     
     # 获取用户信息
-    storage = Storage()
+    storage = get_storage()
     user = storage.get_user(target_user_id)
     
     if not user:
@@ -790,7 +793,7 @@ async def adjust_points_callback(update: Update, context: ContextTypes.DEFAULT_T
     points_change = int(match.group(2))
     
     # 获取用户信息
-    storage = Storage()
+    storage = get_storage()
     user = storage.get_user(target_user_id)
     
     if not user:
@@ -862,7 +865,7 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取用户统计
     users = storage.users
@@ -875,13 +878,17 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     max_points_user = max(users.values(), key=lambda x: x.points) if users else None
     
     # 获取签到统计
-    checkins = storage.checkin_records
-    total_checkins = len(checkins)
-    today_checkins = sum(1 for c in checkins if c.checkin_date == datetime.now().date())
+    today = datetime.now().date()
+    month_start = today.replace(day=1)
+    # 签到总数包含已归档月份的记录
+    total_checkins = storage.get_total_checkin_count()
+    today_checkins = storage.count_checkins_on(today)
+    month_distribution = storage.get_checkin_count_distribution(month_start, today + timedelta(days=1))
     
     # 获取交易统计
-    transactions = storage.transactions
-    total_transactions = len(transactions)
+    # 交易总数与按类型统计都包含已归档月份的记录
+    total_transactions = storage.get_total_transaction_count()
+    transactions = chain(storage.transactions, storage.iter_archived_records("transactions"))
     
     # 获取群组统计
     groups = storage.groups
@@ -890,7 +897,7 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     # 获取邮箱验证统计
     email_verifications = storage.email_verifications
     total_verifications = len(email_verifications)
-    verified_count = sum(1 for v in email_verifications.values() if v.is_verified)
+    verified_count = sum(1 for v in email_verifications if v.status == EmailVerifyStatus.VERIFIED)
     
     # 构建统计信息消息
     message = f"📊 <b>系统统计信息</b>\n\n"
@@ -909,7 +916,14 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     message += "<b>签到统计</b>\n"
     message += f"✅ 总签到次数: {total_checkins}\n"
     message += f"📆 今日签到: {today_checkins}\n"
-    message += f"📈 签到率: {today_checkins/total_users*100:.1f}% 的用户\n\n" if total_users > 0 else "📈 签到率: 0.0% 的用户\n\n"
+    message += f"📈 签到率: {today_checkins/total_users*100:.1f}% 的用户\n" if total_users > 0 else "📈 签到率: 0.0% 的用户\n"
+    if month_distribution["users"]:
+        message += (
+            f"🗓 本月签到用户: {month_distribution['users']} "
+            f"(人均 {month_distribution['mean']:.1f} 次，中位数 {month_distribution['median']:.0f}，"
+            f"P90 {month_distribution['p90']:.0f}，最多 {month_distribution['max']:.0f})\n"
+        )
+    message += "\n"
     
     message += "<b>交易统计</b>\n"
     message += f"🔄 总交易数: {total_transactions}\n"
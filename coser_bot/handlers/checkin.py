@@ -17,7 +17,7 @@ from ..config.settings import (
 )
 from ..config.constants import TEMPLATES
 from ..database.models import User, CheckinRecord, PointsTransaction, PointsTransactionType
-from ..database.storage import Storage
+from ..database.storage import get_storage
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +42,7 @@ async def checkin_user(user_id: int, username: str) -> Tuple[bool, str]:
     """
     try:
         # 获取存储对象
-        storage = Storage()
+        storage = get_storage()
         
         # 获取或创建用户
         user = storage.get_user(user_id)
@@ -117,7 +117,6 @@ async def checkin_user(user_id: int, username: str) -> Tuple[bool, str]:
         
         # 创建签到记录
         record = CheckinRecord(
-            record_id=len(storage.checkin_records) + 1,
             user_id=user_id,
             checkin_date=datetime.now(),
             points=points,
@@ -128,7 +127,6 @@ async def checkin_user(user_id: int, username: str) -> Tuple[bool, str]:
         
         # 创建积分交易记录
         transaction = PointsTransaction(
-            transaction_id=len(storage.transactions) + 1,
             user_id=user_id,
             amount=points + streak_bonus,
             type=PointsTransactionType.CHECKIN,
@@ -190,7 +188,7 @@ async def process_checkin(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return "❌ 无法获取用户信息，请稍后再试"
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取或创建用户
     user = storage.get_user(telegram_user.id)
@@ -426,7 +424,7 @@ async def process_checkin_callback(
     @param {Optional[int]} thread_id: 话题ID
     @return {None}
     """
-    storage = Storage()
+    storage = get_storage()
     try:
         # 获取用户信息，如果不存在则创建
         user = storage.get_user(user_id)
@@ -20,7 +20,7 @@ from coser_bot.config.settings import (
     EMAIL_VERIFICATION_BONUS
 )
 from coser_bot.config.constants import TEMPLATES, EmailVerifyStatus, PointsTransactionType
-from coser_bot.database.storage import Storage
+from coser_bot.database.storage import get_storage
 from coser_bot.database.models import User, EmailVerification, PointsTransaction
 from coser_bot.utils.email_sender import (
     send_verification_email, 
@@ -28,9 +28,6 @@ from coser_bot.utils.email_sender import (
     is_valid_email
 )
 
-# 创建存储实例
-storage = Storage()
-
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -61,11 +58,7 @@ async def bind_email_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if not storage_obj:
             # 使用全局存储对象
             logger.warning(f"从context中未找到存储对象，使用全局存储对象 - 用户ID: {user_id}")
-            storage_obj = storage
-        
-        # 强制重新加载数据
-        if hasattr(storage_obj, "_load_data"):
-            storage_obj._load_data()
+            storage_obj = get_storage()
         
         user = storage_obj.get_user(user_id)
         
@@ -510,6 +503,7 @@ async def keep_email_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @return {int}: 会话状态
     """
+    storage = get_storage()
     query = update.callback_query
     await query.answer()
     
@@ -530,6 +524,7 @@ async def start_email_binding(update: Update, context: ContextTypes.DEFAULT_TYPE
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @return {int}: 会话状态
     """
+    storage = get_storage()
     # 检查是否是通过按钮回调调用
     if update.callback_query:
         query = update.callback_query
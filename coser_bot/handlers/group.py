@@ -2,7 +2,9 @@ from telegram import Update
 from telegram.ext import ContextTypes, ChatMemberHandler
 from telegram.constants import ChatMemberStatus
 
+from ..database.storage import get_storage
 from ..utils.group_sync import GroupSyncManager
+from ..utils.membership_cache import get_membership_cache, NON_MEMBER_STATUSES
 
 async def handle_chat_member_updated(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """处理群组成员更新事件"""
@@ -13,18 +15,26 @@ async def handle_chat_member_updated(update: Update, context: ContextTypes.DEFAU
     user_id = update.chat_member.new_chat_member.user.id
     new_status = update.chat_member.new_chat_member.status
     
-    # 获取 GroupSyncManager 实例
+    # 成员变更事件携带最新状态，直接写入成员状态缓存，群组同步无需再次查询
+    get_membership_cache().put(chat_id, user_id, new_status)
+    
+    # 其他机器人不记录访问权限
+    if update.chat_member.new_chat_member.user.is_bot:
+        return
+    
+    # 获取 GroupSyncManager 实例，未注册时按共享存储创建
     sync_manager = context.bot_data.get('group_sync_manager')
     if not sync_manager:
-        return
+        sync_manager = GroupSyncManager(context.bot, get_storage())
+        context.bot_data['group_sync_manager'] = sync_manager
         
     # 判断成员状态
-    is_member = new_status not in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED, ChatMemberStatus.BANNED]
-    is_admin = new_status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR]
+    is_member = new_status not in NON_MEMBER_STATUSES
+    is_admin = new_status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]
     
     # 更新成员状态
     await sync_manager.handle_member_update(
-        group_id=chat_id,
+        chat_id=chat_id,
         user_id=user_id,
         is_member=is_member,
         is_admin=is_admin
@@ -1,22 +1,38 @@
 """
 @description: 群组同步模块，负责同步用户的群组权益数据
 """
+import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from telegram import Update
 from telegram.ext import (
     ContextTypes,
     MessageHandler,
+    ChatMemberHandler,
     filters
 )
 
-from ..database.storage import Storage
+from ..config import config
+from ..database.storage import get_storage
 from ..database.models import UserGroupAccess, Group
+from .group import handle_chat_member_updated
+from ..utils.membership_cache import get_membership_cache, NON_MEMBER_STATUSES, PROBE_FAILED
+from ..utils.message_throttle import get_message_throttle
+from ..utils.rate_limiter import background_kwargs
 
 logger = logging.getLogger(__name__)
 
+# 查询失败且群组不可访问时的探测结果，此时清理用户在该群组的访问记录
+CHAT_UNREACHABLE = "chat_unreachable"
+
+# 已确认的访问记录距上次确认超过该时长时才刷新确认时间，避免活跃用户的每条消息都触发写入
+VERIFIED_AT_REFRESH = timedelta(hours=1)
+
+# 限制同时进行的成员查询数，所有消息共享
+_probe_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
 async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理用户消息，记录用户所在的群组"""
     if not update.effective_chat or not update.effective_user:
@@ -29,7 +45,7 @@ async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not chat.type.endswith("group") and not chat.type == "channel":
         return
         
-    storage = Storage()
+    storage = get_storage()
     
     # 检查当前群组是否是已知的权益群组
     current_group = storage.get_group_by_chat_id(chat.id)
@@ -37,112 +53,199 @@ async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         # 如果不是已知的权益群组，直接返回
         return
         
+    # 同一用户在同一群组的消息在节流窗口内只处理一次
+    if not get_message_throttle().should_process(chat.id, user.id):
+        return
+        
     logger.info(f"处理用户 {user.username or user.first_name} (ID: {user.id}) 在权益群组 {chat.title} (ID: {chat.id}) 的消息")
     
-    # 首先处理当前群组的权限
-    try:
-        # 获取用户在当前群组的访问记录
-        current_access = storage.get_user_group_access(user.id, current_group.group_id)
-        if not current_access:
-            # 如果用户在当前群组中没有访问记录，创建一个
-            current_access = UserGroupAccess(
-                access_id=len(storage.user_group_access) + 1,
-                user_id=user.id,
-                group_id=current_group.group_id,
-                start_date=datetime.now(),
-                end_date=None
-            )
-            storage.add_user_group_access(current_access)
-            logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {current_group.group_name}")
-            storage._save_data()
-    except Exception as e:
-        logger.error(f"处理用户 {user.id} 在当前群组 {current_group.group_name} 的权限时出错: {str(e)}")
+    now = datetime.now()
+    added: List[UserGroupAccess] = []
+    removed: List[UserGroupAccess] = []
+    updated: List[UserGroupAccess] = []
+    
+    def confirm(access: UserGroupAccess) -> None:
+        # 刷新已确认仍在群组中的访问记录，避免活跃成员在定时对账时被重复查询
+        if access.verified_at is None or now - access.verified_at >= VERIFIED_AT_REFRESH:
+            access.verified_at = now
+            updated.append(access)
+    
+    # 首先处理当前群组的权限，用户在当前群组发言即说明仍是成员
+    current_access = storage.get_user_group_access(user.id, current_group.group_id)
+    if current_access:
+        confirm(current_access)
+    else:
+        # 如果用户在当前群组中没有访问记录，创建一个
+        added.append(UserGroupAccess(
+            user_id=user.id,
+            group_id=current_group.group_id,
+            start_date=now,
+            end_date=None,
+            verified_at=now
+        ))
+        logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {current_group.group_name}")
+
+    # 然后检查其他群组的权限，优先使用缓存的成员状态，每个用户在每个群组的有效期内最多查询一次
+    membership_cache = get_membership_cache()
+    statuses: Dict[int, str] = {}
+    probed: Set[int] = set()
+    probe_groups: List[Group] = []
+    # 跳过当前群组，因为已经处理过了
+    other_groups = [group for group in storage.get_all_groups() if group.group_id != current_group.group_id]
+    for group in other_groups:
+        status = membership_cache.get(group.chat_id, user.id)
+        if status is None:
+            probe_groups.append(group)
+        elif status != PROBE_FAILED:
+            statuses[group.group_id] = status
+    
+    # 未缓存的群组并发查询，并发数受信号量限制，请求以后台优先级经过全局调度器
+    results = await asyncio.gather(*(_probe_member_status(context, group, user.id) for group in probe_groups))
+    for group, status in zip(probe_groups, results):
+        membership_cache.put(group.chat_id, user.id, PROBE_FAILED if status == CHAT_UNREACHABLE else status)
+        if status == CHAT_UNREACHABLE:
+            # 如果群组不可访问，清理相关的访问记录
+            access = storage.get_user_group_access(user.id, group.group_id)
+            if access:
+                removed.append(access)
+                logger.info(f"已清理用户 {user.id} 在不可访问群组 {group.group_name} 的访问记录")
+        elif status != PROBE_FAILED:
+            statuses[group.group_id] = status
+            probed.add(group.group_id)
+    
+    for group in other_groups:
+        status = statuses.get(group.group_id)
+        if status is None:
+            continue
+        access = storage.get_user_group_access(user.id, group.group_id)
+        if status not in NON_MEMBER_STATUSES:
+            # 如果用户是群组成员且没有对应的访问记录，则创建；刚查询确认的已有记录刷新确认时间
+            if access:
+                if group.group_id in probed:
+                    confirm(access)
+            else:
+                added.append(UserGroupAccess(
+                    user_id=user.id,
+                    group_id=group.group_id,
+                    start_date=now,
+                    end_date=None,
+                    verified_at=now
+                ))
+                logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {group.group_name}")
+        elif access:
+            # 如果用户不在群组中但有访问记录，则移除记录
+            removed.append(access)
+            logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 已离开权益群组 {group.group_name}")
+    
+    # 所有群组的变更合并为一次存储更新
+    if not storage.apply_user_group_access_changes(added, removed, updated):
+        logger.error(f"保存用户 {user.id} 的群组访问记录失败")
+
+def _get_probe_semaphore() -> asyncio.Semaphore:
+    """获取限制并发成员查询数的信号量（信号量绑定事件循环，按当前事件循环创建）"""
+    global _probe_semaphore
+    loop = asyncio.get_running_loop()
+    if _probe_semaphore is None or _probe_semaphore[0] is not loop:
+        _probe_semaphore = (loop, asyncio.Semaphore(max(1, config.GROUP_SYNC_PROBE_CONCURRENCY)))
+    return _probe_semaphore[1]
 
-    # 然后检查其他群组的权限
-    all_groups = storage.get_all_groups()
-    for group in all_groups:
-        if group.group_id == current_group.group_id:
-            continue  # 跳过当前群组，因为已经处理过了
-            
+async def _probe_member_status(context: ContextTypes.DEFAULT_TYPE, group: Group, user_id: int) -> str:
+    """
+    @description: 查询用户在群组中的成员状态
+    @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
+    @param {Group} group: 群组
+    @param {int} user_id: 用户ID
+    @return {str}: 成员状态；查询失败但群组仍可访问时为 PROBE_FAILED，群组不可访问时为 CHAT_UNREACHABLE
+    """
+    async with _get_probe_semaphore():
         try:
             # 获取用户在该群组中的成员信息
-            chat_member = await context.bot.get_chat_member(group.chat_id, user.id)
-            
-            # 如果用户是群组成员且没有对应的访问记录，则创建
-            if chat_member.status not in ['left', 'kicked', 'banned']:
-                access = storage.get_user_group_access(user.id, group.group_id)
-                if not access:
-                    # 创建新的访问记录
-                    access = UserGroupAccess(
-                        access_id=len(storage.user_group_access) + 1,
-                        user_id=user.id,
-                        group_id=group.group_id,
-                        start_date=datetime.now(),
-                        end_date=None
-                    )
-                    storage.add_user_group_access(access)
-                    logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {group.group_name}")
-                    storage._save_data()
-                else:
-                    # 更新现有记录的最后活动时间
-                    access.last_active = datetime.now()
-                    storage._save_data()
-            else:
-                # 如果用户不在群组中但有访问记录，则移除记录
-                access = storage.get_user_group_access(user.id, group.group_id)
-                if access:
-                    storage.user_group_access.remove(access)
-                    logger.info(f"用户 {user.username or user.first_name} (ID: {user.id}) 已离开权益群组 {group.group_name}")
-                    storage._save_data()
+            chat_member = await context.bot.get_chat_member(group.chat_id, user_id, **background_kwargs(context.bot))
+            return chat_member.status
         except Exception as e:
-            logger.error(f"检查用户 {user.id} 在群组 {group.group_name} 的状态时出错: {str(e)}")
-            # 尝试重新获取群组成员信息
-            try:
-                await context.bot.get_chat(group.chat_id)
-                logger.info(f"群组 {group.group_name} 仍然可访问，保留错误记录以供后续处理")
-            except Exception as chat_error:
-                logger.warning(f"群组 {group.group_name} 不可访问，可能已被删除或机器人被移除: {str(chat_error)}")
-                # 如果群组不可访问，考虑清理相关的访问记录
-                access = storage.get_user_group_access(user.id, group.group_id)
-                if access:
-                    storage.user_group_access.remove(access)
-                    storage._save_data()
-                    logger.info(f"已清理用户 {user.id} 在不可访问群组 {group.group_name} 的访问记录")
+            logger.error(f"检查用户 {user_id} 在群组 {group.group_name} 的状态时出错: {str(e)}")
+        # 尝试重新获取群组信息
+        try:
+            await context.bot.get_chat(group.chat_id, **background_kwargs(context.bot))
+            logger.info(f"群组 {group.group_name} 仍然可访问，保留错误记录以供后续处理")
+            return PROBE_FAILED
+        except Exception as chat_error:
+            logger.warning(f"群组 {group.group_name} 不可访问，可能已被删除或机器人被移除: {str(chat_error)}")
+            return CHAT_UNREACHABLE
 
 async def sync_group_members(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """定时同步群组成员"""
-    storage = Storage()
+    """
+    @description: 定时对账群组成员；加入与离开由 chat_member 事件实时更新，这里只补充管理员，
+                  并重新查询超过 GROUP_SYNC_STALE_HOURS 未确认的访问记录（每次最多 GROUP_SYNC_RECONCILE_BATCH 条）
+    @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
+    """
+    storage = get_storage()
+    membership_cache = get_membership_cache()
+    now = datetime.now()
+    added: List[UserGroupAccess] = []
+    removed: List[UserGroupAccess] = []
+    updated: List[UserGroupAccess] = []
     
     # 获取所有已知的权益群组
-    groups = storage.get_all_groups()
+    groups = {group.group_id: group for group in storage.get_all_groups()}
     
-    for group in groups:
+    for group in groups.values():
         try:
-            # 获取群组成员
-            chat_members = await context.bot.get_chat_administrators(group.chat_id)
-            
-            # 更新群组成员的访问记录
-            for member in chat_members:
-                user = member.user
-                access = storage.get_user_group_access(user.id, group.group_id)
-                
-                if not access:
-                    # 创建新的访问记录
-                    access = UserGroupAccess(
-                        access_id=len(storage.user_group_access) + 1,
-                        user_id=user.id,
-                        group_id=group.group_id,
-                        start_date=datetime.now(),
-                        end_date=None
-                    )
-                    storage.add_user_group_access(access)
-                    logger.info(f"同步: 用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {group.group_name}")
-            
-            # 保存数据
-            storage._save_data()
-                
+            # 管理员列表一次请求即可获取，顺带确认管理员的访问记录
+            chat_members = await context.bot.get_chat_administrators(group.chat_id, **background_kwargs(context.bot))
         except Exception as e:
             logger.error(f"同步权益群组 {group.group_name} (ID: {group.group_id}) 成员失败: {e}")
+            continue
+        
+        for member in chat_members:
+            user = member.user
+            membership_cache.put(group.chat_id, user.id, member.status)
+            access = storage.get_user_group_access(user.id, group.group_id)
+            if not access:
+                # 创建新的访问记录
+                added.append(UserGroupAccess(
+                    user_id=user.id,
+                    group_id=group.group_id,
+                    start_date=now,
+                    end_date=None,
+                    verified_at=now
+                ))
+                logger.info(f"同步: 用户 {user.username or user.first_name} (ID: {user.id}) 加入权益群组 {group.group_name}")
+            else:
+                access.verified_at = now
+                updated.append(access)
+    
+    # 只重新查询长时间未确认的访问记录，最久未确认的优先
+    stale_before = now - timedelta(hours=config.GROUP_SYNC_STALE_HOURS)
+    confirmed = {(access.user_id, access.group_id) for access in updated}
+    stale = [
+        access
+        for group_id in groups
+        for access in storage.get_group_user_accesses(group_id)
+        if (access.user_id, access.group_id) not in confirmed and (access.verified_at is None or access.verified_at < stale_before)
+    ]
+    stale.sort(key=lambda access: access.verified_at or datetime.min)
+    stale = stale[:config.GROUP_SYNC_RECONCILE_BATCH]
+    
+    results = await asyncio.gather(*(
+        _probe_member_status(context, groups[access.group_id], access.user_id) for access in stale
+    ))
+    for access, status in zip(stale, results):
+        group = groups[access.group_id]
+        membership_cache.put(group.chat_id, access.user_id, PROBE_FAILED if status == CHAT_UNREACHABLE else status)
+        if status == PROBE_FAILED:
+            continue
+        if status == CHAT_UNREACHABLE or status in NON_MEMBER_STATUSES:
+            removed.append(access)
+            logger.info(f"同步: 用户 {access.user_id} 已不在权益群组 {group.group_name}，移除访问记录")
+        else:
+            access.verified_at = now
+            updated.append(access)
+    
+    # 所有群组的变更合并为一次存储更新
+    if not storage.apply_user_group_access_changes(added, removed, updated):
+        logger.error("保存群组成员对账结果失败")
+    logger.info(f"群组成员对账完成: 查询 {len(stale)} 条过期记录，新增 {len(added)}，确认 {len(updated)}，移除 {len(removed)}")
 
 def get_group_sync_handlers():
     """获取群组同步相关的处理器"""
@@ -150,5 +253,7 @@ def get_group_sync_handlers():
         MessageHandler(
             (filters.ChatType.GROUPS | filters.ChatType.CHANNEL) & ~filters.Regex(r"^(积分|积分排行)$"),  # 只处理群组和频道消息，但排除关键词
             handle_user_message
-        )
+        ),
+        # 成员加入与离开事件，实时更新访问记录与成员状态缓存
+        ChatMemberHandler(handle_chat_member_updated, ChatMemberHandler.CHAT_MEMBER)
     ] 
\ No newline at end of file
@@ -8,7 +8,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
 from telegram.constants import ParseMode
 
-from ..database.storage import Storage
+from ..database.storage import get_storage
 from ..database.models import User
 from ..config.constants import TEMPLATES
 
@@ -30,7 +30,7 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
         str: 排行榜文本
     """
     try:
-        storage = Storage()
+        storage = get_storage()
         users = storage.get_all_users()
         logger.info(f"获取到 {len(users)} 个用户数据")
         
@@ -40,6 +40,7 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
                 update_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             )
         
+        value_of = None
         if board_type == "points":
             # 积分排行
             users.sort(key=lambda x: x.points, reverse=True)
@@ -56,12 +57,20 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
             # 刷新当前排行榜
             return await get_leaderboard_text("points", user_id)
         else:  # monthly
-            # 本月签到排行
-            users.sort(key=lambda x: x.monthly_checkins, reverse=True)
+            # 本月签到排行：按本月签到记录统计，不依赖只在签到时才会重置的 monthly_checkins
+            today = date.today()
+            month_start = today.replace(day=1)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            monthly_counts = storage.get_checkin_counts_by_user(month_start, next_month)
+            value_of = lambda u: monthly_counts.get(u.user_id, 0)
+            users.sort(key=value_of, reverse=True)
             title = "📅 本月签到排行榜 TOP 10"
             value_key = "monthly_checkins"
             value_suffix = "次"
         
+        if value_of is None:
+            value_of = lambda u: getattr(u, value_key)
+        
         # 生成排行榜文本
         text = f"<b>{title}</b>\n\n"
         
@@ -77,7 +86,7 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
         # 显示排行榜内容
         for i, user in enumerate(users[:10], 1):
             rank_emoji = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            value = getattr(user, value_key)
+            value = value_of(user)
             display_name = user.first_name if hasattr(user, 'first_name') and user.first_name else user.username
             # 为当前用户添加标记
             if user_id and user.user_id == user_id:
@@ -89,7 +98,7 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
             user_rank = next((i for i, u in enumerate(users, 1) if u.user_id == user_id), None)
             if user_rank:
                 user = next(u for u in users if u.user_id == user_id)
-                value = getattr(user, value_key)
+                value = value_of(user)
                 display_name = user.first_name if hasattr(user, 'first_name') and user.first_name else user.username
                 
                 # 添加分隔线
@@ -107,7 +116,7 @@ async def get_leaderboard_text(board_type: str, user_id: int = None) -> str:
                     next_rank = user_rank - 1
                     if next_rank <= len(users):
                         next_user = users[next_rank - 1]
-                        next_value = getattr(next_user, value_key)
+                        next_value = value_of(next_user)
                         diff = next_value - value
                         if diff > 0:
                             text += f"\n🎯 距离上一名还差：{format_number(diff)} {value_suffix}"
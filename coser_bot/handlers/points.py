@@ -23,7 +23,7 @@ from ..config.settings import (
     GIFT_EXPIRY_HOURS, MIN_GIFT_AMOUNT, MAX_GIFT_AMOUNT
 )
 from ..config.constants import TEMPLATES
-from ..database.storage import Storage
+from ..database.storage import get_storage
 from ..database.models import (
     User, PointsTransaction, PointsTransactionType, TransactionStatus
 )
@@ -86,7 +86,7 @@ async def handle_gift_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         reason = username_match.group(3) or "无"
         
         # 获取存储对象
-        storage = Storage()
+        storage = get_storage()
         
         # 查找接收者
         receiver_user = None
@@ -162,7 +162,7 @@ async def handle_gift_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取赠送者
     sender_user = storage.get_user(sender.id)
@@ -311,7 +311,7 @@ async def process_gift(
     @param {str} receiver_username: 接收者用户名
     """
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取赠送者
     sender = storage.get_user(sender_id)
@@ -450,7 +450,7 @@ async def process_gift(
         
         # 更新交易状态
         transaction.status = TransactionStatus.CANCELLED
-        storage.add_transaction(transaction)
+        storage.update_transaction(transaction)
         
         return
     
@@ -497,7 +497,7 @@ async def handle_gift_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         return
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取赠送者和接收者
     sender = storage.get_user(transaction_info["sender_id"])
@@ -528,7 +528,7 @@ async def accept_gift(
     @param {Dict[str, Any]} transaction_info: 交易信息
     """
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 解冻赠送者的积分
     sender.frozen_points -= transaction_info["amount"]
@@ -539,10 +539,10 @@ async def accept_gift(
     storage.save_user(receiver)
     
     # 更新交易状态
-    transaction = next((t for t in storage.transactions if t.transaction_id == transaction_id), None)
+    transaction = storage.get_transaction(transaction_id)
     if transaction:
         transaction.status = TransactionStatus.COMPLETED
-        storage.add_transaction(transaction)
+        storage.update_transaction(transaction)
     
     # 创建接收者的交易记录
     receiver_transaction = PointsTransaction(
@@ -632,7 +632,7 @@ async def reject_gift(
     @param {Dict[str, Any]} transaction_info: 交易信息
     """
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 解冻并返还赠送者的积分
     sender.frozen_points -= transaction_info["amount"]
@@ -640,10 +640,10 @@ async def reject_gift(
     storage.save_user(sender)
     
     # 更新交易状态
-    transaction = next((t for t in storage.transactions if t.transaction_id == transaction_id), None)
+    transaction = storage.get_transaction(transaction_id)
     if transaction:
         transaction.status = TransactionStatus.REJECTED
-        storage.add_transaction(transaction)
+        storage.update_transaction(transaction)
     
     # 更新消息
     try:
@@ -704,7 +704,7 @@ async def check_expired_transaction(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 获取赠送者
     sender = storage.get_user(transaction_info["sender_id"])
@@ -724,10 +724,10 @@ async def check_expired_transaction(context: ContextTypes.DEFAULT_TYPE) -> None:
     storage.save_user(sender)
     
     # 更新交易状态
-    transaction = next((t for t in storage.transactions if t.transaction_id == transaction_id), None)
+    transaction = storage.get_transaction(transaction_id)
     if transaction:
         transaction.status = TransactionStatus.EXPIRED
-        storage.add_transaction(transaction)
+        storage.update_transaction(transaction)
     
     # 更新消息
     try:
@@ -776,7 +776,7 @@ async def points_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     @param {ContextTypes.DEFAULT_TYPE} context: 上下文对象
     """
     user = update.effective_user
-    storage = Storage()
+    storage = get_storage()
     
     # 获取用户
     db_user = storage.get_user(user.id)
@@ -844,7 +844,7 @@ async def handle_points_callback(update: Update, context: ContextTypes.DEFAULT_T
     
     try:
         # 获取存储对象
-        storage = Storage()
+        storage = get_storage()
         user = storage.get_user(user_id)
         
         if not user:
@@ -927,7 +927,7 @@ async def handle_points_callback(update: Update, context: ContextTypes.DEFAULT_T
         elif callback_data == "refresh_points":
             # 刷新积分信息
             # 重新从存储中获取用户数据
-            storage = Storage()
+            storage = get_storage()
             user = storage.get_user(user_id)
             if not user:
                 await query.answer("❌ 用户数据不存在")
@@ -1054,7 +1054,7 @@ async def get_user_points_info(user_id: int) -> str:
     """
     try:
         # 获取存储对象
-        storage = Storage()
+        storage = get_storage()
         
         # 获取用户信息
         user = storage.get_user(user_id)
@@ -20,20 +20,18 @@ from coser_bot.config.settings import (
     ADMIN_IDS
 )
 from coser_bot.config.constants import TEMPLATES, EmailVerifyStatus
-from coser_bot.database.storage import Storage
+from coser_bot.database.storage import get_storage
 from coser_bot.database.models import (
     User, EmailVerification, Group, UserGroupAccess, 
     RecoveryRequest, RecoveryStatus
 )
+from coser_bot.utils.rate_limiter import background_kwargs
 from coser_bot.utils.email_sender import (
     generate_verification_code, send_verification_email, is_valid_email
 )
 
 logger = logging.getLogger(__name__)
 
-# 创建Storage实例
-storage = Storage()
-
 # 会话状态
 WAITING_FOR_EMAIL = 1
 WAITING_FOR_VERIFICATION = 2
@@ -46,6 +44,7 @@ async def recover_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @return {int}: 会话状态
     """
+    storage = get_storage()
     user_id = update.effective_user.id
     username = update.effective_user.username or f"user_{user_id}"
     
@@ -81,6 +80,7 @@ async def recovery_email_input(update: Update, context: ContextTypes.DEFAULT_TYP
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @return {int}: 会话状态
     """
+    storage = get_storage()
     email = update.message.text.strip().lower()
     
     # 记录用户输入的邮箱
@@ -180,7 +180,7 @@ async def process_recovery_verification(update: Update, context: ContextTypes.DE
     @param {str} verification_code: 用户输入的验证码
     @return {int}: 会话状态
     """
-    global storage
+    storage = get_storage()
     
     new_user_id = update.effective_user.id
     
@@ -266,10 +266,6 @@ async def process_recovery_verification(update: Update, context: ContextTypes.DE
     verification.status = EmailVerifyStatus.VERIFIED
     storage.update_email_verification(verification)
     
-    # 强制重新加载数据
-    storage = Storage()
-    storage._load_data()
-    
     # 获取原始用户的群组访问权限
     original_user_groups = storage.get_user_group_accesses(original_user_id)
     logger.info(f"原始用户 {original_user_id} ({original_user.username}) 的群组访问权限: {len(original_user_groups)} 个")
@@ -365,6 +361,7 @@ async def recovery_reason_input(update: Update, context: ContextTypes.DEFAULT_TY
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @return {int}: 会话状态
     """
+    storage = get_storage()
     reason = update.message.text.strip()
     
     logger.info(f"收到用户 {update.effective_user.id} 的恢复原因: {reason}")
@@ -468,7 +465,7 @@ async def notify_admins_about_recovery(context: ContextTypes.DEFAULT_TYPE, recov
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     @param {RecoveryRequest} recovery_request: 恢复请求对象
     """
-    global storage
+    storage = get_storage()
     
     try:
         logger.info(f"开始执行恢复流程 - 请求ID: {recovery_request.request_id}, 状态: {recovery_request.status}, 类型: {recovery_request.approval_type}")
@@ -483,9 +480,6 @@ async def notify_admins_about_recovery(context: ContextTypes.DEFAULT_TYPE, recov
             
         logger.debug(f"用户信息 - 原用户: {original_user.username} ({original_user.user_id}), 新用户: {new_user.username} ({new_user.user_id})")
         
-        # 重新加载数据
-        storage._load_data()
-        
         # 获取原始用户的群组访问权限
         original_user_groups = storage.get_user_group_accesses(recovery_request.old_user_id)
         logger.info(f"原始用户 {recovery_request.old_user_id} ({original_user.username}) 的群组访问权限: {len(original_user_groups)} 个")
@@ -655,7 +649,8 @@ async def notify_admins_about_recovery(context: ContextTypes.DEFAULT_TYPE, recov
                     await context.bot.send_message(
                         chat_id=admin_id,
                         text=admin_message,
-                        parse_mode=ParseMode.HTML
+                        parse_mode=ParseMode.HTML,
+                        **background_kwargs(context.bot)
                     )
                 except Exception as e:
                     logger.error(f"无法发送通知给管理员 {admin_id}: {str(e)}")
@@ -682,7 +677,7 @@ async def generate_invite_links(bot: Bot, user_id: int, groups: List[Group]) ->
     @return: 群组ID到邀请链接的映射字典
     """
     invite_links = {}
-    storage_instance = Storage()
+    storage_instance = get_storage()
     
     if not groups:
         logger.warning(f"没有需要生成邀请链接的群组")
@@ -744,6 +739,7 @@ async def approve_recovery_callback(update: Update, context: ContextTypes.DEFAUL
     @param {Update} update: Telegram更新对象
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     """
+    storage = get_storage()
     query = update.callback_query
     await query.answer()
     
@@ -962,6 +958,7 @@ async def reject_recovery_callback(update: Update, context: ContextTypes.DEFAULT
     @param {Update} update: Telegram更新对象
     @param {ContextTypes.DEFAULT_TYPE} context: 回调上下文
     """
+    storage = get_storage()
     query = update.callback_query
     await query.answer()
     
@@ -1017,6 +1014,7 @@ async def reject_recovery_callback(update: Update, context: ContextTypes.DEFAULT
 
 async def request_more_info_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理请求补充信息的回调"""
+    storage = get_storage()
     query = update.callback_query
     await query.answer()
     
@@ -1063,6 +1061,7 @@ async def request_more_info_callback(update: Update, context: ContextTypes.DEFAU
 
 async def ask_more_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理管理员发送补充信息请求的命令"""
+    storage = get_storage()
     message = update.message
     command_parts = message.text.split(" ", 1)
     
@@ -1121,6 +1120,7 @@ async def ask_more_info_command(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def list_recovery_requests_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理查看恢复请求列表的命令"""
+    storage = get_storage()
     user_id = update.effective_user.id
     if user_id not in ADMIN_IDS:
         await update.message.reply_text(
@@ -1179,6 +1179,7 @@ async def list_recovery_requests_command(update: Update, context: ContextTypes.D
 
 async def save_user_if_not_exists(user_id: int, username: str = None) -> None:
     """如果用户不存在，则保存用户信息"""
+    storage = get_storage()
     if not storage.get_user(user_id):
         user = User(
             user_id=user_id,
@@ -39,7 +39,7 @@ sys.path.append(os.getcwd())
 # 项目模块导入
 from coser_bot import config
 from coser_bot.utils.log_manager import init_logger
-from coser_bot.database.storage import Storage
+from coser_bot.database.storage import get_storage, init_storage, close_storage
 from coser_bot.config.constants import TEMPLATES
 from coser_bot.database.models import (
     User,
@@ -55,6 +55,7 @@ from coser_bot.handlers.recover import get_recovery_handlers
 from coser_bot.handlers.admin import get_admin_handlers, ADMIN_IDS
 from coser_bot.handlers.leaderboard import get_leaderboard_handlers, handle_leaderboard_callback
 from coser_bot.handlers.group_sync import get_group_sync_handlers, sync_group_members
+from coser_bot.utils.rate_limiter import create_rate_limiter
 
 # 配置日志
 init_logger()
@@ -78,7 +79,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     user = update.effective_user
     
     # 获取存储对象
-    storage = Storage()
+    storage = get_storage()
     
     # 检查用户是否已存在
     db_user = storage.get_user(user.id)
@@ -202,7 +203,7 @@ async def record_user_activity(user: User) -> None:
     """
     try:
         user.last_active = datetime.now()
-        storage = Storage()
+        storage = get_storage()
         storage.save_user(user)
     except Exception as e:
         logger.error(f"记录用户活动失败: {e}")
@@ -254,7 +255,7 @@ async def my_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         user_id = query.from_user.id
         
         # 获取用户信息
-        storage = Storage()
+        storage = get_storage()
         user = storage.get_user(user_id)
         if not user:
             await query.message.reply_text("未找到您的用户信息。")
@@ -293,14 +294,12 @@ async def my_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     if not access:
                         logger.info(f"为用户创建新的群组访问记录: {group.group_name}")
                         access = UserGroupAccess(
-                            access_id=len(storage.user_group_access) + 1,
                             user_id=user_id,
                             group_id=group.group_id,
                             start_date=datetime.now(),
                             end_date=None
                         )
                         storage.add_user_group_access(access)
-                        storage._save_data()
                         logger.info(f"已保存用户 {user.username} 的群组 {group.group_name} 访问记录")
             except Exception as e:
                 logger.error(f"检查用户 {user_id} 在群组 {group.group_name} 的状态时出错: {str(e)}")
@@ -368,7 +367,7 @@ async def my_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             return
             
         user_id = update.effective_user.id
-        storage = Storage()
+        storage = get_storage()
         
         # 获取用户信息
         user = storage.get_user(user_id)
@@ -409,14 +408,12 @@ async def my_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     if not access:
                         logger.info(f"为用户创建新的群组访问记录: {group.group_name}")
                         access = UserGroupAccess(
-                            access_id=len(storage.user_group_access) + 1,
                             user_id=user_id,
                             group_id=group.group_id,
                             start_date=datetime.now(),
                             end_date=None
                         )
                         storage.add_user_group_access(access)
-                        storage._save_data()
                         logger.info(f"已保存用户 {user.username} 的群组 {group.group_name} 访问记录")
             except Exception as e:
                 logger.error(f"检查用户 {user_id} 在群组 {group.group_name} 的状态时出错: {str(e)}")
@@ -655,6 +652,14 @@ async def handle_button_callback(update: Update, context: ContextTypes.DEFAULT_T
         logger.error(f"处理按钮回调时出错: {e}", exc_info=True)
         await query.answer("❌ 操作失败，请稍后重试")
 
+async def shutdown_storage(application: Application) -> None:
+    """
+    应用关闭回调
+    
+    将存储中尚未落盘的数据写入磁盘并释放共享存储实例
+    """
+    close_storage()
+
 def main() -> None:
     """
     机器人主函数
@@ -772,8 +777,17 @@ def main() -> None:
             logger.error("未设置BOT_TOKEN环境变量")
             sys.exit(1)
         
-        # 创建应用
-        application = Application.builder().token(config.BOT_TOKEN).build()
+        # 初始化共享存储实例，所有处理器共用同一份内存数据
+        storage = init_storage()
+        
+        # 创建应用，关闭时刷新并释放存储
+        builder = Application.builder().token(config.BOT_TOKEN).post_shutdown(shutdown_storage)
+        # 所有 Bot API 请求经过令牌桶调度器（BOT_API_RATE_LIMIT_ENABLED 为false时不限流）
+        rate_limiter = create_rate_limiter()
+        if rate_limiter is not None:
+            builder.rate_limiter(rate_limiter)
+        application = builder.build()
+        application.bot_data['storage'] = storage
         
         # 注册处理器
         # 基本命令
@@ -835,14 +849,19 @@ def main() -> None:
         
         # 添加定时任务
         job_queue = application.job_queue
-        # 每6小时同步一次群组成员
-        job_queue.run_repeating(sync_group_members, interval=21600)
+        # 成员加入与离开由 chat_member 事件实时更新，每小时对账一次长时间未确认的访问记录
+        job_queue.run_repeating(sync_group_members, interval=3600)
         
         # 添加数据库备份定时任务
         from coser_bot.utils.backup import schedule_backup
         # 每24小时备份一次数据库
         job_queue.run_repeating(schedule_backup, interval=86400)
         
+        # 添加冷数据归档定时任务（STORAGE_ARCHIVE_HORIZON_DAYS 为0时不归档）
+        from coser_bot.utils.backup import schedule_archive
+        # 每24小时归档一次
+        job_queue.run_repeating(schedule_archive, interval=86400, first=3600)
+        
         # 添加日志清理定时任务
         from coser_bot.utils.log_manager import schedule_log_cleanup
         # 每7天清理一次日志
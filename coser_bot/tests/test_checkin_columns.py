@@ -0,0 +1,72 @@
+"""
+@description: 签到列式存储测试模块
+"""
+import pytest
+from datetime import date, timedelta
+
+from ..database import checkin_columns
+from ..database.checkin_columns import CheckinColumns
+from ..database.storage import Storage
+from ..database.sqlite_storage import SQLiteStorage
+from ..database.models import CheckinRecord
+
+START = date(2024, 1, 1)
+
+def make_records():
+    """三个用户在一月与二月初的签到记录"""
+    records = []
+    for user_id, days in ((1, range(0, 31)), (2, range(0, 40, 2)), (3, [5])):
+        for offset in days:
+            records.append(CheckinRecord(
+                user_id=user_id, checkin_date=START + timedelta(days=offset),
+                points_earned=10, streak_bonus=50 if offset == 6 else 0
+            ))
+    return records
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """分别使用NumPy与纯Python实现"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(checkin_columns, "np", None)
+    return request.param
+
+def test_columnar_aggregates(backend):
+    """测试按日、按用户的签到计数、积分合计与分布统计"""
+    columns = CheckinColumns(make_records()[:1])
+    for record in make_records()[1:]:
+        columns.append(record)
+
+    january = (START, date(2024, 2, 1))
+    assert len(columns) == 52
+    assert columns.count_on(date(2024, 1, 2)) == 1
+    assert columns.count_on(date(2024, 1, 6)) == 2
+    assert columns.counts_by_user(*january) == {1: 31, 2: 16, 3: 1}
+    assert columns.points_by_user() == {1: 360, 2: 250, 3: 10}
+
+    daily = columns.daily_counts(START, date(2024, 1, 4))
+    assert daily == {START: 2, date(2024, 1, 2): 1, date(2024, 1, 3): 2}
+
+    stats = columns.count_distribution(*january)
+    assert stats["users"] == 3 and stats["median"] == 16 and stats["max"] == 31
+    assert stats["mean"] == pytest.approx(16.0)
+    assert stats["p90"] == pytest.approx(28.0)
+    assert columns.count_distribution(date(2030, 1, 1), date(2030, 2, 1))["mean"] is None
+
+def test_storage_backends_agree(tmp_path):
+    """测试JSON存储与SQLite存储的签到统计结果一致"""
+    json_storage = Storage(data_dir=str(tmp_path / "data"), journal=False)
+    sqlite_storage = SQLiteStorage(str(tmp_path / "storage.sqlite3"))
+    for record in make_records():
+        json_storage.add_checkin_record(record)
+        sqlite_storage.add_checkin_record(CheckinRecord.from_dict(record.to_dict()))
+
+    january = (START, date(2024, 2, 1))
+    for storage in (json_storage, sqlite_storage):
+        assert storage.count_checkins_on(date(2024, 1, 6)) == 2
+        assert storage.get_checkin_counts_by_user(*january) == {1: 31, 2: 16, 3: 1}
+        assert storage.get_checkin_points_by_user() == {1: 360, 2: 250, 3: 10}
+        assert storage.get_daily_checkin_counts(START, date(2024, 1, 3)) == {START: 2, date(2024, 1, 2): 1}
+        assert storage.get_checkin_count_distribution(*january)["median"] == 16
+    sqlite_storage.close()
@@ -0,0 +1,289 @@
+"""
+@description: 群组同步测试模块
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from ..handlers import group_sync
+from ..handlers.group_sync import handle_user_message
+from ..config import config
+from ..handlers.group import handle_chat_member_updated
+from ..database.storage import Storage
+from ..database.models import Group, UserGroupAccess
+from ..utils.membership_cache import MembershipCache, PROBE_FAILED
+from ..utils.message_throttle import MessageThrottle
+
+TEST_USER_ID = 123456789
+CURRENT_CHAT_ID = -1001000000001
+OTHER_CHAT_ID = -1001000000002
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_message_update(chat_id=CURRENT_CHAT_ID, user_id=TEST_USER_ID):
+    """创建群组消息更新"""
+    update = MagicMock()
+    update.effective_chat.id = chat_id
+    update.effective_chat.type = "supergroup"
+    update.effective_chat.title = "测试群"
+    update.effective_user.id = user_id
+    update.effective_user.username = "test_user"
+    return update
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """创建包含两个权益群组的存储"""
+    storage = Storage(data_dir=str(tmp_path / "data"))
+    storage.save_group(Group(group_id=1, group_name="当前群", chat_id=CURRENT_CHAT_ID))
+    storage.save_group(Group(group_id=2, group_name="其他群", chat_id=OTHER_CHAT_ID))
+    return storage
+
+
+@pytest.fixture
+def cache():
+    """创建使用手动时钟的缓存"""
+    clock = FakeClock()
+    cache = MembershipCache(ttl=600, negative_ttl=60, max_entries=100, clock=clock)
+    cache.clock = clock
+    with patch("coser_bot.handlers.group_sync.get_membership_cache", return_value=cache), \
+            patch("coser_bot.handlers.group.get_membership_cache", return_value=cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def throttle():
+    """默认不节流，避免共享节流表影响各个测试"""
+    throttle = MessageThrottle(window=0, max_entries=100)
+    with patch("coser_bot.handlers.group_sync.get_message_throttle", return_value=throttle):
+        yield throttle
+
+
+def test_cache_ttl_negative_ttl_and_lru():
+    """测试有效期、负缓存有效期与LRU淘汰"""
+    clock = FakeClock()
+    cache = MembershipCache(ttl=600, negative_ttl=60, max_entries=2, clock=clock)
+    cache.put(1, TEST_USER_ID, "member")
+    cache.put(2, TEST_USER_ID, "left")
+
+    clock.now += 61
+    assert cache.get(1, TEST_USER_ID) == "member"
+    assert cache.get(2, TEST_USER_ID) is None
+
+    # 条目1刚被访问过，超出容量时淘汰最久未使用的条目3
+    cache.put(3, TEST_USER_ID, "member")
+    cache.get(1, TEST_USER_ID)
+    cache.put(4, TEST_USER_ID, PROBE_FAILED)
+    assert cache.get(3, TEST_USER_ID) is None
+    assert cache.get(1, TEST_USER_ID) == "member"
+    assert cache.get(4, TEST_USER_ID) == PROBE_FAILED
+
+    clock.now += 600
+    assert cache.get(1, TEST_USER_ID) is None
+    assert cache.stats() == {"hits": 4, "misses": 3, "evictions": 1, "size": 1}
+
+
+@pytest.mark.asyncio
+async def test_user_is_probed_once_per_ttl(storage, cache):
+    """测试有效期内重复消息不再调用 get_chat_member"""
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(return_value=MagicMock(status="member"))
+
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        for _ in range(5):
+            await handle_user_message(make_message_update(), context)
+        assert context.bot.get_chat_member.await_count == 1
+        assert storage.get_user_group_access(TEST_USER_ID, 2) is not None
+
+        # 有效期过后重新查询
+        cache.clock.now += 601
+        context.bot.get_chat_member.return_value = MagicMock(status="left")
+        await handle_user_message(make_message_update(), context)
+        assert context.bot.get_chat_member.await_count == 2
+        assert storage.get_user_group_access(TEST_USER_ID, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_confirmed_existing_accesses_are_refreshed(storage, cache):
+    """测试发言所在群组与刚查询确认的群组中已有访问记录的确认时间被刷新"""
+    stale = datetime.now() - timedelta(days=10)
+    for group_id in (1, 2):
+        storage.add_user_group_access(UserGroupAccess(user_id=TEST_USER_ID, group_id=group_id, verified_at=stale))
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(return_value=MagicMock(status="member"))
+
+    started = datetime.now()
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        await handle_user_message(make_message_update(), context)
+    assert storage.get_user_group_access(TEST_USER_ID, 1).verified_at >= started
+    assert storage.get_user_group_access(TEST_USER_ID, 2).verified_at >= started
+
+    # 刚确认过的记录在刷新间隔内不再重复写入
+    flushes = storage.get_flush_stats()["user_group_access"]["flushes"]
+    cache.clock.now += 601
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        await handle_user_message(make_message_update(), context)
+    assert storage.get_flush_stats()["user_group_access"]["flushes"] == flushes
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_is_cached(storage, cache):
+    """测试查询失败的结果被负缓存，不会在每条消息上重复调用API"""
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(side_effect=Exception("Bad Request"))
+    context.bot.get_chat = AsyncMock()
+
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        for _ in range(3):
+            await handle_user_message(make_message_update(), context)
+    assert context.bot.get_chat_member.await_count == 1
+    assert context.bot.get_chat.await_count == 1
+
+
+def make_member_update(status, chat_id=OTHER_CHAT_ID, user_id=TEST_USER_ID):
+    """创建成员变更更新"""
+    update = MagicMock()
+    update.chat_member.chat.id = chat_id
+    update.chat_member.new_chat_member.user.id = user_id
+    update.chat_member.new_chat_member.user.is_bot = False
+    update.chat_member.new_chat_member.status = status
+    return update
+
+
+@pytest.mark.asyncio
+async def test_chat_member_update_refreshes_cache_and_access(storage, cache):
+    """测试成员变更事件直接更新缓存与访问记录"""
+    cache.put(OTHER_CHAT_ID, TEST_USER_ID, "left")
+    context = MagicMock()
+    context.bot_data = {}
+
+    with patch("coser_bot.handlers.group.get_storage", return_value=storage):
+        await handle_chat_member_updated(make_member_update("member"), context)
+        assert cache.get(OTHER_CHAT_ID, TEST_USER_ID) == "member"
+        access = storage.get_user_group_access(TEST_USER_ID, 2)
+        assert access is not None and access.verified_at is not None
+
+        await handle_chat_member_updated(make_member_update("left"), context)
+        assert cache.get(OTHER_CHAT_ID, TEST_USER_ID) == "left"
+        assert storage.get_user_group_access(TEST_USER_ID, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_only_probes_stale_accesses(storage, cache, monkeypatch):
+    """测试定时对账只查询长时间未确认的访问记录，并一次写入所有变更"""
+    monkeypatch.setattr(config, "GROUP_SYNC_STALE_HOURS", 24)
+    monkeypatch.setattr(config, "GROUP_SYNC_RECONCILE_BATCH", 2)
+    now = datetime.now()
+    accesses = {
+        "fresh": UserGroupAccess(user_id=1, group_id=1, verified_at=now - timedelta(hours=1)),
+        "never": UserGroupAccess(user_id=2, group_id=1),
+        "stale_member": UserGroupAccess(user_id=3, group_id=2, verified_at=now - timedelta(hours=48)),
+        "stale_left": UserGroupAccess(user_id=4, group_id=2, verified_at=now - timedelta(hours=30)),
+    }
+    for access in accesses.values():
+        storage.add_user_group_access(access)
+
+    async def get_chat_member(chat_id, user_id):
+        return MagicMock(status="left" if user_id == 3 else "member")
+
+    admin = MagicMock(status="administrator")
+    admin.user.id = 9
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(side_effect=get_chat_member)
+    context.bot.get_chat_administrators = AsyncMock(side_effect=lambda chat_id: [admin] if chat_id == CURRENT_CHAT_ID else [])
+    flushes_before = storage.get_flush_stats()["user_group_access"]["flushes"]
+
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        await group_sync.sync_group_members(context)
+
+    # 批量上限为2，从未确认与最久未确认的记录优先
+    probed = sorted(call.args[1] for call in context.bot.get_chat_member.await_args_list)
+    assert probed == [2, 3]
+    assert storage.get_user_group_access(2, 1).verified_at >= now
+    assert storage.get_user_group_access(3, 2) is None
+    assert storage.get_user_group_access(4, 2).verified_at < now
+    assert storage.get_user_group_access(9, 1).verified_at >= now
+    assert storage.get_flush_stats()["user_group_access"]["flushes"] == flushes_before + 1
+
+
+def test_throttle_window_and_bounded_table():
+    """测试节流窗口与有界的最近处理表"""
+    clock = FakeClock()
+    throttle = MessageThrottle(window=60, max_entries=2, clock=clock)
+    assert throttle.should_process(1, TEST_USER_ID)
+    assert not throttle.should_process(1, TEST_USER_ID)
+    assert throttle.should_process(2, TEST_USER_ID)
+
+    # 超出容量时淘汰最早处理的条目
+    assert throttle.should_process(3, TEST_USER_ID)
+    assert throttle.should_process(1, TEST_USER_ID)
+
+    # 窗口过后重新处理，过期条目被清理
+    clock.now += 60
+    assert throttle.should_process(2, TEST_USER_ID)
+    assert throttle.stats() == {"processed": 5, "skipped": 1, "size": 1}
+
+
+@pytest.mark.asyncio
+async def test_repeated_messages_are_debounced(storage, cache):
+    """测试同一用户的连续消息在窗口内只做一次群组同步检查"""
+    clock = FakeClock()
+    throttle = MessageThrottle(window=60, max_entries=100, clock=clock)
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(return_value=MagicMock(status="member"))
+
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage), \
+            patch("coser_bot.handlers.group_sync.get_message_throttle", return_value=throttle), \
+            patch.object(storage, "get_all_groups", wraps=storage.get_all_groups) as get_all_groups:
+        for _ in range(50):
+            await handle_user_message(make_message_update(), context)
+        await handle_user_message(make_message_update(user_id=TEST_USER_ID + 1), context)
+
+    assert get_all_groups.call_count == 2
+    assert context.bot.get_chat_member.await_count == 2
+    assert throttle.stats()["skipped"] == 49
+    assert throttle.stats()["processed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_probes_run_concurrently_and_commit_once(storage, cache, monkeypatch):
+    """测试多个群组的成员查询并发进行，并发数受限，且所有变更只写入一次"""
+    for group_id in range(3, 8):
+        storage.save_group(Group(group_id=group_id, group_name=f"群{group_id}", chat_id=-1001000000000 - group_id))
+    storage.add_user_group_access(UserGroupAccess(user_id=TEST_USER_ID, group_id=3, start_date=datetime.now()))
+    monkeypatch.setattr(config, "GROUP_SYNC_PROBE_CONCURRENCY", 2)
+    monkeypatch.setattr(group_sync, "_probe_semaphore", None)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def get_chat_member(chat_id, user_id):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(status="left" if chat_id == -1001000000003 else "member")
+
+    context = MagicMock()
+    context.bot.get_chat_member = AsyncMock(side_effect=get_chat_member)
+    flushes_before = storage.get_flush_stats()["user_group_access"]["flushes"]
+
+    with patch("coser_bot.handlers.group_sync.get_storage", return_value=storage):
+        await handle_user_message(make_message_update(), context)
+
+    assert context.bot.get_chat_member.await_count == 6
+    assert max_in_flight == 2
+    assert storage.get_flush_stats()["user_group_access"]["flushes"] == flushes_before + 1
+    assert storage.get_user_group_access(TEST_USER_ID, 3) is None
+    assert all(storage.get_user_group_access(TEST_USER_ID, group_id) for group_id in (1, 2, 4, 5, 6, 7))
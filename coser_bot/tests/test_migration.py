@@ -0,0 +1,120 @@
+"""
+@description: JSON到SQLite迁移工具测试模块
+"""
+import pytest
+from datetime import date, datetime
+
+from ..database.migration import JsonToSQLiteMigrator
+from ..database.snapshot import write_snapshot, iter_snapshot, SnapshotError
+from ..database.sqlite_storage import SQLiteStorage
+from ..database.storage import Storage, COLLECTIONS
+from ..database.models import User, CheckinRecord, PointsTransaction, PointsTransactionType
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """写入一份JSON数据目录"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    users = [User(user_id=i, username=f"user{i}", points=i * 10).to_dict() for i in range(1, 4)]
+    transactions = [
+        PointsTransaction(transaction_id=i, user_id=i % 3 + 1, amount=i,
+                          transaction_type=PointsTransactionType.CHECKIN,
+                          description="签到", created_at=now).to_dict()
+        for i in range(1, 26)
+    ]
+    legacy = transactions[0].copy()
+    legacy["transaction_id"] = None
+    transactions.append(legacy)
+    write_snapshot(str(data_dir / COLLECTIONS["users"][0]), users)
+    write_snapshot(str(data_dir / COLLECTIONS["transactions"][0]), transactions)
+    return data_dir
+
+def test_iter_snapshot_streams_records_across_chunks(tmp_path):
+    """测试流式读取在任意块大小下结果一致，并能发现截断"""
+    path = str(tmp_path / "records.json")
+    records = [{"id": i, "text": "数据" * i, "nested": [i, None]} for i in range(50)] + [12345]
+    write_snapshot(path, records)
+    for chunk_size in (1, 7, 1 << 20):
+        assert list(iter_snapshot(path, chunk_size)) == records
+
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "wb") as f:
+        f.write(content[:-20])
+    with pytest.raises(SnapshotError):
+        list(iter_snapshot(path))
+
+def test_migrate_and_verify(data_dir, tmp_path):
+    """测试分批迁移后行数与积分合计一致，缺少ID的交易获得新ID"""
+    db_path = str(tmp_path / "storage.sqlite3")
+    migrator = JsonToSQLiteMigrator(str(data_dir), db_path, batch_size=4)
+    stats = {s.name: s for s in migrator.migrate()}
+    result = migrator.verify()
+    migrator.close()
+
+    assert stats["transactions"].records == 26
+    assert result.ok
+    assert result.row_counts["transactions"] == (26, 26)
+
+    storage = SQLiteStorage(db_path)
+    assert storage.get_user(2).points == 20
+    assert storage.get_transaction(26).amount == 1
+    storage.close()
+
+def test_migration_resumes_from_last_batch(data_dir, tmp_path, monkeypatch):
+    """测试迁移中断后从上次提交的批次继续"""
+    db_path = str(tmp_path / "storage.sqlite3")
+    migrator = JsonToSQLiteMigrator(str(data_dir), db_path, batch_size=5)
+    original = migrator._write_batch
+    calls = []
+
+    def failing_write_batch(name, rows, records_done):
+        calls.append(records_done)
+        if len(calls) == 3:
+            raise RuntimeError("模拟中断")
+        original(name, rows, records_done)
+
+    monkeypatch.setattr(migrator, "_write_batch", failing_write_batch)
+    with pytest.raises(RuntimeError):
+        migrator.migrate(["transactions"])
+    migrator.close()
+
+    migrator = JsonToSQLiteMigrator(str(data_dir), db_path, batch_size=5)
+    stats = migrator.migrate(["users", "transactions"])
+    assert stats[1].resumed and stats[1].skipped == 10 and stats[1].records == 16
+    assert migrator.verify().ok
+    assert migrator.migrate(["transactions"])[0].records == 0
+    migrator.close()
+
+def test_archived_records_are_migrated(tmp_path):
+    """测试归档分区中的签到与交易记录随快照一起迁移，并计入校验"""
+    data_dir = str(tmp_path / "data")
+    storage = Storage(data_dir=data_dir, journal=False)
+    storage.save_user(User(user_id=1, username="user1", points=40))
+    for day in (date(2024, 1, 5), date(2024, 1, 6), date(2024, 4, 1)):
+        storage.add_checkin_record(CheckinRecord(user_id=1, checkin_date=day, points_earned=10))
+        storage.add_transaction(PointsTransaction(
+            user_id=1, amount=10, transaction_type=PointsTransactionType.CHECKIN,
+            description="签到", created_at=datetime.combine(day, datetime.min.time())
+        ))
+    assert storage.archive_old_records(horizon_days=62, today=date(2024, 4, 20)) == {
+        "checkin_records": 2, "transactions": 2
+    }
+    storage.close()
+
+    db_path = str(tmp_path / "storage.sqlite3")
+    migrator = JsonToSQLiteMigrator(data_dir, db_path)
+    stats = {s.name: s for s in migrator.migrate()}
+    result = migrator.verify()
+    migrator.close()
+
+    assert stats["checkin_records"].records == 3
+    assert stats["transactions"].records == 3
+    assert result.ok
+    assert result.row_counts["transactions"] == (3, 3)
+
+    sqlite_storage = SQLiteStorage(db_path)
+    assert sqlite_storage.get_user_checkin_count(1) == 3
+    assert sqlite_storage.get_user_total_earned(1) == 30
+    sqlite_storage.close()
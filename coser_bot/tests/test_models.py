@@ -0,0 +1,39 @@
+"""
+@description: 数据模型测试模块
+"""
+import pytest
+from datetime import date, datetime
+
+from ..database.models import (
+    PointsTransaction, CheckinRecord, EmailVerification, UserGroupAccess,
+    PointsTransactionType, TransactionStatus, EmailVerifyStatus
+)
+
+@pytest.mark.parametrize("record", [
+    PointsTransaction(user_id=1, amount=10, transaction_type=PointsTransactionType.GIFT_SENT,
+                      description="赠送积分", related_user_id=2, transaction_id=5,
+                      status=TransactionStatus.PENDING, expires_at=datetime(2024, 1, 2)),
+    CheckinRecord(user_id=1, checkin_date=date(2024, 1, 1), points_earned=10, record_id=3, is_makeup=True),
+    EmailVerification(user_id=1, email="a@example.com", verification_code="123456",
+                      status=EmailVerifyStatus.VERIFIED, verification_id=7),
+    UserGroupAccess(user_id=1, group_id=2, end_date=datetime(2024, 2, 1), access_id=4,
+                    verified_at=datetime(2024, 1, 15)),
+])
+def test_slotted_records_round_trip(record):
+    """测试高数量记录模型不再带有实例字典，且to_dict/from_dict保持一致"""
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.unknown_field = 1
+    assert type(record).from_dict(record.to_dict()) == record
+
+def test_repeated_values_are_shared():
+    """测试相同的签到日期与交易描述在多条记录间共享同一对象"""
+    data = CheckinRecord(user_id=1, checkin_date=date(2024, 1, 1), points_earned=10).to_dict()
+    first, second = CheckinRecord.from_dict(data), CheckinRecord.from_dict(dict(data, user_id=2))
+    assert first.checkin_date is second.checkin_date
+
+    data = PointsTransaction(user_id=1, amount=10, transaction_type=PointsTransactionType.CHECKIN,
+                             description="每日签到").to_dict()
+    description = "".join(["每日", "签到"])
+    assert PointsTransaction.from_dict(dict(data, description=description)).description is \
+        PointsTransaction.from_dict(data).description
@@ -0,0 +1,118 @@
+"""
+@description: Bot API 调度器测试模块
+"""
+import time
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from telegram.error import RetryAfter
+
+from ..utils.rate_limiter import BotRateLimiter, BACKGROUND, background_kwargs
+
+TEST_CHAT_ID = -1001234567890
+
+
+def make_limiter(**kwargs):
+    """创建调度器"""
+    options = dict(global_rate=50, private_chat_rate=50, group_chat_rate=50, max_retries=2)
+    options.update(kwargs)
+    return BotRateLimiter(**options)
+
+
+async def send(limiter, callback, endpoint="sendMessage", chat_id=TEST_CHAT_ID, rate_limit_args=None):
+    """通过调度器发送一个请求"""
+    return await limiter.process_request(
+        callback=callback, args=(), kwargs={}, endpoint=endpoint,
+        data={"chat_id": chat_id}, rate_limit_args=rate_limit_args
+    )
+
+
+@pytest.mark.asyncio
+async def test_user_requests_overtake_background_requests():
+    """测试等待全局令牌时用户请求排在后台请求之前"""
+    limiter = make_limiter()
+    limiter._global._tokens = 0
+    order = []
+
+    def callback(name):
+        async def run():
+            order.append(name)
+            return True
+        return run
+
+    background = [
+        asyncio.ensure_future(send(limiter, callback(f"bg{i}"), endpoint="getChatMember", rate_limit_args=BACKGROUND))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    user = asyncio.ensure_future(send(limiter, callback("user"), endpoint="getChat"))
+    await asyncio.gather(user, *background)
+
+    assert order == ["user", "bg0", "bg1", "bg2"]
+    stats = limiter.get_stats()
+    assert stats["requests"] == {"user": 1, "background": 3}
+    assert stats["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_chat_limit_spaces_messages():
+    """测试同一群组的消息按单个聊天的速率发送"""
+    limiter = make_limiter(global_rate=1000, group_chat_rate=10)
+
+    async def callback():
+        return True
+
+    started = time.monotonic()
+    for _ in range(3):
+        await send(limiter, callback)
+    assert time.monotonic() - started >= 0.18
+
+
+@pytest.mark.asyncio
+async def test_group_reply_burst_is_not_delayed():
+    """测试群组的突发回复在每分钟配额内立即发送，不排在后台查询之后"""
+    limiter = make_limiter(global_rate=1000, group_chat_rate=20 / 60, group_chat_burst=20)
+
+    async def callback():
+        return True
+
+    started = time.monotonic()
+    await asyncio.gather(*(send(limiter, callback) for _ in range(5)))
+    assert time.monotonic() - started < 0.5
+    assert limiter.get_stats()["wait_seconds"]["user"] < 0.5
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried_then_given_up():
+    """测试收到 RetryAfter 时等待后重试，超过重试次数后抛出"""
+    limiter = make_limiter(max_retries=1)
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RetryAfter(0)
+        return True
+
+    assert await send(limiter, flaky) is True
+
+    async def always_limited():
+        raise RetryAfter(0)
+
+    with pytest.raises(RetryAfter):
+        await send(limiter, always_limited)
+
+    stats = limiter.get_stats()
+    assert stats["retry_after"] == 3
+    assert stats["retries"] == 2
+    assert stats["gave_up"] == 1
+
+
+def test_background_kwargs_requires_rate_limiter():
+    """测试未启用调度器时不传入 rate_limit_args"""
+    bot = MagicMock()
+    bot.rate_limiter = None
+    assert background_kwargs(bot) == {}
+    bot.rate_limiter = make_limiter()
+    assert background_kwargs(bot) == {"rate_limit_args": BACKGROUND}
@@ -0,0 +1,84 @@
+"""
+@description: 快照格式测试模块
+"""
+import os
+import pytest
+
+from ..config import config
+from ..database import snapshot
+from ..database.snapshot import (
+    write_snapshot, read_snapshot, iter_snapshot, verify_snapshot, convert_snapshot,
+    is_binary_snapshot, SnapshotError
+)
+from ..database.storage import Storage
+from ..database.models import User
+
+RECORDS = [{"user_id": i, "username": f"用户{i}", "points": i * 10, "email": None} for i in range(2500)]
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_binary_snapshot_round_trip(tmp_path, compression, monkeypatch):
+    """测试二进制快照在各压缩方式下可以流式读回，且与JSON互相转换"""
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    monkeypatch.setattr(snapshot, "BINARY_BLOCK_RECORDS", 1000)
+    path = str(tmp_path / "users.json")
+    write_snapshot(path, RECORDS, "binary", compression)
+
+    assert is_binary_snapshot(path)
+    assert list(iter_snapshot(path, chunk_size=97)) == RECORDS
+    assert read_snapshot(path) == RECORDS
+    assert verify_snapshot(path)
+
+    convert_snapshot(path, fmt="json")
+    assert not is_binary_snapshot(path)
+    assert read_snapshot(path) == RECORDS
+
+def test_binary_snapshot_detects_corruption(tmp_path):
+    """测试截断或篡改的二进制快照读取失败，较新版本写入的快照被拒绝"""
+    path = str(tmp_path / "users.json")
+    write_snapshot(path, RECORDS, "binary", "gzip")
+    with open(path, "rb") as f:
+        content = f.read()
+
+    with open(path, "wb") as f:
+        f.write(content[:-100])
+    with pytest.raises(SnapshotError):
+        list(iter_snapshot(path))
+    assert not verify_snapshot(path)
+
+    write_snapshot(path, RECORDS, "binary")
+    with open(path, "r+b") as f:
+        f.seek(-5, os.SEEK_END)
+        f.write(b"99999")
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+    with open(path, "r+b") as f:
+        f.seek(6)
+        f.write((snapshot.SNAPSHOT_SCHEMA_VERSION + 1).to_bytes(2, "little"))
+    with pytest.raises(SnapshotError, match="版本过新"):
+        read_snapshot(path)
+
+def test_storage_writes_configured_format(tmp_path, monkeypatch):
+    """测试存储按配置写入二进制快照，并能加载任意格式的快照"""
+    data_dir = str(tmp_path / "data")
+    storage = Storage(data_dir=data_dir, journal=False)
+    storage.save_user(User(user_id=1, username="json_user"))
+    assert not is_binary_snapshot(os.path.join(data_dir, "users.json"))
+
+    monkeypatch.setattr(config, "STORAGE_SNAPSHOT_FORMAT", "binary")
+    monkeypatch.setattr(config, "STORAGE_SNAPSHOT_COMPRESSION", "gzip")
+    binary = Storage(data_dir=data_dir, journal=False)
+    assert binary.get_user(1).username == "json_user"
+    binary.save_user(User(user_id=2, username="binary_user"))
+    assert is_binary_snapshot(os.path.join(data_dir, "users.json"))
+
+    monkeypatch.setattr(config, "STORAGE_SNAPSHOT_FORMAT", "json")
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert sorted(u.username for u in reloaded.get_all_users()) == ["binary_user", "json_user"]
+
+def test_storage_rejects_unknown_format(tmp_path, monkeypatch):
+    """测试配置了未知的快照格式时初始化失败，而不是静默写入JSON"""
+    monkeypatch.setattr(config, "STORAGE_SNAPSHOT_FORMAT", "msgpack")
+    with pytest.raises(ValueError, match="msgpack"):
+        Storage(data_dir=str(tmp_path / "data"), journal=False)
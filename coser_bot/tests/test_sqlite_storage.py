@@ -0,0 +1,137 @@
+"""
+@description: SQLite存储后端测试模块
+"""
+import pytest
+from datetime import date, datetime, timedelta
+
+from ..database.sqlite_storage import SQLiteStorage
+from ..database.models import (
+    User, CheckinRecord, PointsTransaction, PointsTransactionType, TransactionStatus,
+    EmailVerification, UserGroupAccess, RecoveryRequest
+)
+
+TEST_USER_ID = 123456789
+TEST_USERNAME = "test_user"
+
+@pytest.fixture
+def storage(tmp_path):
+    """创建临时SQLite存储"""
+    storage = SQLiteStorage(str(tmp_path / "storage.sqlite3"))
+    yield storage
+    storage.close()
+
+def test_wal_mode_and_default_groups(storage):
+    """测试数据库使用WAL模式并初始化默认群组"""
+    assert storage._scalar("PRAGMA journal_mode") == "wal"
+    assert [g.group_id for g in storage.get_all_groups()] == [1, 2]
+    assert storage.get_group_by_chat_id(-1002317028637).group_id == 2
+
+def test_user_round_trip_and_email_lookup(storage):
+    """测试用户读写与不区分大小写的邮箱查询"""
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10, email="Test@Example.com"))
+    user = storage.get_user(TEST_USER_ID)
+    user.points = 30
+    storage.save_user(user)
+
+    assert storage.get_user(TEST_USER_ID).points == 30
+    assert storage.get_user_by_email("test@example.com").user_id == TEST_USER_ID
+    assert list(storage.users) == [TEST_USER_ID]
+
+def test_checkins_and_transactions(storage):
+    """测试签到与交易查询、累计收支以及原地更新"""
+    today = date.today()
+    for days_ago in (2, 0, 1):
+        storage.add_checkin_record(CheckinRecord(
+            user_id=TEST_USER_ID, checkin_date=today - timedelta(days=days_ago), points_earned=10
+        ))
+    assert storage.get_user_last_checkin_record(TEST_USER_ID).checkin_date == today
+    assert storage.get_user_checkin_record_by_date(TEST_USER_ID, today - timedelta(days=2)) is not None
+    assert [r.checkin_date for r in storage.get_user_checkin_records(TEST_USER_ID, limit=2)] == [
+        today, today - timedelta(days=1)
+    ]
+
+    start = datetime.now()
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=10, transaction_type=PointsTransactionType.CHECKIN,
+        description="签到", created_at=start
+    ))
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=-5, transaction_type=PointsTransactionType.GIFT_SENT,
+        description="赠送", related_user_id=TEST_USER_ID + 1, transaction_id="gift-1",
+        status=TransactionStatus.PENDING, created_at=start + timedelta(minutes=1)
+    ))
+    assert storage.get_user_total_earned(TEST_USER_ID) == 10
+    assert storage.get_user_total_spent(TEST_USER_ID) == 5
+    assert [t.amount for t in storage.get_user_transactions(TEST_USER_ID)] == [-5, 10]
+    assert [t.transaction_id for t in storage.get_user_gift_transactions(TEST_USER_ID + 1)] == ["gift-1"]
+
+    transaction = storage.get_transaction("gift-1")
+    transaction.status = TransactionStatus.COMPLETED
+    assert storage.update_transaction(transaction)
+    assert storage.get_transaction("gift-1").status == TransactionStatus.COMPLETED
+    assert len(storage.transactions) == 2
+
+def test_verifications_access_and_recovery(storage):
+    """测试验证码、访问权限与恢复请求的读写"""
+    storage.add_email_verification(EmailVerification(
+        user_id=TEST_USER_ID, email="a@example.com", verification_code="123456"
+    ))
+    assert storage.get_email_verification_by_code("123456").user_id == TEST_USER_ID
+    old = datetime.now() - timedelta(days=3)
+    storage.add_email_verification(EmailVerification(
+        user_id=TEST_USER_ID, email="a@example.com", verification_code="654321", created_at=old, expires_at=old
+    ))
+    assert storage.prune_email_verifications() == 1
+
+    storage.add_user_group_access(UserGroupAccess(user_id=TEST_USER_ID, group_id=1))
+    access = storage.get_user_group_access(TEST_USER_ID, 1)
+    assert [g.group_id for g in storage.get_user_groups(TEST_USER_ID)] == [1]
+    assert storage.remove_user_group_access(access)
+    assert storage.get_user_group_accesses(TEST_USER_ID) == []
+
+    storage.add_recovery_request(RecoveryRequest(
+        request_id="r1", old_user_id=TEST_USER_ID, new_user_id=TEST_USER_ID + 1,
+        email="a@example.com", reason="换号"
+    ))
+    assert storage.get_pending_recovery_request_by_new_user(TEST_USER_ID + 1).request_id == "r1"
+
+def test_add_transaction_does_not_overwrite_existing_id(storage):
+    """测试交易ID已存在时添加失败，原记录保持不变"""
+    assert storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=50, transaction_type=PointsTransactionType.CHECKIN,
+        description="签到", transaction_id=5
+    ))
+    assert not storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=1, transaction_type=PointsTransactionType.CHECKIN,
+        description="签到", transaction_id=5
+    ))
+    assert storage.get_transaction(5).amount == 50
+
+def test_new_transaction_ids_skip_gapped_and_out_of_order_ids(storage):
+    """测试已有交易ID有空洞或乱序时，新分配与预留的ID都不会覆盖已有记录"""
+    for transaction_id, amount in ((5, 50), (1, 10), ("gift-1", -3)):
+        assert storage.add_transaction(PointsTransaction(
+            user_id=TEST_USER_ID, amount=amount, transaction_type=PointsTransactionType.CHECKIN,
+            description="签到", transaction_id=transaction_id
+        ))
+
+    reserved = storage.reserve_ids("transactions", 3)
+    assert reserved.start == 6
+    for _ in range(3):
+        transaction = PointsTransaction(
+            user_id=TEST_USER_ID, amount=1, transaction_type=PointsTransactionType.CHECKIN, description="签到"
+        )
+        assert storage.add_transaction(transaction)
+        assert transaction.transaction_id not in (1, 5) and transaction.transaction_id not in reserved
+
+    # 显式指定ID写入、未经过序列的记录同样会被跳过
+    assert storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=7, transaction_type=PointsTransactionType.CHECKIN,
+        description="签到", transaction_id=100
+    ))
+    assert storage.reserve_ids("transactions", 1).start == 101
+
+    assert storage.get_transaction(5).amount == 50
+    assert storage.get_transaction(1).amount == 10
+    assert storage.get_transaction("gift-1").amount == -3
+    assert len(storage.transactions) == 7
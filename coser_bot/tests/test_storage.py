@@ -0,0 +1,586 @@
+"""
+@description: 数据存储测试模块
+"""
+import os
+import json
+import time
+import pytest
+from datetime import date, datetime, timedelta
+
+from ..config import config
+from ..database.storage import Storage, COLLECTIONS, init_storage, get_storage, close_storage
+from ..database.snapshot import read_snapshot, SnapshotError
+from ..database.models import (
+    User, CheckinRecord, PointsTransaction, PointsTransactionType, TransactionStatus,
+    EmailVerification, EmailVerifyStatus, UserGroupAccess
+)
+
+TEST_USER_ID = 123456789
+TEST_USERNAME = "test_user"
+
+def read_json(data_dir, file_name):
+    """读取数据目录中的JSON快照"""
+    return read_snapshot(os.path.join(data_dir, file_name))
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """创建临时数据目录"""
+    return str(tmp_path / "data")
+
+def test_journal_appends_instead_of_rewriting(data_dir):
+    """测试日志模式下变更只追加日志，不重写快照"""
+    storage = Storage(data_dir=data_dir, journal=True)
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+    storage.add_checkin_record(CheckinRecord(user_id=TEST_USER_ID, checkin_date=date.today(), points_earned=10))
+
+    # 快照保持不变
+    assert read_json(data_dir, "users.json") == []
+    assert read_json(data_dir, "checkin_records.json") == []
+
+    # 每次变更对应一行日志
+    with open(os.path.join(data_dir, "journal", "users.jsonl"), "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["key"] == TEST_USER_ID
+
+def test_journal_replay_on_load(data_dir):
+    """测试重新加载时在快照之上回放日志"""
+    storage = Storage(data_dir=data_dir, journal=True)
+    user = User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10)
+    storage.save_user(user)
+    user.points = 30
+    storage.save_user(user)
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID,
+        amount=20,
+        transaction_type=PointsTransactionType.CHECKIN,
+        description="签到"
+    ))
+
+    reloaded = Storage(data_dir=data_dir, journal=True)
+    assert reloaded.get_user(TEST_USER_ID).points == 30
+    assert len(reloaded.transactions) == 1
+
+def test_compact_journal_folds_into_snapshot(data_dir):
+    """测试压缩会把日志合并进快照并清空日志"""
+    storage = Storage(data_dir=data_dir, journal=True)
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+
+    assert storage.compact_journal()
+    assert [u["user_id"] for u in read_json(data_dir, "users.json")] == [TEST_USER_ID]
+    assert not storage._journals["users"].has_entries()
+
+    # 压缩后的数据可以在非日志模式下直接加载
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert reloaded.get_user(TEST_USER_ID).username == TEST_USERNAME
+
+def test_interrupted_compaction_is_recovered(data_dir):
+    """测试压缩中断（轮转后未写入快照）时数据不丢失"""
+    storage = Storage(data_dir=data_dir, journal=True)
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+    storage._journals["users"].rotate()
+    storage.save_user(User(user_id=TEST_USER_ID + 1, username="other_user"))
+
+    reloaded = Storage(data_dir=data_dir, journal=True)
+    assert set(reloaded.users) == {TEST_USER_ID, TEST_USER_ID + 1}
+
+def test_flush_writes_only_dirty_collections(data_dir):
+    """测试签到只写入被修改的集合"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    groups_mtime = os.path.getmtime(os.path.join(data_dir, "groups.json"))
+
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+    storage.add_checkin_record(CheckinRecord(user_id=TEST_USER_ID, checkin_date=date.today(), points_earned=10))
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID,
+        amount=10,
+        transaction_type=PointsTransactionType.CHECKIN,
+        description="签到"
+    ))
+
+    stats = storage.get_flush_stats()
+    assert set(stats) == {"users", "checkin_records", "transactions"}
+    assert stats["users"]["flushes"] == 1
+    assert stats["users"]["bytes"] == os.path.getsize(os.path.join(data_dir, "users.json"))
+    assert os.path.getmtime(os.path.join(data_dir, "groups.json")) == groups_mtime
+
+    # 没有新的修改时刷新不写入任何文件
+    assert storage.flush() == {}
+
+def test_write_behind_coalesces_mutations(data_dir, monkeypatch):
+    """测试延迟写入模式下多次变更合并为一次刷新，关闭时写入剩余变更"""
+    monkeypatch.setattr(config, "STORAGE_FLUSH_INTERVAL_MS", 60 * 1000)
+    monkeypatch.setattr(config, "STORAGE_FLUSH_MAX_MUTATIONS", 1000)
+    storage = Storage(data_dir=data_dir, journal=False, write_behind=True)
+    for i in range(10):
+        storage.save_user(User(user_id=TEST_USER_ID + i, username=f"user_{i}"))
+
+    # 尚未到达刷新间隔和变更数阈值，快照保持不变
+    assert read_json(data_dir, "users.json") == []
+
+    storage.close()
+    assert len(read_json(data_dir, "users.json")) == 10
+    assert storage.get_flush_stats()["users"]["flushes"] == 1
+
+def test_write_behind_flushes_after_max_mutations(data_dir, monkeypatch):
+    """测试变更数达到阈值时后台线程立即刷新"""
+    monkeypatch.setattr(config, "STORAGE_FLUSH_INTERVAL_MS", 60 * 1000)
+    monkeypatch.setattr(config, "STORAGE_FLUSH_MAX_MUTATIONS", 3)
+    storage = Storage(data_dir=data_dir, journal=False, write_behind=True)
+    try:
+        for i in range(3):
+            storage.save_user(User(user_id=TEST_USER_ID + i, username=f"user_{i}"))
+
+        deadline = time.time() + 5
+        while "users" not in storage.get_flush_stats() and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(read_json(data_dir, "users.json")) == 3
+    finally:
+        storage.close()
+
+def test_point_transfer_is_flushed_synchronously(data_dir, monkeypatch):
+    """测试积分赠送交易在延迟写入模式下仍同步落盘"""
+    monkeypatch.setattr(config, "STORAGE_FLUSH_INTERVAL_MS", 60 * 1000)
+    monkeypatch.setattr(config, "STORAGE_SYNC_POINT_TRANSFERS", True)
+    storage = Storage(data_dir=data_dir, journal=False, write_behind=True)
+    try:
+        storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=90, frozen_points=10))
+        storage.add_transaction(PointsTransaction(
+            user_id=TEST_USER_ID,
+            amount=-10,
+            transaction_type=PointsTransactionType.GIFT_SENT,
+            description="赠送"
+        ))
+
+        # 交易与之前尚未刷新的用户变更一起写入
+        assert len(read_json(data_dir, "transactions.json")) == 1
+        assert read_json(data_dir, "users.json")[0]["frozen_points"] == 10
+    finally:
+        storage.close()
+
+def test_snapshot_checksum_detects_truncation(data_dir):
+    """测试被截断的快照无法通过校验"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME))
+    users_file = os.path.join(data_dir, "users.json")
+    assert not os.path.exists(users_file + ".tmp")
+
+    with open(users_file, "rb") as f:
+        content = f.read()
+    with open(users_file, "wb") as f:
+        f.write(content[:len(content) // 2])
+
+    with pytest.raises(SnapshotError):
+        read_snapshot(users_file)
+
+def test_corrupt_snapshot_falls_back_to_backup(data_dir, tmp_path, monkeypatch):
+    """测试快照损坏时从最近一次备份恢复"""
+    monkeypatch.setattr(config, "BACKUP_DIR", str(tmp_path / "backups"))
+    storage = Storage(data_dir=data_dir, journal=False)
+    storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+    assert storage.backup_data()
+
+    users_file = os.path.join(data_dir, "users.json")
+    with open(users_file, "r+b") as f:
+        f.seek(-5, os.SEEK_END)
+        f.write(b"xxxxx")
+
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert reloaded.get_user(TEST_USER_ID).points == 10
+    # 恢复的数据已重新写回快照，损坏文件被保留
+    assert [u["user_id"] for u in read_json(data_dir, "users.json")] == [TEST_USER_ID]
+    assert any(name.startswith("users.json.corrupt-") for name in os.listdir(data_dir))
+
+@pytest.mark.asyncio
+async def test_scheduled_backup_is_used_for_recovery(data_dir, tmp_path, monkeypatch):
+    """测试定时备份任务生成的备份可用于恢复损坏的快照，并只保留最近的备份"""
+    from ..utils import backup
+    monkeypatch.setattr(config, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(backup, "DATA_DIR", data_dir)
+    monkeypatch.setattr(backup, "AUTO_BACKUP_ENABLED", True)
+    monkeypatch.setattr(backup, "MAX_BACKUP_COUNT", 1)
+    os.makedirs(os.path.join(config.BACKUP_DIR, "backup_20000101_000000"))
+    storage = init_storage(data_dir=data_dir)
+    try:
+        storage.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+        await backup.schedule_backup(None)
+    finally:
+        close_storage()
+    # 超出保留数量的旧备份目录被清理
+    backup_dirs = os.listdir(config.BACKUP_DIR)
+    assert len(backup_dirs) == 1 and backup_dirs[0] != "backup_20000101_000000"
+
+    users_file = os.path.join(data_dir, "users.json")
+    with open(users_file, "r+b") as f:
+        f.seek(-5, os.SEEK_END)
+        f.write(b"xxxxx")
+
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert reloaded.get_user(TEST_USER_ID).points == 10
+
+def test_streaming_load_reports_stats(data_dir):
+    """测试逐条加载集合并记录每个集合的加载统计"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    for i in range(1, 51):
+        storage.add_transaction(PointsTransaction(
+            user_id=TEST_USER_ID,
+            amount=i,
+            transaction_type=PointsTransactionType.CHECKIN,
+            description="签到"
+        ))
+
+    reloaded = Storage(data_dir=data_dir, journal=False, lazy=False)
+    assert reloaded.get_user_total_earned(TEST_USER_ID) == sum(range(1, 51))
+    assert all(isinstance(t, PointsTransaction) for t in reloaded.transactions)
+
+    stats = reloaded.get_load_stats()
+    assert set(stats) == set(COLLECTIONS)
+    assert stats["transactions"]["records"] == 50
+    assert stats["transactions"]["seconds"] >= 0
+
+def test_collections_are_loaded_on_first_access(data_dir, tmp_path, monkeypatch):
+    """测试按需加载：启动时只加载用户与群组，其他集合在首次访问时加载"""
+    monkeypatch.setattr(config, "BACKUP_DIR", str(tmp_path / "backups"))
+    storage = Storage(data_dir=data_dir, journal=False, lazy=True)
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID,
+        amount=10,
+        transaction_type=PointsTransactionType.CHECKIN,
+        description="签到"
+    ))
+
+    reloaded = Storage(data_dir=data_dir, journal=False, lazy=True)
+    assert reloaded.get_loaded_collections() == ["users", "groups"]
+
+    reloaded.save_user(User(user_id=TEST_USER_ID, username=TEST_USERNAME, points=10))
+    assert reloaded.get_loaded_collections() == ["users", "groups"]
+    # 通过索引访问同样会触发加载
+    assert reloaded.get_user_total_earned(TEST_USER_ID) == 10
+    assert reloaded.get_loaded_collections() == ["users", "transactions", "groups"]
+    assert set(reloaded.get_load_stats()) == {"users", "transactions", "groups"}
+
+    # 备份只写入已加载的集合，未加载集合的快照保持不变
+    assert reloaded.backup_data()
+    assert "invite_links" not in reloaded.get_loaded_collections()
+
+def test_checkin_index_lookups(data_dir):
+    """测试签到索引支持按日期查询、最近记录查询，并在重新加载后重建"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    today = date.today()
+    for days_ago in (3, 1, 0):
+        storage.add_checkin_record(CheckinRecord(
+            user_id=TEST_USER_ID, checkin_date=today - timedelta(days=days_ago), points_earned=10
+        ))
+    # 补签的历史日期插入到正确位置
+    storage.add_checkin_record(CheckinRecord(
+        user_id=TEST_USER_ID, checkin_date=today - timedelta(days=2), points_earned=5, is_makeup=True
+    ))
+    storage.add_checkin_record(CheckinRecord(user_id=TEST_USER_ID + 1, checkin_date=today, points_earned=10))
+
+    for s in (storage, Storage(data_dir=data_dir, journal=False)):
+        assert s.get_user_last_checkin_record(TEST_USER_ID).checkin_date == today
+        assert s.get_user_checkin_record_by_date(TEST_USER_ID, today - timedelta(days=2)).is_makeup
+        assert s.get_user_checkin_record_by_date(TEST_USER_ID, today - timedelta(days=5)) is None
+        assert [r.checkin_date for r in s.get_user_checkin_records(TEST_USER_ID, limit=3)] == [
+            today, today - timedelta(days=1), today - timedelta(days=2)
+        ]
+        assert s.get_user_last_checkin_record(TEST_USER_ID + 2) is None
+
+def test_transaction_index_and_totals(data_dir):
+    """测试交易索引与累计收支在新增和重新加载后保持一致"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    start = datetime.now()
+    entries = [
+        (TEST_USER_ID, 10, PointsTransactionType.CHECKIN, None),
+        (TEST_USER_ID, -30, PointsTransactionType.GIFT_SENT, TEST_USER_ID + 1),
+        (TEST_USER_ID + 1, 30, PointsTransactionType.GIFT_RECEIVED, TEST_USER_ID),
+        (TEST_USER_ID, 50, PointsTransactionType.ADMIN_ADJUSTMENT, None),
+    ]
+    for i, (user_id, amount, transaction_type, related_user_id) in enumerate(entries):
+        storage.add_transaction(PointsTransaction(
+            user_id=user_id,
+            amount=amount,
+            transaction_type=transaction_type,
+            description="测试",
+            related_user_id=related_user_id,
+            created_at=start + timedelta(minutes=i)
+        ))
+
+    for s in (storage, Storage(data_dir=data_dir, journal=False)):
+        assert s.get_user_total_earned(TEST_USER_ID) == 60
+        assert s.get_user_total_spent(TEST_USER_ID) == 30
+        assert s.get_user_total_earned(TEST_USER_ID + 1) == 30
+        assert [t.amount for t in s.get_user_transactions(TEST_USER_ID, limit=2)] == [50, -30]
+        assert [t.amount for t in s.get_user_gift_transactions(TEST_USER_ID)] == [30, -30]
+        assert [t.amount for t in s.get_user_gift_transactions(TEST_USER_ID + 1)] == [30, -30]
+        assert s.get_user_transactions(TEST_USER_ID + 2) == []
+
+def test_update_transaction_in_place(data_dir):
+    """测试按交易ID查询并原地更新，不会产生重复记录"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID,
+        amount=-30,
+        transaction_type=PointsTransactionType.GIFT_SENT,
+        description="赠送",
+        transaction_id="gift-1",
+        status=TransactionStatus.PENDING
+    ))
+
+    transaction = storage.get_transaction("gift-1")
+    transaction.status = TransactionStatus.COMPLETED
+    assert storage.update_transaction(transaction)
+    # 旧代码路径重复调用add_transaction也只会更新
+    assert storage.add_transaction(transaction)
+
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert len(reloaded.transactions) == 1
+    assert reloaded.get_transaction("gift-1").status == TransactionStatus.COMPLETED
+    assert reloaded.get_user_total_spent(TEST_USER_ID) == 30
+    assert reloaded.get_transaction("missing") is None
+
+def test_email_index_is_case_insensitive_and_follows_changes(data_dir):
+    """测试邮箱索引不区分大小写，并在用户更换邮箱后更新"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    user = User(user_id=TEST_USER_ID, username=TEST_USERNAME, email="Test@Example.com")
+    storage.save_user(user)
+    assert storage.get_user_by_email("test@example.com") is user
+
+    user.email = "new@example.com"
+    storage.save_user(user)
+    assert storage.get_user_by_email("test@example.com") is None
+    assert Storage(data_dir=data_dir, journal=False).get_user_by_email("NEW@example.com").user_id == TEST_USER_ID
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_expired_verifications_are_pruned(data_dir, journal):
+    """测试过期且未验证的记录被清理，已验证记录与验证码索引保持正确"""
+    storage = Storage(data_dir=data_dir, journal=journal)
+    old = datetime.now() - timedelta(days=3)
+    storage.add_email_verification(EmailVerification(
+        user_id=TEST_USER_ID, email="a@example.com", verification_code="111111",
+        created_at=old, expires_at=old
+    ))
+    storage.add_email_verification(EmailVerification(
+        user_id=TEST_USER_ID, email="a@example.com", verification_code="222222",
+        created_at=old, expires_at=old, status=EmailVerifyStatus.VERIFIED
+    ))
+    storage.add_email_verification(EmailVerification(
+        user_id=TEST_USER_ID + 1, email="b@example.com", verification_code="111111"
+    ))
+
+    assert storage.prune_email_verifications() == 1
+    assert storage.get_email_verification_by_code("111111").user_id == TEST_USER_ID + 1
+    assert storage.get_email_verification(TEST_USER_ID, "111111") is None
+
+    reloaded = Storage(data_dir=data_dir, journal=journal)
+    assert sorted(v.verification_code for v in reloaded.email_verifications) == ["111111", "222222"]
+    assert len(reloaded.get_email_verifications_by_user(TEST_USER_ID)) == 1
+
+@pytest.mark.parametrize("journal", [False, True])
+def test_user_group_access_indexes(data_dir, journal):
+    """测试访问权限的组合索引与按用户、按群组索引在增删后保持一致"""
+    storage = Storage(data_dir=data_dir, journal=journal)
+    for user_id, group_id in ((TEST_USER_ID, 1), (TEST_USER_ID, 2), (TEST_USER_ID + 1, 1)):
+        storage.add_user_group_access(UserGroupAccess(user_id=user_id, group_id=group_id))
+
+    access = storage.get_user_group_access(TEST_USER_ID, 1)
+    assert access is not None
+    assert storage.remove_user_group_access(access)
+    assert storage.get_user_group_access(TEST_USER_ID, 1) is None
+
+    # 删除后分配的ID不会与现有记录重复
+    storage.add_user_group_access(UserGroupAccess(user_id=TEST_USER_ID + 2, group_id=2))
+    assert len({a.access_id for a in storage.user_group_access}) == 3
+
+    reloaded = Storage(data_dir=data_dir, journal=journal)
+    assert [a.group_id for a in reloaded.get_user_group_accesses(TEST_USER_ID)] == [2]
+    assert sorted(a.user_id for a in reloaded.get_group_user_accesses(2)) == [TEST_USER_ID, TEST_USER_ID + 2]
+    assert reloaded.get_user_group_access(TEST_USER_ID + 1, 1) is not None
+
+def populate_history(storage):
+    """写入2024年1月至4月的签到与交易记录，其中一月有一笔待处理交易"""
+    for day in (date(2024, 1, 5), date(2024, 1, 6), date(2024, 2, 10), date(2024, 4, 1)):
+        storage.add_checkin_record(CheckinRecord(
+            user_id=TEST_USER_ID, checkin_date=day, points_earned=10, streak_bonus=5 if day.day == 6 else 0
+        ))
+        storage.add_transaction(PointsTransaction(
+            user_id=TEST_USER_ID, amount=10, transaction_type=PointsTransactionType.CHECKIN,
+            description="签到", created_at=datetime.combine(day, datetime.min.time())
+        ))
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=-30, transaction_type=PointsTransactionType.GIFT_SENT,
+        description="赠送", created_at=datetime(2024, 1, 20), related_user_id=TEST_USER_ID + 1
+    ))
+    storage.add_transaction(PointsTransaction(
+        user_id=TEST_USER_ID, amount=-7, transaction_type=PointsTransactionType.GIFT_SENT,
+        description="待处理赠送", created_at=datetime(2024, 1, 21), status=TransactionStatus.PENDING
+    ))
+
+def test_archive_moves_cold_records_and_keeps_totals(data_dir):
+    """测试归档后内存中只保留热数据，累计统计与历史查询结果不变"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    populate_history(storage)
+    january = (date(2024, 1, 1), date(2024, 2, 1))
+    before = {
+        "earned": storage.get_user_total_earned(TEST_USER_ID),
+        "spent": storage.get_user_total_spent(TEST_USER_ID),
+        "points": storage.get_checkin_points_by_user(),
+        "january": storage.get_checkin_counts_by_user(*january),
+        "daily": storage.get_daily_checkin_counts(date(2024, 1, 5), date(2024, 1, 8)),
+    }
+
+    # 保留期限不足最小值时按62天处理，截止日期对齐到月初：2024-04-20 -> 2024-02-18 -> 2024-02-01
+    assert storage.archive_old_records(horizon_days=10, today=date(2024, 4, 20)) == {
+        "checkin_records": 2, "transactions": 3
+    }
+    assert storage.archive_old_records(horizon_days=0, today=date(2030, 1, 1)) == {}
+    assert os.path.exists(os.path.join(data_dir, "archive", "transactions", "2024-01.json.gz"))
+    storage.close()
+
+    for s in (storage, Storage(data_dir=data_dir, journal=False)):
+        assert len(s.checkin_records) == 2
+        # 待处理交易保留在内存中
+        assert [t.amount for t in s.transactions] == [10, 10, -7]
+        assert s.get_user_total_earned(TEST_USER_ID) == before["earned"]
+        assert s.get_user_total_spent(TEST_USER_ID) == before["spent"]
+        assert s.get_checkin_points_by_user() == before["points"]
+        assert s.get_checkin_counts_by_user(*january) == before["january"]
+        assert s.get_daily_checkin_counts(date(2024, 1, 5), date(2024, 1, 8)) == before["daily"]
+        assert s.count_checkins_on(date(2024, 1, 6)) == 1
+        assert s.get_user_checkin_count(TEST_USER_ID) == 4
+        assert s.get_total_checkin_count() == 4
+        assert s.get_total_transaction_count() == 6
+        assert s.get_user_transaction_summary(TEST_USER_ID) == {"count": 6, "earned": 40, "spent": 37}
+        assert [t.amount for t in s.iter_archived_records("transactions", user_id=TEST_USER_ID)] == [10, 10, -30]
+        assert list(s.iter_archived_records("transactions", user_id=TEST_USER_ID + 1)) == []
+
+    # 新记录的ID不会与已归档的记录冲突
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    record = CheckinRecord(user_id=TEST_USER_ID, checkin_date=date(2024, 4, 2), points_earned=10)
+    reloaded.add_checkin_record(record)
+    assert record.record_id == 5
+
+def test_archive_writes_partitions_outside_storage_lock(data_dir):
+    """测试写入归档分区时不持有存储锁，其他线程的存储调用不会被阻塞"""
+    import threading
+    storage = Storage(data_dir=data_dir, journal=False)
+    populate_history(storage)
+    write_partition = storage._archive.write_partition
+    lock_free = []
+
+    def try_lock():
+        acquired = storage._lock.acquire(timeout=1)
+        if acquired:
+            storage._lock.release()
+        lock_free.append(acquired)
+
+    def checked_write_partition(name, month, records):
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        write_partition(name, month, records)
+
+    storage._archive.write_partition = checked_write_partition
+    assert storage.archive_old_records(horizon_days=62, today=date(2024, 4, 20)) == {
+        "checkin_records": 2, "transactions": 3
+    }
+    assert lock_free and all(lock_free)
+    assert storage.get_total_checkin_count() == 4
+
+def test_interrupted_archive_is_recovered(data_dir):
+    """测试归档清单写入后、快照写入前中断时，重新加载会移除已归档的记录"""
+    storage = Storage(data_dir=data_dir, journal=False)
+    populate_history(storage)
+    snapshot = read_json(data_dir, "transactions.json")
+    storage.archive_old_records(horizon_days=62, today=date(2024, 4, 20))
+
+    # 模拟快照仍为归档前的内容
+    with open(os.path.join(data_dir, "transactions.json"), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    reloaded = Storage(data_dir=data_dir, journal=False)
+    assert len(reloaded.transactions) == 3
+    assert reloaded.get_user_total_earned(TEST_USER_ID) == 40
+    # 移除后的集合标记为脏集合，随下一次刷新写回
+    reloaded.flush()
+    assert len(read_json(data_dir, "transactions.json")) == 3
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_ids_are_monotonic_and_never_reused(data_dir, backend):
+    """测试删除记录后ID不会被复用，重启后ID继续递增，并支持批量预留"""
+    def open_storage():
+        if backend == "sqlite":
+            from ..database.sqlite_storage import SQLiteStorage
+            return SQLiteStorage(os.path.join(data_dir, "storage.sqlite3"))
+        return Storage(data_dir=data_dir, journal=False)
+
+    os.makedirs(data_dir, exist_ok=True)
+    storage = open_storage()
+    first = UserGroupAccess(user_id=TEST_USER_ID, group_id=1)
+    second = UserGroupAccess(user_id=TEST_USER_ID, group_id=2)
+    storage.add_user_group_access(first)
+    storage.add_user_group_access(second)
+    storage.remove_user_group_access(second)
+    storage.close()
+
+    reloaded = open_storage()
+    third = UserGroupAccess(user_id=TEST_USER_ID, group_id=2)
+    reloaded.add_user_group_access(third)
+    assert (first.access_id, second.access_id, third.access_id) == (1, 2, 3)
+
+    reserved = reloaded.reserve_ids("transactions", 100)
+    assert (reserved.start, len(reserved)) == (1, 100)
+    transaction = PointsTransaction(
+        user_id=TEST_USER_ID, amount=1, transaction_type=PointsTransactionType.CHECKIN, description="签到"
+    )
+    reloaded.add_transaction(transaction)
+    assert transaction.transaction_id == 101
+
+    # 未正常关闭时跳过尚未用完的预留区间，但不会重复分配
+    crashed = open_storage()
+    fourth = UserGroupAccess(user_id=TEST_USER_ID, group_id=3)
+    crashed.add_user_group_access(fourth)
+    assert fourth.access_id > 3
+
+def test_user_shards_rewrite_only_touched_shard(data_dir):
+    """测试分片模式下保存用户只重写所在分片，修改分片数后自动重新分布"""
+    storage = Storage(data_dir=data_dir, journal=False, user_shards=1)
+    for user_id in range(1, 9):
+        storage.save_user(User(user_id=user_id, username=f"user{user_id}"))
+    storage.close()
+
+    sharded = Storage(data_dir=data_dir, journal=False, user_shards=4)
+    shard_files = [os.path.join("users", f"users_{i:03d}.json") for i in range(4)]
+    assert read_json(data_dir, "users.json") == []
+    assert [len(read_json(data_dir, f)) for f in shard_files] == [2, 2, 2, 2]
+
+    before = {f: os.path.getmtime(os.path.join(data_dir, f)) for f in shard_files}
+    time.sleep(0.01)
+    sharded.save_user(User(user_id=5, username="renamed"))
+    changed = [f for f in shard_files if os.path.getmtime(os.path.join(data_dir, f)) != before[f]]
+    assert changed == [shard_files[1]]
+
+    resharded = Storage(data_dir=data_dir, journal=False, user_shards=2)
+    assert resharded.get_user(5).username == "renamed"
+    assert len(resharded.get_all_users()) == 8
+    assert sorted(os.listdir(os.path.join(data_dir, "users"))) == ["users_000.json", "users_001.json"]
+
+    merged = Storage(data_dir=data_dir, journal=False, user_shards=1)
+    assert len(read_json(data_dir, "users.json")) == 8
+    assert os.listdir(os.path.join(data_dir, "users")) == []
+    assert merged.get_user(5).username == "renamed"
+
+def test_shared_storage_lifecycle(data_dir):
+    """测试共享存储实例在初始化后被复用，关闭后重新创建"""
+    storage = init_storage(data_dir)
+    try:
+        assert get_storage() is storage
+        assert init_storage(data_dir) is storage
+    finally:
+        close_storage()
+
+    reopened = init_storage(data_dir)
+    try:
+        assert reopened is not storage
+    finally:
+        close_storage()
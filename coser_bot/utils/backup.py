@@ -3,11 +3,13 @@
 """
 import os
 import shutil
+import asyncio
 import logging
 import datetime
 import glob
 from pathlib import Path
 
+from ..config import config
 from ..config.settings import (
     DATA_DIR, BACKUP_DIR, AUTO_BACKUP_ENABLED,
     AUTO_BACKUP_INTERVAL_HOURS, MAX_BACKUP_COUNT
@@ -71,6 +73,34 @@ def cleanup_old_backups() -> None:
     except Exception as e:
         logger.error(f"清理旧备份文件失败: {e}")
 
+def backup_storage() -> bool:
+    """
+    备份当前存储后端的数据（JSON快照或SQLite数据库）到 BACKUP_DIR/backup_<时间戳>，
+    快照损坏时存储会从这些目录中最近一份可用的备份恢复
+    
+    Returns:
+        bool: 备份是否成功
+    """
+    from ..database.storage import get_storage
+    success = get_storage().backup_data()
+    cleanup_old_storage_backups()
+    return success
+
+def cleanup_old_storage_backups() -> None:
+    """
+    清理旧的存储备份目录，只保留最近的MAX_BACKUP_COUNT个备份
+    """
+    try:
+        # 目录名中的时间戳按字典序即按时间排序
+        backup_dirs = sorted(
+            path for path in glob.glob(os.path.join(config.BACKUP_DIR, "backup_*")) if os.path.isdir(path)
+        )
+        for backup_dir in backup_dirs[:-MAX_BACKUP_COUNT]:
+            shutil.rmtree(backup_dir)
+            logger.info(f"删除旧备份目录: {backup_dir}")
+    except Exception as e:
+        logger.error(f"清理旧备份目录失败: {e}")
+
 async def schedule_backup(context) -> None:
     """
     定时备份任务
@@ -81,5 +111,23 @@ async def schedule_backup(context) -> None:
     if AUTO_BACKUP_ENABLED:
         logger.info("执行定时数据库备份")
         backup_database()
+        # 备份需要写入全部快照并复制文件，放到线程中执行，避免阻塞事件循环
+        await asyncio.to_thread(backup_storage)
     else:
-        logger.debug("自动备份已禁用，跳过备份任务") 
\ No newline at end of file
+        logger.debug("自动备份已禁用，跳过备份任务") 
+
+async def schedule_archive(context) -> None:
+    """
+    定时归档冷数据任务，将超过保留期限的签到与交易记录移入按月压缩的归档分区
+    
+    Args:
+        context: 上下文对象
+    """
+    from ..database.storage import get_storage
+    try:
+        # 归档需要读写分区文件，放到线程中执行，避免阻塞事件循环
+        archived = await asyncio.to_thread(get_storage().archive_old_records)
+        if archived:
+            logger.info(f"定时归档完成: {archived}")
+    except Exception as e:
+        logger.error(f"定时归档失败: {e}")
@@ -92,60 +92,57 @@ class GroupSyncManager:
         existing_access = existing_accesses.get(user_id)
         
         if not existing_access:
-            # 创建新的访问记录
+            # 创建新的访问记录（已有记录无需更新，管理员身份不在访问记录中保存）
             access = UserGroupAccess(
                 user_id=user_id,
                 group_id=group_id,
-                joined_at=datetime.now(),
-                is_admin=member.status in ['administrator', 'creator']
+                start_date=datetime.now()
             )
             self.storage.add_user_group_access(access)
-        else:
-            # 更新现有记录
-            existing_access.is_admin = member.status in ['administrator', 'creator']
-            existing_access.last_active = datetime.now()
-            self.storage.update_user_group_access(existing_access)
 
     async def handle_member_update(
         self, 
-        group_id: int, 
+        chat_id: int, 
         user_id: int, 
         is_member: bool,
         is_admin: bool = False
     ) -> None:
         """
-        处理成员更新事件
+        处理成员更新事件，按事件直接更新访问记录并记录确认时间，定时对账时无需再查询该用户
         
         Args:
-            group_id: 群组ID
+            chat_id: 群组的Telegram ID
             user_id: 用户ID
             is_member: 是否为成员
             is_admin: 是否为管理员
         """
         try:
-            access = self.storage.get_user_group_access(user_id, group_id)
+            group = self.storage.get_group_by_chat_id(chat_id)
+            if not group:
+                # 不是权益群组
+                return
+            access = self.storage.get_user_group_access(user_id, group.group_id)
             
             if is_member:
                 if not access:
                     # 添加新成员记录
                     access = UserGroupAccess(
                         user_id=user_id,
-                        group_id=group_id,
-                        joined_at=datetime.now(),
-                        is_admin=is_admin
+                        group_id=group.group_id,
+                        start_date=datetime.now(),
+                        verified_at=datetime.now()
                     )
                     self.storage.add_user_group_access(access)
                 else:
-                    # 更新现有记录
-                    access.is_admin = is_admin
-                    access.last_active = datetime.now()
+                    # 已有记录，只刷新确认时间
+                    access.verified_at = datetime.now()
                     self.storage.update_user_group_access(access)
             else:
                 # 成员离开群组，删除记录
                 if access:
                     self.storage.remove_user_group_access(access)
                     
-            logger.info(f"已更新用户 {user_id} 在群组 {group_id} 的成员状态")
+            logger.info(f"已更新用户 {user_id} 在群组 {group.group_name} 的成员状态")
             
         except Exception as e:
             logger.error(f"更新成员状态失败: {e}") 
\ No newline at end of file
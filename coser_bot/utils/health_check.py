@@ -213,6 +213,17 @@ async def health_check_command(update, context):
             for table, count in db_info['table_counts'].items():
                 response += f"• {table}: {count}条记录\n"
         
+        # 添加 Bot API 调度统计
+        from .rate_limiter import BotRateLimiter
+        rate_limiter = getattr(context.bot, "rate_limiter", None)
+        if isinstance(rate_limiter, BotRateLimiter):
+            stats = rate_limiter.get_stats()
+            response += "\n<b>Bot API 调度:</b>\n"
+            for name, count in stats['requests'].items():
+                response += f"• {name}: {count}次请求，累计等待 {stats['wait_seconds'][name]} 秒\n"
+            response += f"• 被限流: {stats['retry_after']}次，重试 {stats['retries']}次，放弃 {stats['gave_up']}次\n"
+            response += f"• 当前排队: {stats['queued']}\n"
+        
         # 发送响应
         await message.edit_text(response, parse_mode='HTML')
         
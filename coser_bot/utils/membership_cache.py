@@ -0,0 +1,95 @@
+"""
+@description: 群组成员状态缓存模块，按 (chat_id, user_id) 缓存 get_chat_member 的结果，减少群组同步时的 Telegram API 调用
+"""
+import time
+import logging
+from typing import Callable, Dict, Optional
+
+from telegram.constants import ChatMemberStatus
+
+from ..config import config
+from .ttl_cache import TTLCache, SharedInstance
+
+logger = logging.getLogger(__name__)
+
+# 非成员状态（被封禁的成员状态值为 "kicked"），这些状态按负缓存的有效期处理
+NON_MEMBER_STATUSES = (ChatMemberStatus.LEFT, ChatMemberStatus.BANNED)
+
+# 查询失败（群组不可访问等）时缓存的状态，同样按负缓存的有效期处理
+PROBE_FAILED = "probe_failed"
+
+
+class MembershipCache:
+    """带有效期与LRU淘汰的成员状态缓存，线程安全"""
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        @description: 初始化缓存
+        @param {float} ttl: 成员状态的有效期（秒）
+        @param {float} negative_ttl: 非成员与查询失败状态的有效期（秒）
+        @param {int} max_entries: 最多缓存的条目数，超出时淘汰最久未使用的条目
+        @param {Callable[[], float]} clock: 时钟函数，测试时可替换
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # (chat_id, user_id) -> 成员状态
+        self._cache = TTLCache(max_entries, clock)
+
+    def get(self, chat_id: int, user_id: int) -> Optional[str]:
+        """
+        @description: 获取缓存的成员状态
+        @param {int} chat_id: 群组的Telegram ID
+        @param {int} user_id: 用户ID
+        @return {Optional[str]}: 成员状态或 PROBE_FAILED，未缓存或已过期时返回None
+        """
+        return self._cache.get((chat_id, user_id))
+
+    def put(self, chat_id: int, user_id: int, status: str) -> None:
+        """
+        @description: 写入成员状态，非成员与查询失败状态使用较短的负缓存有效期
+        @param {int} chat_id: 群组的Telegram ID
+        @param {int} user_id: 用户ID
+        @param {str} status: 成员状态或 PROBE_FAILED
+        """
+        negative = status == PROBE_FAILED or status in NON_MEMBER_STATUSES
+        self._cache.put((chat_id, user_id), status, self.negative_ttl if negative else self.ttl)
+
+    def invalidate(self, chat_id: int, user_id: Optional[int] = None) -> None:
+        """
+        @description: 使缓存失效
+        @param {int} chat_id: 群组的Telegram ID
+        @param {Optional[int]} user_id: 用户ID，为None时使该群组的所有条目失效
+        """
+        if user_id is not None:
+            self._cache.discard((chat_id, user_id))
+        else:
+            self._cache.discard_where(lambda key: key[0] == chat_id)
+
+    def clear(self) -> None:
+        """
+        @description: 清空缓存与计数
+        """
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        @description: 获取缓存统计
+        @return {Dict[str, int]}: 命中、未命中、淘汰次数与当前条目数
+        """
+        return self._cache.stats()
+
+
+_membership_cache: SharedInstance[MembershipCache] = SharedInstance(lambda: MembershipCache(
+    ttl=config.MEMBERSHIP_CACHE_TTL_SECONDS,
+    negative_ttl=config.MEMBERSHIP_CACHE_NEGATIVE_TTL_SECONDS,
+    max_entries=config.MEMBERSHIP_CACHE_MAX_ENTRIES,
+))
+
+
+def get_membership_cache() -> MembershipCache:
+    """
+    @description: 获取进程级共享的成员状态缓存，未初始化时按配置创建
+    @return {MembershipCache}: 共享缓存实例
+    """
+    return _membership_cache.get()
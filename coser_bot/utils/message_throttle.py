@@ -0,0 +1,68 @@
+"""
+@description: 消息节流模块，同一用户在同一群组的消息在时间窗口内只处理一次
+"""
+import time
+import logging
+from typing import Callable, Dict, Optional
+
+from ..config import config
+from .ttl_cache import TTLCache, SharedInstance
+
+logger = logging.getLogger(__name__)
+
+
+class MessageThrottle:
+    """按 (chat_id, user_id) 记录最近一次处理的有界节流表，记录的有效期即节流窗口，线程安全"""
+
+    def __init__(self, window: float, max_entries: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        @description: 初始化节流表
+        @param {float} window: 时间窗口（秒），0表示不节流
+        @param {int} max_entries: 最多记录的条目数，超出时淘汰最早处理的条目
+        @param {Callable[[], float]} clock: 时钟函数，测试时可替换
+        """
+        self.window = window
+        self._cache = TTLCache(max_entries, clock)
+
+    def should_process(self, chat_id: int, user_id: int) -> bool:
+        """
+        @description: 判断这条消息是否需要处理，需要处理时同时记录处理时间
+        @param {int} chat_id: 群组的Telegram ID
+        @param {int} user_id: 用户ID
+        @return {bool}: 窗口内已处理过时返回False
+        """
+        return self._cache.add((chat_id, user_id), True, self.window)
+
+    def reset(self, chat_id: int, user_id: Optional[int] = None) -> None:
+        """
+        @description: 清除节流记录，下一条消息会被立即处理
+        @param {int} chat_id: 群组的Telegram ID
+        @param {Optional[int]} user_id: 用户ID，为None时清除该群组的所有记录
+        """
+        if user_id is not None:
+            self._cache.discard((chat_id, user_id))
+        else:
+            self._cache.discard_where(lambda key: key[0] == chat_id)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        @description: 获取节流统计
+        @return {Dict[str, int]}: 已处理、已跳过的消息数与当前条目数
+        """
+        stats = self._cache.stats()
+        return {"processed": stats["misses"], "skipped": stats["hits"], "size": stats["size"]}
+
+
+_message_throttle: SharedInstance[MessageThrottle] = SharedInstance(lambda: MessageThrottle(
+    window=config.GROUP_SYNC_DEBOUNCE_SECONDS,
+    max_entries=config.GROUP_SYNC_DEBOUNCE_MAX_ENTRIES,
+))
+
+
+def get_message_throttle() -> MessageThrottle:
+    """
+    @description: 获取进程级共享的群组消息节流表，未初始化时按配置创建
+    @return {MessageThrottle}: 共享节流表
+    """
+    return _message_throttle.get()
@@ -0,0 +1,252 @@
+"""
+@description: Bot API 限流模块，按令牌桶调度所有发往 Telegram 的请求，支持全局与单个聊天的速率限制、优先级以及 RetryAfter 重试
+"""
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from ..config import config
+
+logger = logging.getLogger(__name__)
+
+# 优先级：数值越小越先发送；直接回复用户的请求默认为 PRIORITY_USER
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_USER: "user", PRIORITY_BACKGROUND: "background"}
+
+# 后台任务调用 Bot API 时传入的 rate_limit_args
+BACKGROUND = {"priority": PRIORITY_BACKGROUND}
+
+# 最多保留的单个聊天令牌桶数量，超出时淘汰最久未使用的令牌桶
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，最多积攒 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        """
+        @description: 初始化令牌桶，初始为满
+        @param {float} rate: 每秒补充的令牌数
+        @param {float} capacity: 令牌上限（允许的突发请求数）
+        @param {Callable[[], float]} clock: 时钟函数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def try_acquire(self) -> float:
+        """
+        @description: 尝试取出一个令牌
+        @return {float}: 取到令牌时返回0，否则返回需要等待的秒数
+        """
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class BotRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    全局令牌桶 + 单个聊天令牌桶的请求调度器。
+    等待全局令牌的请求按优先级排队，后台请求只有在没有用户请求等待时才会发送；
+    收到 RetryAfter 时暂停所有请求并在等待后重试。
+    """
+
+    def __init__(self, global_rate: float, private_chat_rate: float, group_chat_rate: float,
+                 max_retries: int, private_chat_burst: float = 1.0, group_chat_burst: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        @description: 初始化调度器
+        @param {float} global_rate: 全局每秒请求数
+        @param {float} private_chat_rate: 单个私聊每秒发送的消息数
+        @param {float} group_chat_rate: 单个群组每秒发送的消息数
+        @param {int} max_retries: 收到 RetryAfter 后的最多重试次数
+        @param {float} private_chat_burst: 单个私聊允许的突发消息数
+        @param {float} group_chat_burst: 单个群组允许的突发消息数
+        @param {Callable[[], float]} clock: 时钟函数
+        """
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.private_chat_burst = max(1.0, private_chat_burst)
+        self.group_chat_burst = max(1.0, group_chat_burst)
+        self.max_retries = max_retries
+        self._clock = clock
+        self._global = TokenBucket(global_rate, max(1.0, global_rate), clock)
+        self._chats: "OrderedDict[Any, TokenBucket]" = OrderedDict()
+        # 等待全局令牌的请求：(优先级, 序号)，只有队首可以取令牌
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self._queue_changed: Optional[asyncio.Event] = None
+        # 收到 RetryAfter 后暂停发送直到该时间
+        self._paused_until = 0.0
+        self._stats: Dict[str, Any] = {
+            "requests": {name: 0 for name in PRIORITY_NAMES.values()},
+            "wait_seconds": {name: 0.0 for name in PRIORITY_NAMES.values()},
+            "retry_after": 0,
+            "retries": 0,
+            "gave_up": 0,
+        }
+
+    async def initialize(self) -> None:
+        """无需初始化资源"""
+
+    async def shutdown(self) -> None:
+        """无需释放资源"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        @description: 获取调度统计，用于监控
+        @return {Dict[str, Any]}: 各优先级的请求数与累计等待时间、RetryAfter 次数、重试次数、放弃次数以及当前排队数
+        """
+        return {
+            "requests": dict(self._stats["requests"]),
+            "wait_seconds": {name: round(value, 3) for name, value in self._stats["wait_seconds"].items()},
+            "retry_after": self._stats["retry_after"],
+            "retries": self._stats["retries"],
+            "gave_up": self._stats["gave_up"],
+            "queued": len(self._queue),
+        }
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # 群组与频道的ID为负数或@用户名
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            if is_group:
+                bucket = TokenBucket(self.group_chat_rate, self.group_chat_burst, self._clock)
+            else:
+                bucket = TokenBucket(self.private_chat_rate, self.private_chat_burst, self._clock)
+            self._chats[chat_id] = bucket
+            while len(self._chats) > MAX_CHAT_BUCKETS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _notify_queue_changed(self) -> None:
+        if self._queue_changed is not None:
+            self._queue_changed.set()
+            self._queue_changed = None
+
+    async def _wait_queue_changed(self, timeout: Optional[float]) -> None:
+        if self._queue_changed is None:
+            self._queue_changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._queue_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _acquire_global(self, priority: int) -> None:
+        """按优先级排队等待全局令牌"""
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._queue, ticket)
+        self._notify_queue_changed()
+        try:
+            while True:
+                wait = None
+                if self._queue[0] == ticket:
+                    wait = self._paused_until - self._clock()
+                    if wait <= 0:
+                        wait = self._global.try_acquire()
+                        if wait == 0:
+                            return
+                await self._wait_queue_changed(wait)
+        finally:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._notify_queue_changed()
+
+    async def _acquire_chat(self, chat_id: Any) -> None:
+        """等待单个聊天的令牌"""
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            wait = bucket.try_acquire()
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        @description: 等待令牌后发送请求，收到 RetryAfter 时暂停并重试
+        @param rate_limit_args: 可选 {"priority": PRIORITY_*}，默认 PRIORITY_USER
+        """
+        priority = (rate_limit_args or {}).get("priority", PRIORITY_USER)
+        name = PRIORITY_NAMES.get(priority, PRIORITY_NAMES[PRIORITY_BACKGROUND])
+        chat_id = data.get("chat_id")
+        # 单个聊天的限制只针对发送与编辑等写操作，查询类请求只受全局限制
+        limit_chat = chat_id is not None and not endpoint.startswith("get")
+        self._stats["requests"][name] += 1
+
+        attempt = 0
+        while True:
+            started = self._clock()
+            if limit_chat:
+                await self._acquire_chat(chat_id)
+            await self._acquire_global(priority)
+            self._stats["wait_seconds"][name] += self._clock() - started
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+                self._stats["retry_after"] += 1
+                # 限流是按机器人计算的，暂停所有请求而不只是当前请求
+                self._paused_until = max(self._paused_until, self._clock() + seconds)
+                if attempt >= self.max_retries:
+                    self._stats["gave_up"] += 1
+                    logger.warning(f"请求 {endpoint} 多次被限流，放弃重试")
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(f"请求 {endpoint} 被限流，{seconds:.0f} 秒后进行第 {attempt} 次重试")
+                await asyncio.sleep(seconds)
+
+
+def background_kwargs(bot: Any) -> Dict[str, Any]:
+    """
+    @description: 后台任务调用 Bot API 时附加的参数，将请求标记为后台优先级；未启用调度器时为空（PTB 不允许此时传入 rate_limit_args）
+    @param bot: 机器人实例
+    @return {Dict[str, Any]}: 关键字参数
+    """
+    if not isinstance(getattr(bot, "rate_limiter", None), BaseRateLimiter):
+        return {}
+    return {"rate_limit_args": BACKGROUND}
+
+
+def create_rate_limiter() -> Optional[BotRateLimiter]:
+    """
+    @description: 按配置创建 Bot API 调度器
+    @return {Optional[BotRateLimiter]}: 调度器，未启用时返回None
+    """
+    if not config.BOT_API_RATE_LIMIT_ENABLED:
+        return None
+    return BotRateLimiter(
+        global_rate=config.BOT_API_GLOBAL_RATE,
+        private_chat_rate=config.BOT_API_PRIVATE_CHAT_RATE,
+        group_chat_rate=config.BOT_API_GROUP_CHAT_PER_MINUTE / 60,
+        max_retries=config.BOT_API_MAX_RETRIES,
+        private_chat_burst=config.BOT_API_PRIVATE_CHAT_BURST,
+        # 群组按分钟计算配额，一分钟的配额可以集中发送
+        group_chat_burst=config.BOT_API_GROUP_CHAT_PER_MINUTE,
+    )
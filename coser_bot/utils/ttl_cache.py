@@ -0,0 +1,157 @@
+"""
+@description: 带有效期与LRU淘汰的有界缓存，供成员状态缓存与消息节流等模块共用
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """按条目设置有效期、超出容量时淘汰最久未使用条目的缓存，线程安全"""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        """
+        @description: 初始化缓存
+        @param {int} max_entries: 最多缓存的条目数，0表示不缓存
+        @param {Callable[[], float]} clock: 时钟函数，测试时可替换
+        """
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # 键 -> (值, 过期时间)，按最近使用时间从早到晚排列
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[Tuple[Any, float]]:
+        """查找未过期的条目（调用方持有锁），过期条目同时被删除"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _store(self, key: Hashable, value: Any, ttl: float, now: float) -> None:
+        """写入条目（调用方持有锁），清理队首的过期条目后仍超出容量时淘汰最久未使用的条目"""
+        if ttl <= 0 or self.max_entries <= 0:
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (value, now + ttl)
+        self._entries.move_to_end(key)
+        while self._entries:
+            oldest_key, (_, expires) = next(iter(self._entries.items()))
+            if expires <= now:
+                del self._entries[oldest_key]
+            elif len(self._entries) > self.max_entries:
+                del self._entries[oldest_key]
+                self.evictions += 1
+            else:
+                break
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        @description: 获取缓存的值，命中时将条目标记为最近使用
+        @param {Hashable} key: 键
+        @return {Optional[Any]}: 缓存的值，未缓存或已过期时返回None
+        """
+        with self._lock:
+            entry = self._lookup(key, self._clock())
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        @description: 写入缓存
+        @param {Hashable} key: 键
+        @param {Any} value: 值
+        @param {float} ttl: 有效期（秒），不大于0时只删除已有条目
+        """
+        with self._lock:
+            self._store(key, value, ttl, self._clock())
+
+    def add(self, key: Hashable, value: Any, ttl: float) -> bool:
+        """
+        @description: 仅在没有未过期的条目时写入，检查与写入是原子的；已有条目时计为命中，否则计为未命中
+        @param {Hashable} key: 键
+        @param {Any} value: 值
+        @param {float} ttl: 有效期（秒）
+        @return {bool}: 是否写入（已有未过期的条目时返回False）
+        """
+        with self._lock:
+            now = self._clock()
+            if self._lookup(key, now) is not None:
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._store(key, value, ttl, now)
+            return True
+
+    def discard(self, key: Hashable) -> None:
+        """
+        @description: 删除条目
+        @param {Hashable} key: 键
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """
+        @description: 删除键满足条件的所有条目
+        @param {Callable[[Hashable], bool]} predicate: 判断键是否需要删除
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        @description: 清空缓存与计数
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        @description: 获取缓存统计
+        @return {Dict[str, int]}: 命中、未命中、淘汰次数与当前条目数
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+
+class SharedInstance(Generic[T]):
+    """进程级共享实例，第一次获取时按工厂函数创建，线程安全"""
+
+    def __init__(self, factory: Callable[[], T]):
+        """
+        @description: 初始化共享实例
+        @param {Callable[[], T]} factory: 创建实例的函数
+        """
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """
+        @description: 获取共享实例，未初始化时创建
+        @return {T}: 共享实例
+        """
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
@@ -1,8 +1,10 @@
-import json
 import os
 import sqlite3
 from datetime import datetime
 
+from coser_bot.database.snapshot import read_snapshot
+from coser_bot.database.storage import user_shard_paths
+
 def init_db():
     """初始化数据库"""
     conn = sqlite3.connect('data/coser_bot.db')
@@ -76,66 +78,64 @@ def import_data():
     conn = init_db()
     c = conn.cursor()
     
-    # 导入用户数据
-    with open('data/users.json', 'r', encoding='utf-8') as f:
-        users = json.load(f)
-        for user in users:
-            c.execute('''
-            INSERT INTO users (
-                user_id, username, join_date, points, frozen_points,
-                email, email_verified, last_email_change,
-                last_checkin_date, streak_days, total_checkins,
-                monthly_checkins, makeup_chances
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user['user_id'], user['username'], user.get('join_date'),
-                user.get('points', 0), user.get('frozen_points', 0),
-                user.get('email'), user.get('email_verified', False),
-                user.get('last_email_change'), user.get('last_checkin_date'),
-                user.get('streak_days', 0), user.get('total_checkins', 0),
-                user.get('monthly_checkins', 0), user.get('makeup_chances', 1)
-            ))
+    # 导入用户数据：与存储的加载规则一致，users.json 有数据时以它为准，否则读取各分片
+    users = read_snapshot('data/users.json') if os.path.exists('data/users.json') else []
+    if not users:
+        users = [user for path in user_shard_paths('data') for user in read_snapshot(path)]
+    for user in users:
+        c.execute('''
+        INSERT INTO users (
+            user_id, username, join_date, points, frozen_points,
+            email, email_verified, last_email_change,
+            last_checkin_date, streak_days, total_checkins,
+            monthly_checkins, makeup_chances
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user['user_id'], user['username'], user.get('join_date'),
+            user.get('points', 0), user.get('frozen_points', 0),
+            user.get('email'), user.get('email_verified', False),
+            user.get('last_email_change'), user.get('last_checkin_date'),
+            user.get('streak_days', 0), user.get('total_checkins', 0),
+            user.get('monthly_checkins', 0), user.get('makeup_chances', 1)
+        ))
     
     # 导入交易记录
-    with open('data/transactions.json', 'r', encoding='utf-8') as f:
-        transactions = json.load(f)
-        for tx in transactions:
-            c.execute('''
-            INSERT INTO points_transactions (
-                user_id, amount, transaction_type, description,
-                created_at, related_user_id
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                tx['user_id'], tx['amount'], tx['transaction_type'],
-                tx['description'], tx['created_at'], tx.get('related_user_id')
-            ))
+    transactions = read_snapshot('data/transactions.json')
+    for tx in transactions:
+        c.execute('''
+        INSERT INTO points_transactions (
+            user_id, amount, transaction_type, description,
+            created_at, related_user_id
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            tx['user_id'], tx['amount'], tx['transaction_type'],
+            tx['description'], tx['created_at'], tx.get('related_user_id')
+        ))
     
     # 导入邮箱验证记录
-    with open('data/email_verifications.json', 'r', encoding='utf-8') as f:
-        verifications = json.load(f)
-        for v in verifications:
-            c.execute('''
-            INSERT INTO email_verifications (
-                user_id, email, code, created_at, expires_at, status
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                v['user_id'], v['email'], v['code'],
-                v['created_at'], v['expires_at'], v['status']
-            ))
+    verifications = read_snapshot('data/email_verifications.json')
+    for v in verifications:
+        c.execute('''
+        INSERT INTO email_verifications (
+            user_id, email, code, created_at, expires_at, status
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            v['user_id'], v['email'], v['code'],
+            v['created_at'], v['expires_at'], v['status']
+        ))
     
     # 导入签到记录
-    with open('data/checkin_records.json', 'r', encoding='utf-8') as f:
-        records = json.load(f)
-        for r in records:
-            c.execute('''
-            INSERT INTO checkin_records (
-                user_id, checkin_date, points_earned,
-                streak_bonus, created_at
-            ) VALUES (?, ?, ?, ?, ?)
-            ''', (
-                r['user_id'], r['checkin_date'], r['points_earned'],
-                r.get('streak_bonus', 0), r['created_at']
-            ))
+    records = read_snapshot('data/checkin_records.json')
+    for r in records:
+        c.execute('''
+        INSERT INTO checkin_records (
+            user_id, checkin_date, points_earned,
+            streak_bonus, created_at
+        ) VALUES (?, ?, ?, ?, ?)
+        ''', (
+            r['user_id'], r['checkin_date'], r['points_earned'],
+            r.get('streak_bonus', 0), r['created_at']
+        ))
     
     conn.commit()
     conn.close()
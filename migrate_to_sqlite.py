@@ -0,0 +1,45 @@
+"""
+@description: 将JSON数据目录迁移到SQLite数据库
+
+用法:
+    python migrate_to_sqlite.py [--data-dir DIR] [--db PATH] [--batch-size N] [--no-verify]
+
+迁移可以随时中断，重新运行会从上次提交的批次继续。迁移前请停止机器人，
+日志模式下还需先完成日志压缩。
+"""
+import sys
+import logging
+import argparse
+
+from coser_bot.config import config
+from coser_bot.database.migration import (
+    JsonToSQLiteMigrator, MigrationError, DEFAULT_BATCH_SIZE, format_report
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="将JSON数据迁移到SQLite")
+    parser.add_argument("--data-dir", default=config.DATA_DIR, help="JSON数据目录")
+    parser.add_argument("--db", default=config.STORAGE_SQLITE_PATH, help="目标SQLite数据库文件")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每个事务写入的记录数")
+    parser.add_argument("--no-verify", action="store_true", help="跳过迁移后的校验")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    migrator = JsonToSQLiteMigrator(args.data_dir, args.db, args.batch_size)
+    try:
+        stats = migrator.migrate()
+        verification = None if args.no_verify else migrator.verify()
+    except MigrationError as e:
+        logging.error(str(e))
+        return 1
+    finally:
+        migrator.close()
+
+    print(format_report(stats, verification))
+    return 0 if verification is None or verification.ok else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
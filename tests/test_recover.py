@@ -47,7 +47,7 @@ async def test_generate_invite_links(mock_bot, mock_storage):
         Group(group_id=2, group_name="测试群组2", is_paid=True, required_points=200)
     ]
     
-    with patch("coser_bot.handlers.recover.Storage", return_value=mock_storage):
+    with patch("coser_bot.handlers.recover.get_storage", return_value=mock_storage):
         mock_storage.add_invite_link.return_value = True
         invite_links = await generate_invite_links(mock_bot, 123, groups)
         
@@ -72,7 +72,7 @@ async def test_approve_recovery_callback(mock_update, mock_context, mock_storage
         UserGroupAccess(user_id=123, group_id=2)
     ]
     
-    with patch("coser_bot.handlers.recover.Storage", return_value=mock_storage):
+    with patch("coser_bot.handlers.recover.get_storage", return_value=mock_storage):
         mock_storage.get_recovery_request.return_value = recovery_request
         mock_storage.update_recovery_request.return_value = True
         mock_storage.get_user_group_accesses.return_value = user_group_accesses